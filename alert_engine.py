@@ -0,0 +1,295 @@
+"""
+Alert engine for NavIC + LoRa monitoring system
+Evaluates cows against their nearest assigned handler with per-group thresholds
+"""
+
+from statistics import NormalDist
+import numpy as np
+import config
+from distance import ALERT_STATUSES, calculate_distances_batch
+from herd_state import STATUS_UNKNOWN
+
+
+STATUS_SAFE = ALERT_STATUSES.index('safe')
+STATUS_ALERT = ALERT_STATUSES.index('alert')
+
+
+class AlertEngine:
+    """
+    Incremental N:M proximity alert engine
+    
+    Handlers belong to a herd group and every cow is assigned to a group.
+    A cow is compared with the nearest handler of its group against that
+    group's threshold. Only dirty cows are recomputed on each evaluation:
+    cows whose position changed since the last evaluation, cows explicitly
+    marked, and every cow of a group whose handlers or threshold changed.
+    Each evaluation returns the safe/alert transitions rather than the full
+    status list.
+    
+    For smoothed tracks with a position accuracy, a status only changes
+    once the cow is beyond (or within) the threshold with the configured
+    confidence; in between, the cow keeps its status.
+    """
+    
+    def __init__(self, thresholds=None, method='vincenty', confidence=None):
+        self.method = method
+        self.confidence = config.ALERT_CONFIDENCE if confidence is None else confidence
+        # Accuracy multiples between estimate and threshold for a status change
+        self._margin_sigmas = NormalDist().inv_cdf(self.confidence) if self.confidence > 0.5 else 0.0
+        self.groups = [config.DEFAULT_GROUP]
+        self.thresholds = {config.DEFAULT_GROUP: config.DISTANCE_THRESHOLD}
+        self.thresholds.update(config.GROUP_THRESHOLDS if thresholds is None else thresholds)
+        for group in self.thresholds:
+            self._group_code(group)
+        
+        # handler_id -> {'position': (lat, lon), 'group': group}
+        self.handlers = {}
+        # handler_id -> stable slot number stored in nearest_handler
+        self._handler_slots = {}
+        
+        # Per-cow state, indexed by herd row
+        self.size = 0
+        self.group_codes = np.zeros(0, dtype=np.int16)
+        self.status = np.zeros(0, dtype=np.uint8)
+        self.distance = np.zeros(0, dtype=np.float32)
+        self.nearest_handler = np.zeros(0, dtype=np.int32)
+        self._last_lat = np.zeros(0)
+        self._last_lon = np.zeros(0)
+        self._dirty = np.zeros(0, dtype=bool)
+        self._dirty_groups = set()
+        self.alerts_active = 0
+    
+    def _group_code(self, group):
+        if group not in self.groups:
+            self.groups.append(group)
+        return self.groups.index(group)
+    
+    def _resize(self, size):
+        """Grow or shrink per-cow arrays to the herd size; new cows are dirty"""
+        if size == self.size:
+            return
+        old = self.size
+        if size < old:
+            self.alerts_active -= int(np.count_nonzero(self.status[size:old] == STATUS_ALERT))
+        self.group_codes = np.resize(self.group_codes, size)
+        self.status = np.resize(self.status, size)
+        self.distance = np.resize(self.distance, size)
+        self.nearest_handler = np.resize(self.nearest_handler, size)
+        self._last_lat = np.resize(self._last_lat, size)
+        self._last_lon = np.resize(self._last_lon, size)
+        self._dirty = np.resize(self._dirty, size)
+        if size > old:
+            self.group_codes[old:] = 0
+            self.status[old:] = STATUS_UNKNOWN
+            self.distance[old:] = np.nan
+            self.nearest_handler[old:] = -1
+            self._dirty[old:] = True
+        self.size = size
+    
+    def set_handler(self, handler_id, position, group=None):
+        """
+        Add a handler or move an existing one
+        
+        Args:
+            handler_id: Unique handler identifier
+            position: Tuple of (latitude, longitude)
+            group: Herd group the handler looks after (default group if None)
+        """
+        group = config.DEFAULT_GROUP if group is None else group
+        previous = self.handlers.get(handler_id)
+        position = (float(position[0]), float(position[1]))
+        if previous == {'position': position, 'group': group}:
+            return
+        if previous is not None:
+            self._dirty_groups.add(self._group_code(previous['group']))
+        self.handlers[handler_id] = {'position': position, 'group': group}
+        self._handler_slots.setdefault(handler_id, len(self._handler_slots))
+        self._dirty_groups.add(self._group_code(group))
+    
+    def remove_handler(self, handler_id):
+        """
+        Remove a handler; its group is re-evaluated against the remaining ones
+        
+        Args:
+            handler_id: Handler identifier
+        """
+        handler = self.handlers.pop(handler_id, None)
+        if handler is not None:
+            self._dirty_groups.add(self._group_code(handler['group']))
+    
+    def set_group_threshold(self, group, threshold):
+        """
+        Set the alert distance for a herd group
+        
+        Args:
+            group: Herd group name
+            threshold: Alert distance in meters
+        """
+        if self.thresholds.get(group) != threshold:
+            self.thresholds[group] = threshold
+            self._dirty_groups.add(self._group_code(group))
+    
+    def assign_group(self, rows, group):
+        """
+        Assign cows to a herd group
+        
+        Args:
+            rows: Herd row numbers
+            group: Herd group name
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        if len(rows) and rows.max() >= self.size:
+            self._resize(int(rows.max()) + 1)
+        self.group_codes[rows] = self._group_code(group)
+        self._dirty[rows] = True
+    
+    def mark_dirty(self, rows):
+        """
+        Force re-evaluation of some cows on the next evaluate()
+        
+        Args:
+            rows: Herd row numbers
+        """
+        self._dirty[np.asarray(rows, dtype=np.int64)] = True
+    
+    def evaluate(self, herd, packed=False):
+        """
+        Re-evaluate dirty cows and write distances/statuses into the herd state
+        
+        Args:
+            herd: HerdState with current positions
+            packed: Return transitions as columns of arrays (see
+                transition_dicts) instead of a list of dictionaries
+        
+        Returns:
+            Dictionary with the list of transitions, alert/safe counts,
+            min/max distance and the number of cows recomputed
+        """
+        n = herd.size
+        self._resize(n)
+        lats, lons, accuracy = herd.lat[:n], herd.lon[:n], herd.accuracy[:n]
+        
+        # Dirty set: moved cows, marked cows and cows of changed groups
+        dirty = self._dirty | (lats != self._last_lat) | (lons != self._last_lon)
+        for code in self._dirty_groups:
+            dirty |= self.group_codes == code
+        rows = np.flatnonzero(dirty)
+        
+        old_status = self.status[rows].copy()
+        for code, group in enumerate(self.groups):
+            group_rows = rows[self.group_codes[rows] == code]
+            if len(group_rows):
+                self._evaluate_group(group, group_rows, lats, lons, accuracy)
+        
+        self._last_lat[rows] = lats[rows]
+        self._last_lon[rows] = lons[rows]
+        self._dirty[:] = False
+        self._dirty_groups.clear()
+        
+        transitions = self._transitions(herd, rows, old_status, packed)
+        
+        herd.distance[:n] = self.distance
+        herd.status[:n] = self.status
+        
+        known = self.status != STATUS_UNKNOWN
+        distances = self.distance[known]
+        return {
+            'transitions': transitions,
+            'total_cows': n,
+            'alerts_active': self.alerts_active,
+            'cows_safe': int(np.count_nonzero(self.status == STATUS_SAFE)),
+            # None without known cows: JSON has no infinity
+            'min_distance': round(float(distances.min()), 2) if len(distances) else None,
+            'max_distance': round(float(distances.max()), 2) if len(distances) else None,
+            'evaluated': len(rows)
+        }
+    
+    def _evaluate_group(self, group, rows, lats, lons, accuracy):
+        """Compare cows of one group with the nearest handler of that group"""
+        handler_ids = [hid for hid, handler in self.handlers.items() if handler['group'] == group]
+        if not handler_ids:
+            self.status[rows] = STATUS_UNKNOWN
+            self.distance[rows] = np.nan
+            self.nearest_handler[rows] = -1
+            return
+        
+        distances = np.stack([
+            calculate_distances_batch(self.handlers[hid]['position'], lats[rows], lons[rows], self.method)
+            for hid in handler_ids
+        ])
+        nearest = np.argmin(distances, axis=0)
+        nearest_distance = distances[nearest, np.arange(len(rows))]
+        threshold = self.thresholds.get(group, config.DISTANCE_THRESHOLD)
+        
+        beyond = nearest_distance - threshold
+        margin = self._margin_sigmas * accuracy[rows]
+        status = np.where(beyond > margin, STATUS_ALERT, np.where(-beyond >= margin, STATUS_SAFE, self.status[rows]))
+        # Undecided new cows go by the estimate alone
+        undecided = status == STATUS_UNKNOWN
+        status[undecided] = np.where(beyond[undecided] > 0, STATUS_ALERT, STATUS_SAFE)
+        
+        self.distance[rows] = nearest_distance
+        self.status[rows] = status
+        slots = np.array([self._handler_slots[hid] for hid in handler_ids], dtype=np.int32)
+        self.nearest_handler[rows] = slots[nearest]
+    
+    def _transitions(self, herd, rows, old_status, packed=False):
+        """Build transition events for cows whose alert status changed"""
+        new_status = self.status[rows]
+        changed = (old_status != new_status) & (new_status != STATUS_UNKNOWN) & (
+            (old_status != STATUS_UNKNOWN) | (new_status == STATUS_ALERT)
+        )
+        
+        self.alerts_active += int(np.count_nonzero(new_status == STATUS_ALERT)) - int(
+            np.count_nonzero(old_status == STATUS_ALERT))
+        
+        rows = rows[changed]
+        slot_ids = np.empty(len(self._handler_slots), dtype=object)
+        for hid, slot in self._handler_slots.items():
+            slot_ids[slot] = hid
+        group_names = np.empty(len(self.groups), dtype=object)
+        for code, group in enumerate(self.groups):
+            group_names[code] = group
+        columns = {
+            'cow_id': herd.ids[rows],
+            'from': old_status[changed],
+            'to': self.status[rows],
+            'distance': self.distance[rows],
+            'rssi': herd.rssi[rows],
+            'timestamp_ms': herd.timestamp_ms[rows],
+            'handler_id': slot_ids[self.nearest_handler[rows]],
+            'group': group_names[self.group_codes[rows]]
+        }
+        return columns if packed else transition_dicts(columns)
+
+
+def transition_dicts(columns):
+    """
+    Build transition events from transition columns
+    
+    Args:
+        columns: Dictionary of equal-length arrays, as returned by
+            AlertEngine.evaluate(herd, packed=True)
+    
+    Returns:
+        List of transition dictionaries in the format of AlertEngine.evaluate()
+    """
+    names = dict(enumerate(ALERT_STATUSES))
+    names[STATUS_UNKNOWN] = None
+    return [
+        {
+            'cow_id': cow_id,
+            'from': names[before],
+            'to': names[after],
+            'distance': distance,
+            'rssi': round(rssi, 1),
+            'timestamp_ms': timestamp_ms,
+            'handler_id': handler_id,
+            'group': group
+        }
+        for cow_id, before, after, distance, rssi, timestamp_ms, handler_id, group in zip(
+            columns['cow_id'].tolist(), columns['from'].tolist(), columns['to'].tolist(),
+            columns['distance'].tolist(), columns['rssi'].tolist(), columns['timestamp_ms'].tolist(),
+            columns['handler_id'].tolist(), columns['group'].tolist()
+        )
+    ]
@@ -0,0 +1,323 @@
+"""
+Alert history store for NavIC + LoRa monitoring system
+Time-bucketed ring buffer of alert events with windowed counts, per-cow
+queries and optional spill of expired buckets to disk
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime
+import numpy as np
+import config
+
+
+# On-disk record layout of spilled buckets (one file per UTC day)
+SPILL_DTYPE = np.dtype([
+    ('timestamp_ms', '<i8'),
+    ('cow_id', '<i4'),
+    ('distance', '<f4'),
+    ('rssi', '<f4')
+])
+
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+
+class _Bucket:
+    """Alert events of one time bucket, in time order"""
+    
+    __slots__ = ('number', 'timestamps', 'records')
+    
+    def __init__(self, number):
+        self.number = number
+        self.timestamps = []
+        self.records = []  # (timestamp_ms, cow_id, distance, rssi)
+
+
+class _CowEvents:
+    """
+    Alert events of one cow, in time order
+    
+    A list with a start offset: eviction advances the offset and compacts the
+    list once half of it is dead, so appends and evictions are amortized
+    O(1) and a time lookup is a bisect over the list, O(log n).
+    """
+    
+    __slots__ = ('records', 'start')
+    
+    def __init__(self):
+        self.records = []
+        self.start = 0
+    
+    def __len__(self):
+        return len(self.records) - self.start
+    
+    def append(self, record):
+        self.records.append(record)
+    
+    def popleft(self):
+        self.start += 1
+        if self.start * 2 >= len(self.records):
+            del self.records[:self.start]
+            self.start = 0
+    
+    def since(self, since_ms=None):
+        """Records from since_ms on (all without it)"""
+        start = self.start if since_ms is None else bisect_left(self.records, (since_ms,), self.start)
+        return self.records[start:]
+
+
+class AlertHistory:
+    """
+    Bounded alert history
+    
+    Events go into fixed-width time buckets kept in a ring that covers the
+    retention period; advancing past the oldest bucket evicts it (and spills
+    it to disk if a spill directory is set). A Fenwick tree over the bucket
+    counts answers windowed counts in O(log n), and a per-cow event list
+    answers per-cow queries with a bisect, without scanning other cows. Timestamps
+    are epoch milliseconds; ISO strings are only produced for output.
+    """
+    
+    def __init__(self, bucket_seconds=None, retention_seconds=None, spill_dir=None):
+        bucket_seconds = config.ALERT_HISTORY_BUCKET_SECONDS if bucket_seconds is None else bucket_seconds
+        retention_seconds = (config.ALERT_HISTORY_RETENTION_SECONDS
+                             if retention_seconds is None else retention_seconds)
+        self.bucket_ms = int(bucket_seconds * 1000)
+        self.num_buckets = -(-int(retention_seconds * 1000) // self.bucket_ms) + 1
+        self.spill_dir = config.ALERT_HISTORY_SPILL_DIR if spill_dir is None else spill_dir
+        
+        self._buckets = [None] * self.num_buckets
+        self._tree = [0] * (self.num_buckets + 1)  # Fenwick tree of bucket counts
+        self._newest = None  # Number of the newest bucket
+        self._last_ms = 0
+        self._by_cow = {}  # cow_id -> _CowEvents
+        self._size = 0
+        self._lock = threading.Lock()
+    
+    def __len__(self):
+        return self._size
+    
+    def _tree_add(self, slot, delta):
+        slot += 1
+        while slot <= self.num_buckets:
+            self._tree[slot] += delta
+            slot += slot & -slot
+    
+    def _tree_prefix(self, slot):
+        """Sum of bucket counts in slots 0..slot-1"""
+        total = 0
+        while slot > 0:
+            total += self._tree[slot]
+            slot -= slot & -slot
+        return total
+    
+    def _advance(self, number):
+        """Make bucket `number` the newest, evicting buckets that fall out of the ring"""
+        if self._newest is None:
+            self._newest = number
+        if number <= self._newest:
+            return
+        
+        # The slots of the new buckets hold the oldest ones, in time order;
+        # a gap longer than the ring clears every slot
+        for new in range(self._newest + 1, self._newest + 1 + min(number - self._newest, self.num_buckets)):
+            self._evict(new % self.num_buckets)
+        self._newest = number
+    
+    def _evict(self, slot):
+        bucket = self._buckets[slot]
+        if bucket is None:
+            return
+        self._buckets[slot] = None
+        if not bucket.records:
+            return
+        
+        self._tree_add(slot, -len(bucket.records))
+        self._size -= len(bucket.records)
+        for record in bucket.records:
+            events = self._by_cow[record[1]]
+            events.popleft()
+            if not events:
+                del self._by_cow[record[1]]
+        
+        if self.spill_dir:
+            self._spill(bucket.records)
+    
+    def _spill(self, records):
+        """Append expired records to the per-day spill file"""
+        os.makedirs(self.spill_dir, exist_ok=True)
+        data = np.array(records, dtype=SPILL_DTYPE)
+        day = time.strftime('%Y%m%d', time.gmtime(records[0][0] / 1000))
+        with open(os.path.join(self.spill_dir, f'alerts-{day}.bin'), 'ab') as f:
+            f.write(data.tobytes())
+    
+    def add(self, cow_id, distance, rssi, timestamp_ms=None):
+        """
+        Record an alert event
+        
+        Args:
+            cow_id: Cow identifier
+            distance: Distance from the handler in meters
+            rssi: Signal strength in dBm
+            timestamp_ms: Epoch milliseconds (default: now); events are kept
+                          in time order, so earlier timestamps are clamped to
+                          the latest one recorded
+        """
+        with self._lock:
+            timestamp_ms = max(_now_ms() if timestamp_ms is None else int(timestamp_ms), self._last_ms)
+            self._last_ms = timestamp_ms
+            number = timestamp_ms // self.bucket_ms
+            self._advance(number)
+            if number <= self._newest - self.num_buckets:
+                return  # Already past the retention period
+            
+            slot = number % self.num_buckets
+            bucket = self._buckets[slot]
+            if bucket is None:
+                bucket = self._buckets[slot] = _Bucket(number)
+            
+            record = (timestamp_ms, int(cow_id), float(distance), float(rssi))
+            bucket.timestamps.append(timestamp_ms)
+            bucket.records.append(record)
+            events = self._by_cow.get(record[1])
+            if events is None:
+                events = self._by_cow[record[1]] = _CowEvents()
+            events.append(record)
+            self._tree_add(slot, 1)
+            self._size += 1
+    
+    def expire(self, now_ms=None):
+        """Evict (and spill) buckets older than the retention period"""
+        with self._lock:
+            self._advance((_now_ms() if now_ms is None else now_ms) // self.bucket_ms)
+    
+    def count_since(self, since_ms, now_ms=None):
+        """
+        Number of alert events at or after a time
+        
+        Args:
+            since_ms: Window start in epoch milliseconds
+            now_ms: Current time in epoch milliseconds (default: now)
+        
+        Returns:
+            Event count within the retained history
+        """
+        with self._lock:
+            self._advance((_now_ms() if now_ms is None else now_ms) // self.bucket_ms)
+            if self._newest is None:
+                return 0
+            
+            oldest = self._newest - self.num_buckets + 1
+            first = since_ms // self.bucket_ms
+            total = 0
+            if first > self._newest:
+                return total
+            if first >= oldest:
+                # Partial first bucket
+                bucket = self._buckets[first % self.num_buckets]
+                if bucket is not None:
+                    total += len(bucket.timestamps) - bisect_left(bucket.timestamps, since_ms)
+                first += 1
+            first = max(first, oldest)
+            if first > self._newest:
+                return total
+            
+            # Whole buckets first..newest, which may wrap around the ring
+            lo, hi = first % self.num_buckets, self._newest % self.num_buckets
+            if lo <= hi:
+                return total + self._tree_prefix(hi + 1) - self._tree_prefix(lo)
+            return total + self._tree_prefix(self.num_buckets) - self._tree_prefix(lo) + self._tree_prefix(hi + 1)
+    
+    def count(self, window_seconds, now_ms=None):
+        """
+        Number of alert events in the last window_seconds
+        
+        Args:
+            window_seconds: Window length in seconds
+            now_ms: Current time in epoch milliseconds (default: now)
+        
+        Returns:
+            Event count
+        """
+        now_ms = _now_ms() if now_ms is None else now_ms
+        return self.count_since(now_ms - int(window_seconds * 1000), now_ms)
+    
+    def cow_events(self, cow_id, since_ms=None):
+        """
+        Alert events of one cow, oldest first
+        
+        Args:
+            cow_id: Cow identifier
+            since_ms: Optional window start in epoch milliseconds
+        
+        Returns:
+            List of event dictionaries (timestamp, cow_id, distance, rssi)
+        """
+        with self._lock:
+            events = self._by_cow.get(int(cow_id))
+            return [] if events is None else [_to_dict(record) for record in events.since(since_ms)]
+    
+    def recent(self, limit=50):
+        """
+        Most recent alert events, newest first
+        
+        Args:
+            limit: Maximum number of events
+        
+        Returns:
+            List of event dictionaries
+        """
+        events = []
+        with self._lock:
+            if self._newest is None:
+                return events
+            for number in range(self._newest, self._newest - self.num_buckets, -1):
+                bucket = self._buckets[number % self.num_buckets]
+                if bucket is not None:
+                    for record in reversed(bucket.records):
+                        events.append(_to_dict(record))
+                        if len(events) >= limit:
+                            return events
+        return events
+
+
+def _to_dict(record):
+    timestamp_ms, cow_id, distance, rssi = record
+    return {
+        'timestamp': datetime.fromtimestamp(timestamp_ms / 1000).isoformat(),
+        'cow_id': cow_id,
+        'distance': distance,
+        'rssi': rssi
+    }
+
+
+def read_spilled(spill_dir, since_ms=None, until_ms=None):
+    """
+    Load spilled alert events
+    
+    Args:
+        spill_dir: Spill directory of an AlertHistory
+        since_ms: Optional window start in epoch milliseconds
+        until_ms: Optional window end (exclusive) in epoch milliseconds
+    
+    Returns:
+        Structured NumPy array with SPILL_DTYPE records in time order
+    """
+    if not os.path.isdir(spill_dir):
+        return np.zeros(0, dtype=SPILL_DTYPE)
+    
+    names = sorted(name for name in os.listdir(spill_dir)
+                   if name.startswith('alerts-') and name.endswith('.bin'))
+    parts = [np.fromfile(os.path.join(spill_dir, name), dtype=SPILL_DTYPE) for name in names]
+    records = np.concatenate(parts) if parts else np.zeros(0, dtype=SPILL_DTYPE)
+    
+    keep = np.ones(len(records), dtype=bool)
+    if since_ms is not None:
+        keep &= records['timestamp_ms'] >= since_ms
+    if until_ms is not None:
+        keep &= records['timestamp_ms'] < until_ms
+    return records[keep]
@@ -3,21 +3,57 @@ Main Flask application for NavIC + LoRa Real-Time Distance Monitoring
 Provides web interface with real-time updates every 2 minutes
 """
 
-from flask import Flask, render_template, request
-from flask_socketio import SocketIO, emit
-import threading
-import time
+import config
+
+# In eventlet mode the update cycle, broadcasts and request handlers share one
+# cooperative event loop; blocking calls must be patched before other imports
+if config.ASYNC_MODE == 'eventlet':
+    import eventlet
+    eventlet.monkey_patch()
+
+from flask import Flask, Response, render_template, request
+from flask_socketio import SocketIO, emit, join_room, leave_room
+import gc
 import json
+import os
+import sys
+import threading
+from collections import OrderedDict
 from datetime import datetime
 import logging
+import time
 
 # Import our modules
-import config
-from simulation import get_current_positions
-from distance import (
-    calculate_cow_distances, 
-    determine_alert_status,
-    get_distance_status_summary
+from simulation import simulator
+from clock import Tick
+import path_loss
+from alert_engine import AlertEngine
+from alert_history import AlertHistory
+from ingest import IngestPipeline
+from track_log import TrackLog, TrackReader
+from scheduler import LatencyWindow, UpdateScheduler
+from sharding import ShardedAlertEngine
+from message_queue import ClusterPresence, QueueManager
+from metrics import LATENCY_BUCKETS, METRICS_MIME_TYPE, MetricsRegistry
+from playback import (
+    PLAYBACK_ROW_FIELDS,
+    PlaybackSession,
+    cow_track,
+    history_frames,
+    parse_bbox,
+    parse_time,
+    parse_zoom,
+    snapshot_at
+)
+from tiles import TILE_LAYERS, TILE_MIME_TYPE, HeatmapTiles
+from viewport import ViewportFrames, room_name, viewport_key
+from wire import (
+    BINARY_MIME_TYPE,
+    WIRE_FORMATS,
+    DeltaEncoder,
+    SnapshotCache,
+    encode_binary_frame,
+    encode_json
 )
 
 # Configure logging
@@ -30,13 +66,45 @@ logger = logging.getLogger(__name__)
 # Initialize Flask app and SocketIO
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'navic_lora_monitoring_secret_key'
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
+# With a message queue, emits reach the clients of every server process
+client_manager = QueueManager(config.MESSAGE_QUEUE, channel=config.MESSAGE_QUEUE_CHANNEL) if config.MESSAGE_QUEUE else None
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode=config.ASYNC_MODE, client_manager=client_manager)
 
 # Global variables for monitoring
 monitoring_active = False
-current_data = None
+current_data = None  # Header and summary of the latest cycle (no per-cow list)
+current_view = None  # HerdView of the latest cycle, for on-demand full payloads
+herd_lock = threading.RLock()  # Held by the update cycle while the herd is ahead of the published payloads
+snapshot_cache = SnapshotCache()  # Encoded payloads of the latest cycle
 connected_clients = 0
+client_wire_formats = {}  # Socket.IO sid -> negotiated wire format
+client_viewports = {}  # Socket.IO sid -> viewport key, for clients filtering by viewport
+viewport_frames = ViewportFrames()  # Per-tick tile bins and encoded viewport frames
+heatmap_tiles = HeatmapTiles()  # Rendered heatmap tiles, evicted per tick when dirty
+playback_sessions = {}  # Socket.IO sid -> running PlaybackSession
+track_reader = None
 update_thread = None
+presence_task = None
+cluster_presence = ClusterPresence(client_manager.host_id) if client_manager else None
+
+# Position source: the simulator, or LoRa gateway / NMEA packets received by
+# the ingestion pipeline (same get_current_herd() layout and herd attribute)
+data_source = IngestPipeline() if config.DATA_SOURCE == 'ingest' else simulator
+
+# Instrumentation, served in the Prometheus text format at /metrics
+metrics = MetricsRegistry(prefix='navic_')
+stage_seconds = metrics.histogram(
+    'cycle_stage_seconds', 'Update cycle time per stage (distance includes status classification)', label='stage'
+)
+cycle_seconds = metrics.histogram('cycle_seconds', 'Update cycle time')
+cycle_allocated_blocks = metrics.gauge(
+    'cycle_allocated_blocks', 'Net change of allocated Python memory blocks during the last update cycle'
+)
+emit_latency_seconds = metrics.histogram(
+    'emit_latency_seconds', 'Broadcast to dashboard acknowledgement, sampled per client and frame', LATENCY_BUCKETS
+)
+emit_times = OrderedDict()  # Snapshot version -> time.monotonic() of its broadcast, recent versions only
+client_emit_latency = {}  # Socket.IO sid -> latest acknowledged emit latency in seconds
 
 
 class MonitoringSystem:
@@ -47,7 +115,13 @@ class MonitoringSystem:
         self.update_count = 0
         self.start_time = datetime.now()
         self.last_update = None
-        self.alert_history = []
+        self.alert_history = AlertHistory()
+        # Sharded engines evaluate the shared-memory herd in worker processes
+        self.alert_engine = ShardedAlertEngine() if config.SHARD_WORKERS else AlertEngine()
+        self.delta_encoder = DeltaEncoder()
+        self.track_log = TrackLog() if config.TRACK_LOG_ENABLED else None
+        self.scheduler = UpdateScheduler(data_source, sleep=socketio.sleep)
+        self.alert_latency = LatencyWindow()  # Report time of a position to its alert broadcast
     
     def start_monitoring(self):
         """Start the monitoring loop"""
@@ -57,83 +131,141 @@ class MonitoringSystem:
         logger.info(f"📍 Base coordinates: {config.BASE_COORDS}")
         logger.info(f"⏱️ Update interval: {config.UPDATE_INTERVAL} seconds")
         logger.info(f"📏 Distance threshold: {config.DISTANCE_THRESHOLD} meters")
+        logger.info(f"⚙️ Server mode: {socketio.async_mode}")
+        logger.info(f"🗓️ Update scheduling: {self.scheduler.mode}")
         
+        # The scheduler waits with socketio.sleep, which yields to the event
+        # loop in eventlet mode and is time.sleep in threading mode
         while self.is_running:
             try:
-                self.perform_update_cycle()
-                time.sleep(config.UPDATE_INTERVAL)
+                if self.scheduler.wait_for_cycle() and self.is_running:
+                    self.perform_update_cycle()
             except Exception as e:
                 logger.error(f"Error in monitoring cycle: {e}")
-                time.sleep(5)  # Brief pause before retry
+                socketio.sleep(5)  # Brief pause before retry
     
     def perform_update_cycle(self):
         """Perform a single update cycle"""
-        global current_data
+        global current_data, current_view
         
         try:
-            # Get current positions from simulation
-            position_data = get_current_positions()
-            
-            # Calculate distances and status
-            human_pos = (position_data['human']['lat'], position_data['human']['lon'])
-            cow_data = position_data['cows']
+            # One clock reading stamps the whole cycle
+            tick = Tick()
+            blocks = sys.getallocatedblocks()
+            started = checkpoint = time.perf_counter()
             
-            # Calculate distances from human to each cow
-            distances = calculate_cow_distances(human_pos, cow_data)
+            # Pick up a recalibrated path-loss model between cycles
+            path_loss.refresh()
             
-            # Update cow data with distance and status information
-            for i, (cow, distance) in enumerate(zip(cow_data, distances)):
-                cow['distance'] = distance
-                cow['status'] = determine_alert_status(distance)
-            
-            # Get comprehensive status summary
-            status_summary = get_distance_status_summary(human_pos, cow_data)
-            
-            # Prepare data for transmission
-            current_data = {
-                'human': position_data['human'],
-                'cows': cow_data,
-                'system_time': position_data['system_time'],
-                'update_count': self.update_count,
-                'alerts_active': status_summary['alerts_active'],
-                'cows_safe': status_summary['cows_safe'],
-                'distance_summary': {
-                    'min_distance': status_summary['min_distance'],
-                    'max_distance': status_summary['max_distance']
+            # The herd and the header stay consistent for encode_current_data:
+            # the lock is held from updating the herd until its payloads are published
+            with herd_lock:
+                current_view = None
+                # Get current positions from the data source (herd stays columnar)
+                position_data = data_source.get_current_herd(tick)
+                
+                human_pos = (position_data['human']['lat'], position_data['human']['lon'])
+                checkpoint = stage_seconds.lap('simulate', checkpoint)
+                
+                # Re-evaluate moved cows against their nearest handler; fills the
+                # herd's distance/status columns and reports only state changes
+                self.alert_engine.set_handler('human', human_pos)
+                status_summary = self.alert_engine.evaluate(data_source.herd)
+                checkpoint = stage_seconds.lap('distance', checkpoint)
+                
+                payload_count = self.update_count
+                self.update_count += 1
+                self.last_update = tick
+                
+                # Log update information: a few lines per cycle, whatever the herd size
+                logger.info(f"📊 Update #{self.update_count} completed")
+                logger.info(f"👤 Human: {human_pos[0]:.6f}, {human_pos[1]:.6f}")
+                
+                if status_summary['alerts_active']:
+                    logger.warning(f"🚨 ALERT: {status_summary['alerts_active']} cow(s) beyond safe distance!")
+                else:
+                    logger.info(f"✅ All {status_summary['total_cows']} cows within safe distance")
+                
+                # Record alert state transitions; per-cow lines are sampled debug output
+                transitions = status_summary['transitions']
+                new_alerts = 0
+                for transition in transitions:
+                    if transition['to'] == 'alert':
+                        new_alerts += 1
+                        self.alert_history.add(transition['cow_id'], transition['distance'], transition['rssi'],
+                                               timestamp_ms=tick.timestamp_ms)
+                if transitions:
+                    logger.info(f"🔔 {new_alerts} new alert(s), {len(transitions) - new_alerts} cow(s) back within safe distance")
+                    log_transitions(transitions)
+                checkpoint = stage_seconds.lap('alert', checkpoint)
+                
+                # Prepare data for transmission: the header comes from the summary;
+                # per-cow rows are encoded from the columns by each wire format
+                current_view = position_data['cows']
+                current_data = {
+                    'human': position_data['human'],
+                    'system_time': position_data['system_time'],
+                    'update_count': payload_count,
+                    'alerts_active': status_summary['alerts_active'],
+                    'cows_safe': status_summary['cows_safe'],
+                    'distance_summary': {
+                        'min_distance': status_summary['min_distance'],
+                        'max_distance': status_summary['max_distance']
+                    }
                 }
-            }
-            
-            # Log update information
-            self.update_count += 1
-            self.last_update = datetime.now()
+                
+                # Encode this cycle's payloads once; every broadcast, replay and
+                # REST poll below reuses the same bytes
+                entries = {'binary': encode_binary_frame(position_data['cows'], current_data, self.update_count)}
+                if not config.DELTA_ENCODING_ENABLED or client_manager is not None:
+                    # The full payload is the stream without deltas; web workers
+                    # have no herd to encode it from on demand
+                    entries['current_data'] = encode_current_data()
+                if config.DELTA_ENCODING_ENABLED:
+                    event, frame = self.delta_encoder.encode(position_data['cows'], current_data)
+                    entries['stream'] = encode_json(frame)
+                    if event == 'position_keyframe':
+                        entries['keyframe'] = entries['stream']
+                    elif client_manager is not None:
+                        # Web workers have no delta state to build keyframes from
+                        entries['keyframe'] = encode_json(self.delta_encoder.keyframe())
+                else:
+                    event = 'position_update'
+                    entries['stream'] = entries['current_data']
+                
+                # Clients filtering by viewport get one frame per distinct viewport
+                viewport_frames.begin_tick(position_data['cows'], current_data)
+                heatmap_tiles.begin_tick(position_data['cows'])
+                checkpoint = stage_seconds.lap('serialize', checkpoint)
+                
+                broadcast_stream(event, entries, self.update_count)
             
-            logger.info(f"📊 Update #{self.update_count} completed")
-            logger.info(f"👤 Human: {human_pos[0]:.6f}, {human_pos[1]:.6f}")
-            
-            alert_cows = [cow for cow in cow_data if cow['status'] == 'alert']
-            if alert_cows:
-                logger.warning(f"🚨 ALERT: {len(alert_cows)} cow(s) beyond safe distance!")
-                for cow in alert_cows:
-                    logger.warning(f"   Cow #{cow['id']}: {cow['distance']:.1f}m away")
-                    self.alert_history.append({
-                        'timestamp': datetime.now().isoformat(),
-                        'cow_id': cow['id'],
-                        'distance': cow['distance'],
-                        'rssi': cow['rssi']
-                    })
-            else:
-                logger.info(f"✅ All {len(cow_data)} cows within safe distance")
-            
-            # Broadcast to all connected clients
-            socketio.emit('position_update', current_data, namespace='/')
+            for key in viewport_keys():
+                socketio.emit('viewport_update', viewport_frames.frame(key), namespace='/', to=room_name(key))
+            if transitions:
+                socketio.emit('alert_transitions', {
+                    'update_count': self.update_count,
+                    'transitions': transitions
+                }, namespace='/')
+                now_ms = int(time.time() * 1000)
+                self.alert_latency.add(now_ms - t['timestamp_ms'] for t in transitions if t['to'] == 'alert')
             
             # Send system status
             socketio.emit('system_status', {
                 'message': f'Update #{self.update_count} completed',
-                'timestamp': self.last_update.isoformat(),
-                'connected_clients': connected_clients,
+                'timestamp': tick.iso,
+                'connected_clients': total_clients(),
                 'alerts_active': status_summary['alerts_active']
             }, namespace='/')
+            checkpoint = stage_seconds.lap('emit', checkpoint)
+            
+            # Persist the tick's positions in one bulk write
+            if self.track_log is not None:
+                self.track_log.append(position_data['cows'], timestamp_ms=tick.timestamp_ms)
+                checkpoint = stage_seconds.lap('persist', checkpoint)
+            
+            cycle_seconds.observe(checkpoint - started)
+            cycle_allocated_blocks.set(sys.getallocatedblocks() - blocks)
             
         except Exception as e:
             logger.error(f"Error in update cycle: {e}")
@@ -145,24 +277,173 @@ class MonitoringSystem:
     def stop_monitoring(self):
         """Stop the monitoring loop"""
         self.is_running = False
+        self.scheduler.stop()
+        if isinstance(data_source, IngestPipeline):
+            data_source.stop()
         logger.info("🔴 Monitoring system stopped")
     
     def get_status(self):
         """Get current system status"""
         uptime = datetime.now() - self.start_time if self.start_time else None
-        return {
+        status = {
             'is_running': self.is_running,
             'update_count': self.update_count,
-            'last_update': self.last_update.isoformat() if self.last_update else None,
+            'last_update': self.last_update.iso if self.last_update else None,
             'uptime_seconds': uptime.total_seconds() if uptime else 0,
-            'connected_clients': connected_clients,
-            'recent_alerts': len([a for a in self.alert_history if 
-                                (datetime.now() - datetime.fromisoformat(a['timestamp'])).total_seconds() < 3600])
+            'connected_clients': total_clients(),
+            'recent_alerts': self.alert_history.count(3600),
+            'data_source': config.DATA_SOURCE,
+            'scheduler': self.scheduler.stats(),
+            'alert_latency_ms': self.alert_latency.percentiles()
         }
+        if isinstance(data_source, IngestPipeline):
+            status['ingest'] = data_source.snapshot_stats()
+        if client_manager is not None:
+            status['cluster'] = {
+                'servers': cluster_presence.hosts(),
+                'local_clients': connected_clients,
+                'published': client_manager.published,
+                'received': client_manager.received
+            }
+        return status
+
+
+def encode_current_data():
+    """
+    Full JSON payload of the latest cycle: the header plus one dictionary per cow
+    
+    Only REST polls and JSON clients without delta encoding need it, so with
+    delta encoding it is encoded on first request (see SnapshotCache.get).
+    The view's columns are live, so encoding waits for a running cycle to
+    publish; the bytes then belong to that cycle, and SnapshotCache.get only
+    caches them under the version they were requested for if no cycle ran.
+    
+    Returns:
+        Encoded bytes, or None before the first cycle or after a failed one
+    """
+    with herd_lock:
+        if current_view is None:
+            return None
+        payload = {'human': current_data['human'], 'cows': current_view.to_dicts()}
+        payload.update((key, value) for key, value in current_data.items() if key != 'human')
+    return encode_json(payload)
+
+
+def broadcast_stream(event, entries, version):
+    """
+    Cache a cycle's encoded payloads and send them to all clients
+    
+    With a message queue the payloads cross the queue once, in a 'tick'
+    message; every server process, this one included, then caches them for
+    new clients and sends them to its own clients.
+    
+    Args:
+        event: Stream event name for JSON clients
+        entries: Encoded payloads (see SnapshotCache)
+        version: Snapshot version, the same in every process
+    """
+    if client_manager is None:
+        deliver_stream(event, entries, version)
+    else:
+        client_manager.publish('tick', event=event, entries=entries, version=version)
+
+
+def deliver_stream(event, entries, version):
+    """Cache a cycle's payloads and send them to this process's clients"""
+    snapshot_cache.publish(entries, version)
+    emit_times[version] = time.monotonic()
+    while len(emit_times) > 64:
+        emit_times.popitem(last=False)
+    
+    # Broadcast to all connected clients, in each client's wire format
+    socketio.emit(event, entries['stream'], namespace='/', to='wire:json', ignore_queue=True)
+    socketio.emit('position_binary', entries['binary'], namespace='/', to='wire:binary', ignore_queue=True)
+
+
+def log_transitions(transitions):
+    """Per-cow transition lines: every LOG_COW_SAMPLE-th transition, at debug level"""
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    for transition in transitions[::max(1, config.LOG_COW_SAMPLE)]:
+        if transition['to'] == 'alert':
+            logger.debug(f"   Cow #{transition['cow_id']}: {transition['distance']:.1f}m away")
+        else:
+            logger.debug(f"   Cow #{transition['cow_id']}: back within safe distance")
+
+
+def client_send_queues():
+    """Largest and total number of packets waiting in the clients' send queues"""
+    depths = [client.queue.qsize() for client in list(socketio.server.eio.sockets.values())]
+    return {'max': max(depths, default=0), 'total': sum(depths)}
+
+
+def register_metrics():
+    """Gauges and counters read from the running system at scrape time"""
+    metrics.counter('updates_total', 'Completed update cycles', function=lambda: monitoring_system.update_count)
+    metrics.gauge('herd_size', 'Cows in the herd table', function=lambda: data_source.herd.size)
+    metrics.gauge('alerts_active', 'Cows beyond their alert distance',
+                  function=lambda: (current_data or {}).get('alerts_active', 0))
+    metrics.gauge('connected_clients', 'Dashboards connected to this process', function=lambda: connected_clients)
+    metrics.gauge('client_send_queue_packets', 'Packets queued for sending to clients', label='stat',
+                  function=client_send_queues)
+    metrics.gauge('client_emit_latency_max_seconds', 'Highest latest emit latency over the connected clients',
+                  function=lambda: max(client_emit_latency.values(), default=0.0))
+    metrics.gauge('allocated_blocks', 'Allocated Python memory blocks', function=sys.getallocatedblocks)
+    metrics.counter('gc_collections_total', 'Garbage collector runs', label='generation',
+                    function=lambda: {gen: stats['collections'] for gen, stats in enumerate(gc.get_stats())})
+    if isinstance(data_source, IngestPipeline):
+        metrics.gauge('ingest_queue_records', 'Uplinks queued for the update cycle',
+                      function=lambda: data_source.queue.qsize())
+        metrics.counter('ingest_events_total', 'Ingestion counters', label='event',
+                        function=lambda: {name: value for name, value in data_source.snapshot_stats().items()
+                                          if name != 'queue_depth'})
+    if client_manager is not None:
+        metrics.counter('message_queue_messages_total', 'Messages through the message queue', label='direction',
+                        function=lambda: {'published': client_manager.published, 'received': client_manager.received})
+
+
+def total_clients():
+    """Connected clients across all server processes"""
+    if cluster_presence is None:
+        return connected_clients
+    return cluster_presence.clients(connected_clients)
+
+
+def viewport_keys():
+    """Viewports of the clients of all server processes"""
+    local = set(client_viewports.values())
+    return local if cluster_presence is None else cluster_presence.viewports(local)
+
+
+def report_presence():
+    """Report this process's clients to the others (background task)"""
+    while True:
+        client_manager.publish('presence', clients=connected_clients, viewports=list(set(client_viewports.values())))
+        socketio.sleep(config.PRESENCE_INTERVAL)
+
+
+def start_cluster():
+    """
+    Join the other server processes on the message queue
+    
+    Starts listening right away rather than on the first client connection,
+    so a web worker already has the latest snapshot for its first client.
+    """
+    global presence_task
+    if client_manager is None or presence_task is not None:
+        return
+    client_manager.on('tick', lambda m: deliver_stream(m['event'], m['entries'], m['version']))
+    client_manager.on('presence', lambda m: cluster_presence.update(m['host_id'], m['clients'], m['viewports']))
+    if not socketio.server.manager_initialized:
+        socketio.server.manager_initialized = True
+        client_manager.initialize()
+    presence_task = socketio.start_background_task(report_presence)
+    logger.info(f"🔀 Sharing broadcasts through {config.MESSAGE_QUEUE}")
 
 
 # Initialize monitoring system
 monitoring_system = MonitoringSystem()
+register_metrics()
 
 
 @app.route('/')
@@ -177,14 +458,196 @@ def api_status():
     return json.dumps(monitoring_system.get_status())
 
 
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus text-format metrics"""
+    return Response(metrics.render(), content_type=METRICS_MIME_TYPE)
+
+
 @app.route('/api/current_data')
 def api_current_data():
-    """API endpoint for current position data"""
-    global current_data
-    if current_data:
-        return json.dumps(current_data)
-    else:
+    """
+    API endpoint for current position data (binary with ?format=binary)
+    
+    Serves the bytes encoded once per update cycle, with an ETag so pollers
+    sending If-None-Match get 304 Not Modified until the next cycle.
+    """
+    wants_binary = (request.args.get('format') == 'binary'
+                    or request.accept_mimetypes.best == BINARY_MIME_TYPE)
+    name = 'binary' if wants_binary else 'current_data'
+    
+    # Read the ETag first: if a cycle lands in between, the stale tag only
+    # costs the client one extra download
+    etag = snapshot_cache.etag(name)
+    data = snapshot_cache.get(name, None if wants_binary else encode_current_data)
+    if data is None:
         return json.dumps({'error': 'No data available yet'})
+    
+    response = Response(data, mimetype=BINARY_MIME_TYPE if wants_binary else 'application/json')
+    response.set_etag(etag)
+    return response.make_conditional(request)
+
+
+def get_track_reader():
+    """Shared TrackReader over the track log, refreshed to its latest tick"""
+    global track_reader
+    if track_reader is None:
+        if not os.path.isdir(config.TRACK_LOG_DIR):
+            return None
+        track_reader = TrackReader(config.TRACK_LOG_DIR)
+    else:
+        track_reader.refresh()
+    return track_reader
+
+
+def json_response(payload, status=200):
+    """Compact JSON response"""
+    return Response(encode_json(payload), status=status, mimetype='application/json')
+
+
+def history_window(args):
+    """Parse start/end/step/bbox/zoom query or playback parameters"""
+    end_ms = parse_time(args['end']) if args.get('end') is not None else None
+    start_ms = parse_time(args['start']) if args.get('start') is not None else None
+    if start_ms is None or end_ms is None:
+        time_range = get_track_reader().time_range()
+        start_ms = time_range[0] if start_ms is None else start_ms
+        end_ms = time_range[1] + 1 if end_ms is None else end_ms
+    step = args.get('step')
+    return {
+        'start_ms': start_ms,
+        'end_ms': end_ms,
+        'step_ms': int(float(step) * 1000) if step not in (None, '') else None,
+        'bbox': parse_bbox(args.get('bbox')),
+        'zoom': parse_zoom(args.get('zoom'))
+    }
+
+
+@app.route('/api/history/range')
+def api_history_range():
+    """Time span covered by the track log"""
+    reader = get_track_reader()
+    time_range = reader.time_range() if reader else None
+    if time_range is None:
+        return json_response({'error': 'No track history recorded'}, 404)
+    return json_response({
+        'start_ms': time_range[0],
+        'end_ms': time_range[1],
+        'start': datetime.fromtimestamp(time_range[0] / 1000).isoformat(),
+        'end': datetime.fromtimestamp(time_range[1] / 1000).isoformat()
+    })
+
+
+@app.route('/api/history')
+def api_history():
+    """
+    Herd snapshots of a time window
+    
+    Query parameters: start and end (epoch ms or ISO time), step (seconds
+    between snapshots), bbox (south,west,north,east), zoom and limit.
+    Responses are capped at config.PLAYBACK_MAX_ROWS cow rows; larger
+    queries get 413 and should decimate with step or zoom.
+    """
+    reader = get_track_reader()
+    if reader is None or reader.time_range() is None:
+        return json_response({'error': 'No track history recorded'}, 404)
+    try:
+        window = history_window(request.args)
+        limit = min(int(request.args.get('limit', config.PLAYBACK_MAX_FRAMES)), config.PLAYBACK_MAX_FRAMES)
+    except (ValueError, TypeError) as e:
+        return json_response({'error': f'Invalid history query: {e}'}, 400)
+    
+    try:
+        frames = list(history_frames(reader, limit=limit, max_rows=config.PLAYBACK_MAX_ROWS, **window))
+    except ValueError as e:
+        return json_response({'error': f'History query too large: {e}'}, 413)
+    return json_response({'fields': PLAYBACK_ROW_FIELDS, 'frames': frames})
+
+
+@app.route('/api/history/snapshot')
+def api_history_snapshot():
+    """Herd snapshot at a time (?at=), optionally with bbox and zoom"""
+    reader = get_track_reader()
+    if reader is None:
+        return json_response({'error': 'No track history recorded'}, 404)
+    try:
+        at_ms = parse_time(request.args['at'])
+        bbox = parse_bbox(request.args.get('bbox'))
+        zoom = parse_zoom(request.args.get('zoom'))
+    except (KeyError, ValueError, TypeError) as e:
+        return json_response({'error': f'Invalid snapshot query: {e}'}, 400)
+    
+    frame = snapshot_at(reader, at_ms, bbox, zoom)
+    if frame is None:
+        return json_response({'error': 'No track history before that time'}, 404)
+    frame['fields'] = PLAYBACK_ROW_FIELDS
+    return json_response(frame)
+
+
+@app.route('/api/history/cow/<int:cow_id>')
+def api_history_cow(cow_id):
+    """Track of one cow over a time window (start, end, step parameters)"""
+    reader = get_track_reader()
+    if reader is None or reader.time_range() is None:
+        return json_response({'error': 'No track history recorded'}, 404)
+    try:
+        window = history_window(request.args)
+    except (ValueError, TypeError) as e:
+        return json_response({'error': f'Invalid history query: {e}'}, 400)
+    
+    return json_response(cow_track(reader, cow_id, window['start_ms'], window['end_ms'], window['step_ms']))
+
+
+@app.route('/tiles/<int:z>/<int:x>/<int:y>')
+@app.route('/tiles/<int:z>/<int:x>/<int:y>.png')
+def heatmap_tile(z, x, y):
+    """
+    Herd heatmap tile as PNG
+    
+    Query parameters: layer ('density' or 'alerts') and at (epoch ms or ISO
+    time) to render from the track log instead of the latest tick.
+    """
+    layer = request.args.get('layer', 'density')
+    if layer not in TILE_LAYERS or not 0 <= z <= config.VIEWPORT_MAX_ZOOM or not (
+            0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        return json_response({'error': 'Invalid tile'}, 404)
+    
+    if request.args.get('at'):
+        reader = get_track_reader()
+        try:
+            at_ms = parse_time(request.args['at'])
+        except ValueError as e:
+            return json_response({'error': f'Invalid time: {e}'}, 400)
+        tile = heatmap_tiles.history_tile(reader, at_ms, z, x, y, layer) if reader else None
+        if tile is None:
+            return json_response({'error': 'No track history before that time'}, 404)
+        png, version = tile
+        etag = f'{layer}-{at_ms}-{z}-{x}-{y}'
+    else:
+        png, version = heatmap_tiles.live_tile(z, x, y, layer)
+        etag = f'{layer}-v{version}-{z}-{x}-{y}'
+    
+    response = Response(png, mimetype=TILE_MIME_TYPE)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+
+def emit_current_data():
+    """Send the latest state to the requesting client in its wire format"""
+    if request.sid in client_viewports:
+        # None on web workers, which get the viewport's frame on the next tick
+        frame = viewport_frames.frame(client_viewports[request.sid])
+        if frame is not None:
+            emit('viewport_update', frame)
+    elif client_wire_formats.get(request.sid) == 'binary':
+        emit('position_binary', snapshot_cache.get('binary'))
+    elif config.DELTA_ENCODING_ENABLED:
+        emit('position_keyframe', snapshot_cache.get(
+            'keyframe', lambda: encode_json(monitoring_system.delta_encoder.keyframe())
+        ))
+    else:
+        emit('position_update', snapshot_cache.get('current_data', encode_current_data))
 
 
 @socketio.on('connect')
@@ -192,11 +655,13 @@ def handle_connect():
     """Handle client connection"""
     global connected_clients
     connected_clients += 1
+    client_wire_formats[request.sid] = 'json'
+    join_room('wire:json')
     logger.info(f"🔗 Client connected. Total clients: {connected_clients}")
     
     # Send current data to newly connected client
-    if current_data:
-        emit('position_update', current_data)
+    if snapshot_cache.version:
+        emit_current_data()
     
     # Send welcome message
     emit('system_status', {
@@ -205,7 +670,9 @@ def handle_connect():
         'system_info': {
             'update_interval': config.UPDATE_INTERVAL,
             'distance_threshold': config.DISTANCE_THRESHOLD,
-            'base_coordinates': config.BASE_COORDS
+            'base_coordinates': config.BASE_COORDS,
+            'viewport_filtering': config.VIEWPORT_FILTERING_ENABLED,
+            'latency_sample': config.EMIT_LATENCY_SAMPLE
         }
     })
 
@@ -215,15 +682,157 @@ def handle_disconnect():
     """Handle client disconnection"""
     global connected_clients
     connected_clients = max(0, connected_clients - 1)
+    client_wire_formats.pop(request.sid, None)
+    client_viewports.pop(request.sid, None)
+    client_emit_latency.pop(request.sid, None)
+    session = playback_sessions.pop(request.sid, None)
+    if session is not None:
+        session.stop()
     logger.info(f"🔌 Client disconnected. Total clients: {connected_clients}")
 
 
+@socketio.on('set_wire_format')
+def handle_set_wire_format(data):
+    """Switch this client between the JSON and binary wire formats"""
+    wire_format = (data or {}).get('format', 'json')
+    if wire_format not in WIRE_FORMATS:
+        emit('system_status', {
+            'error': f"Unknown wire format '{wire_format}', expected one of {list(WIRE_FORMATS)}",
+            'timestamp': datetime.now().isoformat()
+        })
+        return
+    
+    if request.sid not in client_viewports:
+        leave_room(f"wire:{client_wire_formats.get(request.sid, 'json')}")
+        join_room(f'wire:{wire_format}')
+    client_wire_formats[request.sid] = wire_format
+    logger.info(f"🔧 Client switched to {wire_format} wire format")
+    
+    if snapshot_cache.version and request.sid not in client_viewports:
+        emit_current_data()
+
+
+@socketio.on('set_viewport')
+def handle_set_viewport(data):
+    """
+    Register this client's map viewport
+    
+    Expects bounds as [south, west, north, east] and the map zoom. The client
+    then receives viewport_update frames with only the visible tiles instead
+    of the full herd stream.
+    """
+    try:
+        key = viewport_key(data['bounds'], data['zoom'])
+    except (KeyError, TypeError, ValueError) as e:
+        emit('system_status', {
+            'error': f'Invalid viewport: {e}',
+            'timestamp': datetime.now().isoformat()
+        })
+        return
+    
+    previous = client_viewports.get(request.sid)
+    if key == previous:
+        return
+    if previous is None:
+        leave_room(f"wire:{client_wire_formats.get(request.sid, 'json')}")
+    else:
+        leave_room(room_name(previous))
+    join_room(room_name(key))
+    client_viewports[request.sid] = key
+    
+    frame = viewport_frames.frame(key)
+    if frame is not None:
+        emit('viewport_update', frame)
+
+
+@socketio.on('clear_viewport')
+def handle_clear_viewport():
+    """Go back to receiving the full herd stream"""
+    previous = client_viewports.pop(request.sid, None)
+    if previous is None:
+        return
+    leave_room(room_name(previous))
+    join_room(f"wire:{client_wire_formats.get(request.sid, 'json')}")
+    if snapshot_cache.version:
+        emit_current_data()
+
+
+@socketio.on('start_playback')
+def handle_start_playback(data):
+    """
+    Replay recorded history to this client as playback_frame events
+    
+    Accepts start, end, speed, step, bbox and zoom (see /api/history); a
+    running playback for the client is replaced.
+    """
+    sid = request.sid
+    reader = get_track_reader()
+    if reader is None or reader.time_range() is None:
+        emit('playback_end', {'frames': 0, 'error': 'No track history recorded'})
+        return
+    try:
+        data = data or {}
+        window = history_window(data)
+        speed = float(data.get('speed', 1.0))
+    except (ValueError, TypeError) as e:
+        emit('playback_end', {'frames': 0, 'error': f'Invalid playback request: {e}'})
+        return
+    
+    previous = playback_sessions.pop(sid, None)
+    if previous is not None:
+        previous.stop()
+    
+    session = PlaybackSession(
+        reader,
+        lambda event, payload: socketio.emit(event, payload, namespace='/', to=sid),
+        socketio.sleep,
+        speed=speed,
+        **window
+    )
+    playback_sessions[sid] = session
+    
+    def run():
+        session.run()
+        if playback_sessions.get(sid) is session:
+            del playback_sessions[sid]
+    
+    emit('playback_started', {
+        'start_ms': window['start_ms'],
+        'end_ms': window['end_ms'],
+        'speed': session.speed,
+        'fields': PLAYBACK_ROW_FIELDS
+    })
+    socketio.start_background_task(run)
+
+
+@socketio.on('stop_playback')
+def handle_stop_playback():
+    """Stop this client's playback"""
+    session = playback_sessions.pop(request.sid, None)
+    if session is not None:
+        session.stop()
+
+
+@socketio.on('frame_ack')
+def handle_frame_ack(data):
+    """Emit latency of a frame a dashboard acknowledged (a sample of frames)"""
+    try:
+        # Frames carry the payload's update_count, one less than the snapshot version
+        sent = emit_times.get(int((data or {}).get('update_count')) + 1)
+    except (TypeError, ValueError):
+        return
+    if sent is not None:
+        latency = time.monotonic() - sent
+        client_emit_latency[request.sid] = latency
+        emit_latency_seconds.observe(latency)
+
+
 @socketio.on('request_update')
 def handle_request_update():
     """Handle manual update requests from clients"""
     logger.info("📱 Manual update requested by client")
-    if current_data:
-        emit('position_update', current_data)
+    if snapshot_cache.version:
+        emit_current_data()
     else:
         emit('system_status', {
             'message': 'No data available yet, please wait for next update cycle',
@@ -239,15 +848,42 @@ def handle_request_status():
 
 
 def start_monitoring_thread():
-    """Start the monitoring system in a separate thread"""
+    """
+    Start the monitoring loop as a background task of the server
+    
+    A daemon thread in threading mode, a green thread on the shared event
+    loop in eventlet mode.
+    """
     global update_thread
-    if update_thread is None or not update_thread.is_alive():
-        update_thread = threading.Thread(
-            target=monitoring_system.start_monitoring,
-            daemon=True
-        )
-        update_thread.start()
-        logger.info("🚀 Monitoring thread started")
+    if update_thread is None or not monitoring_system.is_running:
+        if isinstance(data_source, IngestPipeline):
+            data_source.start()
+            logger.info(f"📡 Ingesting packets on UDP {data_source.udp_port} and TCP {data_source.tcp_port}")
+        monitoring_system.scheduler.start()
+        monitoring_system.is_running = True
+        update_thread = socketio.start_background_task(monitoring_system.start_monitoring)
+        logger.info("🚀 Monitoring task started")
+
+
+def run_server(host, port, **kwargs):
+    """
+    Run the Flask-SocketIO server in the configured mode
+    
+    Args:
+        host: Interface to listen on
+        port: Port to listen on
+        **kwargs: Extra options for socketio.run
+    """
+    if socketio.async_mode == 'eventlet':
+        # eventlet's WSGI server caps concurrent connections at 1024 by default
+        kwargs.setdefault('max_size', config.MAX_CONNECTIONS)
+    socketio.run(
+        app,
+        host=host,
+        port=port,
+        use_reloader=False,  # Disable reloader to prevent thread issues
+        **kwargs
+    )
 
 
 def create_live_map(human_pos, cow_data):
@@ -271,6 +907,15 @@ def broadcast_updates():
 
 
 if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='NavIC + LoRa Real-Time Monitoring System')
+    parser.add_argument('--port', type=int, default=config.PORT)
+    parser.add_argument('--web-only', action='store_true',
+                        help='Serve clients from the message queue without running the monitoring loop')
+    args = parser.parse_args()
+    config.PORT = args.port
+    config.RUN_MONITORING = config.RUN_MONITORING and not args.web_only
+    
     try:
         logger.info("🌟 Starting NavIC + LoRa Real-Time Monitoring System")
         logger.info("=" * 60)
@@ -279,17 +924,13 @@ if __name__ == '__main__':
         logger.info(f"🎯 Distance threshold: {config.DISTANCE_THRESHOLD}m")
         logger.info("=" * 60)
         
-        # Start monitoring in background thread
-        start_monitoring_thread()
+        # Start monitoring in background thread; web workers only serve clients
+        start_cluster()
+        if config.RUN_MONITORING:
+            start_monitoring_thread()
         
         # Start Flask-SocketIO server
-        socketio.run(
-            app,
-            host=config.HOST,
-            port=config.PORT,
-            debug=config.DEBUG,
-            use_reloader=False  # Disable reloader to prevent thread issues
-        )
+        run_server(config.HOST, config.PORT, debug=config.DEBUG)
         
     except KeyboardInterrupt:
         logger.info("\n🔴 Shutting down monitoring system...")
@@ -0,0 +1,116 @@
+"""
+End-to-end alert latency of the update scheduling modes
+
+A ReplayGateway process sends compact binary uplinks (stamped with their
+send time) to a local IngestPipeline at a fixed rate; every uplink moves a
+random cow across the 100 m alert threshold. The monitoring loop is reproduced
+with an UpdateScheduler, a drain into the herd and an AlertEngine pass, and
+the latency from an uplink's send time to the cycle that raises its alert
+is recorded. Also reports the cycles run and the CPU time of the process,
+i.e. what lower alert latency costs.
+
+Usage:
+    python benchmarks/bench_alert_latency.py [--interval 2] [--latencies 0.01 0.05 0.25]
+"""
+
+import argparse
+import math
+import multiprocessing
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+import config
+from alert_engine import AlertEngine
+from ingest import PACKET_DTYPE, IngestPipeline, ReplayGateway
+from scheduler import LatencyWindow, UpdateScheduler
+
+
+def crossing_source(num_cows, seed, per_tick=50):
+    """
+    Ticks of uplinks from cows crossing the alert threshold
+    
+    Every uplink moves its cow to the other side of the 100 m threshold, so
+    the newest report of a cow is the one that raised (or cleared) its alert.
+    """
+    rng = np.random.default_rng(seed)
+    lat0, lon0 = config.FIXED_HUMAN_COORDS
+    outside = np.zeros(num_cows, dtype=bool)
+    while True:
+        ids = rng.choice(num_cows, per_tick, replace=False)
+        outside[ids] = ~outside[ids]
+        distance = np.where(outside[ids], rng.uniform(110, 190, per_tick), rng.uniform(10, 90, per_tick))
+        bearing = rng.uniform(0, 2 * math.pi, per_tick)
+        records = np.zeros(per_tick, dtype=PACKET_DTYPE)
+        records['cow_id'] = ids + 1
+        records['lat'] = lat0 + distance * np.cos(bearing) / 111320
+        records['lon'] = lon0 + distance * np.sin(bearing) / (111320 * math.cos(math.radians(lat0)))
+        records['rssi'] = -80
+        yield records
+
+
+def gateway_process(port, rate, num_cows, duration):
+    """Send uplinks for a fixed time (subprocess entry point)"""
+    gateway = ReplayGateway('127.0.0.1', port, crossing_source(num_cows, os.getpid()),
+                            rate, fmt='binary', per_datagram=50)
+    gateway.run(duration=duration)
+
+
+def run_case(mode, max_latency, args):
+    """Measure one scheduling setting; returns latency percentiles and cost"""
+    pipeline = IngestPipeline(host='127.0.0.1', udp_port=0, tcp_port=False, flush_ms=2)
+    pipeline.start()
+    scheduler = UpdateScheduler(pipeline, mode=mode, interval=args.interval,
+                                max_latency=max_latency, idle_interval=None)
+    engine = AlertEngine()
+    engine.set_handler('human', config.FIXED_HUMAN_COORDS)
+    latencies = LatencyWindow(size=10 ** 7)
+    
+    sender = multiprocessing.Process(target=gateway_process, args=(
+        pipeline.udp_port, args.rate, args.cows, args.duration))
+    cpu_start = time.process_time()
+    sender.start()
+    end = time.monotonic() + args.duration
+    while time.monotonic() < end:
+        if not scheduler.wait_for_cycle():
+            break
+        pipeline.drain()
+        transitions = engine.evaluate(pipeline.herd)['transitions']
+        now_ms = int(time.time() * 1000)
+        latencies.add(now_ms - t['timestamp_ms'] for t in transitions if t['to'] == 'alert')
+    cpu = time.process_time() - cpu_start
+    sender.join()
+    pipeline.stop()
+    
+    result = latencies.percentiles()
+    result.update(cycles=scheduler.cycles, cpu=cpu)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--interval', type=float, default=2.0,
+                        help='Interval mode: seconds between cycles')
+    parser.add_argument('--latencies', type=float, nargs='+', default=[0.01, 0.05, 0.25],
+                        help='Event mode: max_latency settings in seconds')
+    parser.add_argument('--rate', type=int, default=5000, help='Uplinks per second')
+    parser.add_argument('--cows', type=int, default=100000, help='Collars in the herd')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds per setting')
+    args = parser.parse_args()
+    
+    cases = [('interval', None)] + [('event', latency) for latency in args.latencies]
+    print(f"{'mode':>18} {'alerts':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} "
+          f"{'cycles':>7} {'cpu s':>7}")
+    for mode, max_latency in cases:
+        label = f'interval {args.interval:g}s' if mode == 'interval' else f'event {max_latency * 1000:g}ms'
+        result = run_case(mode, max_latency, args)
+        print(f"{label:>18} {result['count']:>8} {result['p50']:>8} {result['p95']:>8} {result['p99']:>8} "
+              f"{result['max']:>8} {result['cycles']:>7} {result['cpu']:>7.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,212 @@
+"""
+Connection-scaling benchmark for the Socket.IO server modes
+
+Starts the app in a subprocess for each server mode (config.ASYNC_MODE),
+connects 1k, 5k and 10k simulated dashboards and reports the broadcast
+latency percentiles: the time from the start of an update cycle
+(system_time in the frame) until each client has the frame.
+
+Clients speak the Engine.IO v4 websocket protocol directly over aiohttp, and
+are spread over several worker processes so the client side is not the
+bottleneck. Both aiohttp (clients) and eventlet (eventlet mode) must be
+installed. Each connection needs a file descriptor on both ends; the
+benchmark raises its soft RLIMIT_NOFILE to the hard limit.
+
+Usage:
+    python benchmarks/bench_connections.py [--modes threading eventlet] [--clients 1000 5000 10000]
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+DEFAULT_MODES = ['threading', 'eventlet']
+DEFAULT_CLIENTS = [1000, 5000, 10000]
+STREAM_EVENTS = ('position_update', 'position_keyframe', 'position_delta')
+
+
+def raise_fd_limit():
+    """Raise the soft open-file limit to the hard limit"""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def serve(mode, port, interval):
+    """Run the app in the given server mode (subprocess entry point)"""
+    raise_fd_limit()
+    import config
+    config.ASYNC_MODE = mode
+    config.UPDATE_INTERVAL = interval
+    config.DEBUG = False
+    
+    import logging
+    import app as server
+    logging.getLogger().setLevel(logging.ERROR)
+    logging.getLogger('werkzeug').setLevel(logging.CRITICAL)  # Closed-websocket noise
+    
+    server.start_monitoring_thread()
+    options = {} if mode == 'eventlet' else {'allow_unsafe_werkzeug': True}
+    server.run_server('127.0.0.1', port, log_output=False, **options)
+
+
+async def run_client(session, url, connected, go, stop, latencies):
+    """One simulated dashboard: handshake, answer pings, time stream frames"""
+    try:
+        ws = await session.ws_connect(url, heartbeat=None, max_msg_size=0)
+    except Exception:
+        return False
+    
+    try:
+        await ws.receive()  # Engine.IO open packet
+        await ws.send_str('40')  # Socket.IO connect to '/'
+        connected()
+        
+        pending = None  # Event name waiting for its binary attachment
+        while not stop.is_set():
+            msg = await ws.receive()
+            received = time.time()
+            if msg.type == 1:  # text
+                data = msg.data
+                if data == '2':
+                    await ws.send_str('3')
+                elif data.startswith('451-'):
+                    pending = json.loads(data[4:])[0]
+                elif data.startswith('42'):
+                    event, payload = json.loads(data[2:])[:2]
+                    if event in STREAM_EVENTS and go.is_set():
+                        latencies.append(received - _frame_time(payload))
+            elif msg.type == 2:  # binary attachment
+                if pending in STREAM_EVENTS and go.is_set():
+                    latencies.append(received - _frame_time(json.loads(msg.data)))
+                pending = None
+            else:
+                break
+    finally:
+        await ws.close()
+    return True
+
+
+def _frame_time(frame):
+    return datetime.fromisoformat(frame['system_time']).timestamp()
+
+
+def client_worker(port, num_clients, ready, go, duration, results):
+    """Worker process holding num_clients connections"""
+    raise_fd_limit()
+    import aiohttp
+    
+    async def main():
+        url = f'http://127.0.0.1:{port}/socket.io/?EIO=4&transport=websocket'
+        latencies = []
+        go_event, stop_event = asyncio.Event(), asyncio.Event()
+        count = [0]
+        
+        def connected():
+            count[0] += 1
+        
+        connector = aiohttp.TCPConnector(limit=0)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            tasks = []
+            for i in range(num_clients):
+                tasks.append(asyncio.ensure_future(run_client(session, url, connected, go_event, stop_event, latencies)))
+                if i % 100 == 99:
+                    await asyncio.sleep(0.05)  # Pace handshakes
+            
+            deadline = time.time() + 120
+            while count[0] < num_clients and time.time() < deadline and not all(t.done() for t in tasks):
+                await asyncio.sleep(0.1)
+            ready.put(count[0])
+            
+            await asyncio.get_running_loop().run_in_executor(None, go.wait)
+            go_event.set()
+            await asyncio.sleep(duration)
+            stop_event.set()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        
+        results.put(latencies)
+    
+    asyncio.run(main())
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of a sorted list"""
+    if not sorted_values:
+        return float('nan')
+    return sorted_values[min(len(sorted_values) - 1, int(q / 100 * len(sorted_values)))]
+
+
+def run_case(mode, num_clients, args):
+    """Start a server in the given mode, connect clients and collect latencies"""
+    server = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), '--serve', mode,
+         '--port', str(args.port), '--interval', str(args.interval)],
+        cwd=ROOT
+    )
+    try:
+        time.sleep(args.startup)
+        ctx = multiprocessing.get_context('spawn')
+        ready, results, go = ctx.Queue(), ctx.Queue(), ctx.Event()
+        workers = []
+        for i in range(args.workers):
+            share = num_clients // args.workers + (i < num_clients % args.workers)
+            worker = ctx.Process(target=client_worker,
+                                 args=(args.port, share, ready, go, args.duration, results))
+            worker.start()
+            workers.append(worker)
+        
+        connected = sum(ready.get() for _ in workers)
+        go.set()
+        latencies = sorted(value for _ in workers for value in results.get())
+        for worker in workers:
+            worker.join()
+        return connected, latencies
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--modes', nargs='+', default=DEFAULT_MODES, choices=DEFAULT_MODES)
+    parser.add_argument('--clients', type=int, nargs='+', default=DEFAULT_CLIENTS)
+    parser.add_argument('--workers', type=int, default=min(8, os.cpu_count() or 1),
+                        help='Client worker processes')
+    parser.add_argument('--interval', type=float, default=1.0, help='Server update interval in seconds')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds of broadcasts to measure')
+    parser.add_argument('--startup', type=float, default=3.0, help='Seconds to wait for the server to start')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--serve', choices=DEFAULT_MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.serve:
+        serve(args.serve, args.port, args.interval)
+        return
+    
+    raise_fd_limit()
+    print(f"{'mode':>10} {'clients':>8} {'connected':>10} {'frames':>8} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    
+    for mode in args.modes:
+        for num_clients in args.clients:
+            connected, latencies = run_case(mode, num_clients, args)
+            p50, p95, p99 = (percentile(latencies, q) * 1000 for q in (50, 95, 99))
+            worst = latencies[-1] * 1000 if latencies else float('nan')
+            print(f"{mode:>10} {num_clients:>8} {connected:>10} {len(latencies):>8} "
+                  f"{p50:>8.1f} {p95:>8.1f} {p99:>8.1f} {worst:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
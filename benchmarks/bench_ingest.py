@@ -0,0 +1,104 @@
+"""
+Sustained ingestion throughput of the packet ingestion pipeline
+
+Runs an IngestPipeline on local UDP ports and drives it with ReplayGateway
+processes (so sender and receiver do not share a GIL) at increasing offered
+rates, for the Semtech JSON and compact binary formats. A consumer thread
+drains the queue into the herd every --drain-interval seconds, as the update
+cycle does. Reports the offered and achieved send rates, the uplinks applied
+to the herd per second and how many were dropped on a full queue (the rest
+of a shortfall was lost in the kernel's socket buffer).
+
+Usage:
+    python benchmarks/bench_ingest.py [--rates 10000 50000 100000] [--formats semtech binary]
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ingest import IngestPipeline, ReplayGateway, simulated_source
+
+DEFAULT_RATES = [10000, 50000, 100000, 200000]
+DEFAULT_FORMATS = ['semtech', 'binary']
+
+
+def gateway_process(port, fmt, rate, per_datagram, num_cows, duration, results):
+    """Send uplinks for a fixed time (subprocess entry point)"""
+    gateway = ReplayGateway('127.0.0.1', port, simulated_source(num_cows, seed=os.getpid()),
+                            rate, fmt=fmt, per_datagram=per_datagram)
+    results.put(gateway.run(duration=duration))
+
+
+def run_case(fmt, rate, args):
+    """Offer one rate in one format; returns the measurements"""
+    pipeline = IngestPipeline(host='127.0.0.1', udp_port=0, tcp_port=False)
+    pipeline.start()
+    stop = threading.Event()
+    
+    def consume():
+        while not stop.is_set():
+            pipeline.drain()
+            stop.wait(args.drain_interval)
+    
+    consumer = threading.Thread(target=consume, daemon=True)
+    consumer.start()
+    
+    results = multiprocessing.Queue()
+    senders = [
+        multiprocessing.Process(target=gateway_process, args=(
+            pipeline.udp_port, fmt, rate / args.gateways, args.per_datagram,
+            args.cows, args.duration, results))
+        for _ in range(args.gateways)
+    ]
+    for sender in senders:
+        sender.start()
+    sent = [results.get() for _ in senders]
+    for sender in senders:
+        sender.join()
+    
+    time.sleep(max(args.drain_interval, 0.2))  # Let the listener finish the backlog
+    stop.set()
+    consumer.join()
+    pipeline.stop()
+    pipeline.drain()
+    
+    stats = pipeline.snapshot_stats()
+    packets = sum(result['packets'] for result in sent)
+    return {
+        'sent_rate': sum(result['rate'] for result in sent),
+        'applied_rate': stats['applied'] / args.duration,
+        'applied': stats['applied'],
+        'dropped': stats['dropped'],
+        'lost': packets - stats['decoded']
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rates', type=int, nargs='+', default=DEFAULT_RATES,
+                        help='Offered uplinks per second')
+    parser.add_argument('--formats', nargs='+', default=DEFAULT_FORMATS, choices=DEFAULT_FORMATS)
+    parser.add_argument('--per-datagram', type=int, default=20, help='Uplinks per datagram')
+    parser.add_argument('--gateways', type=int, default=2, help='Gateway processes')
+    parser.add_argument('--cows', type=int, default=10000, help='Collars in the simulated herd')
+    parser.add_argument('--duration', type=float, default=5.0, help='Seconds per measurement')
+    parser.add_argument('--drain-interval', type=float, default=0.5,
+                        help='Seconds between queue drains')
+    args = parser.parse_args()
+    
+    print(f"{'format':>8} {'offered/s':>10} {'sent/s':>10} {'applied/s':>10} {'dropped':>9} {'lost':>9}")
+    for fmt in args.formats:
+        for rate in args.rates:
+            result = run_case(fmt, rate, args)
+            print(f"{fmt:>8} {rate:>10} {result['sent_rate']:>10.0f} {result['applied_rate']:>10.0f} "
+                  f"{result['dropped']:>9} {result['lost']:>9}")
+
+
+if __name__ == '__main__':
+    main()
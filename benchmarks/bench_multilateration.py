@@ -0,0 +1,77 @@
+"""
+Multilateration accuracy and throughput benchmark
+
+Cows spread over the area of a ring of gateways are heard by every gateway
+in range (PositionSimulator's multi-gateway readings: path-loss RSSI with
+shadowing, arrival times with timestamp noise). Each batch is solved with
+RSSI ranging and with TDOA; reports fixes per second, the share of valid
+fixes, the median and 95th percentile error against ground truth and the
+median accuracy the fixes claim.
+
+Usage:
+    python benchmarks/bench_multilateration.py [--sizes 10000 100000 1000000] [--gateways 4 8]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+import config
+from multilateration import Multilateration
+from simulation import ring_gateways, simulate_gateway_readings
+
+DEFAULT_SIZES = [10000, 100000, 1000000]
+DEFAULT_GATEWAYS = [4, 8]
+
+
+def run_case(size, num_gateways, args, rng):
+    """Solve one batch with both methods; rows of (method, seconds, fix, error)"""
+    solver = Multilateration(ring_gateways(config.FIXED_HUMAN_COORDS, num_gateways, args.radius))
+    radius = args.radius * np.sqrt(rng.uniform(0, 1, size))
+    angle = rng.uniform(0, 2 * np.pi, size)
+    east, north = radius * np.cos(angle), radius * np.sin(angle)
+    rssi, arrival_ns = simulate_gateway_readings(
+        east, north, solver.gateway_east, solver.gateway_north, rng,
+        sigma_db=args.shadowing, timing_sigma_ns=args.timing
+    )
+    
+    rows = []
+    for method, locate in (('rssi', lambda: solver.locate_rssi(rssi, sigma_db=args.shadowing)),
+                           ('tdoa', lambda: solver.locate_tdoa(arrival_ns, args.timing))):
+        start = time.perf_counter()
+        fix = locate()
+        seconds = time.perf_counter() - start
+        fix_east, fix_north = solver.to_plane(fix.lat, fix.lon)
+        rows.append((method, seconds, fix, np.hypot(fix_east - east, fix_north - north)))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--gateways', type=int, nargs='+', default=DEFAULT_GATEWAYS)
+    parser.add_argument('--radius', type=float, default=300.0, help='Gateway ring radius in meters')
+    parser.add_argument('--shadowing', type=float, default=config.RSSI_SHADOWING_SIGMA, help='RSSI shadowing in dB')
+    parser.add_argument('--timing', type=float, default=config.TDOA_TIMING_SIGMA_NS, help='Timestamp error in ns')
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+    
+    print(f"{'cows':>9} {'gateways':>9} {'method':>7} {'fixes/s':>10} {'valid':>7} "
+          f"{'p50 m':>8} {'p95 m':>8} {'claimed':>8}")
+    for size in args.sizes:
+        for num_gateways in args.gateways:
+            for method, seconds, fix, error in run_case(size, num_gateways, args, rng):
+                valid = error[fix.valid]
+                p50, p95 = np.percentile(valid, [50, 95]) if len(valid) else (float('nan'),) * 2
+                claimed = np.median(fix.accuracy[fix.valid]) if len(valid) else float('nan')
+                print(f"{size:>9} {num_gateways:>9} {method:>7} {size / seconds:>10.0f} {fix.valid.mean():>7.1%} "
+                      f"{p50:>8.1f} {p95:>8.1f} {claimed:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
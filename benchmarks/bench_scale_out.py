@@ -0,0 +1,138 @@
+"""
+Multi-worker load benchmark for message queue scale-out
+
+Starts the stand-in message broker, one producer process running the
+monitoring loop and 1, 2, 4, ... web worker processes (app.py --web-only),
+all sharing broadcasts through the queue. Simulated dashboards (see
+bench_connections.py) are spread evenly over the web workers; the benchmark
+reports the broadcast latency percentiles and the client count the producer
+aggregates from the workers' presence reports.
+
+Usage:
+    python benchmarks/bench_scale_out.py [--servers 1 2 4] [--clients 2000 5000]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+import config
+from bench_connections import client_worker, percentile, raise_fd_limit
+from message_queue import MessageBroker
+
+DEFAULT_SERVERS = [1, 2, 4]
+DEFAULT_CLIENTS = [2000, 5000]
+
+
+def serve(role, port, queue, mode, interval):
+    """Run a producer or web worker (subprocess entry point)"""
+    raise_fd_limit()
+    config.ASYNC_MODE = mode
+    config.UPDATE_INTERVAL = interval
+    config.MESSAGE_QUEUE = queue
+    config.DEBUG = False
+    
+    import logging
+    import app as server
+    logging.getLogger().setLevel(logging.ERROR)
+    logging.getLogger('werkzeug').setLevel(logging.CRITICAL)
+    
+    server.start_cluster()
+    if role == 'producer':
+        server.start_monitoring_thread()
+    options = {} if mode == 'eventlet' else {'allow_unsafe_werkzeug': True}
+    server.run_server('127.0.0.1', port, log_output=False, **options)
+
+
+def start_server(role, port, queue, args):
+    return subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), '--serve', role, '--port', str(port),
+         '--queue', queue, '--mode', args.mode, '--interval', str(args.interval)],
+        cwd=ROOT
+    )
+
+
+def aggregated_clients(port):
+    """Client count reported by a server's /api/status"""
+    with urllib.request.urlopen(f'http://127.0.0.1:{port}/api/status', timeout=10) as response:
+        return json.loads(response.read())['connected_clients']
+
+
+def run_case(num_servers, num_clients, queue, args):
+    """Start a producer and web workers, connect clients and collect latencies"""
+    producer_port = args.port
+    web_ports = [args.port + 1 + i for i in range(num_servers)]
+    processes = [start_server('producer', producer_port, queue, args)]
+    processes += [start_server('web', port, queue, args) for port in web_ports]
+    try:
+        time.sleep(args.startup)
+        ctx = multiprocessing.get_context('spawn')
+        ready, results, go = ctx.Queue(), ctx.Queue(), ctx.Event()
+        workers = []
+        for i in range(args.workers):
+            share = num_clients // args.workers + (i < num_clients % args.workers)
+            worker = ctx.Process(target=client_worker,
+                                 args=(web_ports[i % num_servers], share, ready, go, args.duration, results))
+            worker.start()
+            workers.append(worker)
+        
+        connected = sum(ready.get() for _ in workers)
+        time.sleep(2 * config.PRESENCE_INTERVAL)  # Let every worker report its clients
+        aggregated = aggregated_clients(producer_port)
+        go.set()
+        latencies = sorted(value for _ in workers for value in results.get())
+        for worker in workers:
+            worker.join()
+        return connected, aggregated, latencies
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--servers', type=int, nargs='+', default=DEFAULT_SERVERS, help='Web worker processes')
+    parser.add_argument('--clients', type=int, nargs='+', default=DEFAULT_CLIENTS)
+    parser.add_argument('--mode', default='eventlet', choices=['threading', 'eventlet'])
+    parser.add_argument('--workers', type=int, default=min(8, os.cpu_count() or 1),
+                        help='Client worker processes')
+    parser.add_argument('--interval', type=float, default=1.0, help='Producer update interval in seconds')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds of broadcasts to measure')
+    parser.add_argument('--startup', type=float, default=4.0, help='Seconds to wait for the servers to start')
+    parser.add_argument('--port', type=int, default=5100)
+    parser.add_argument('--serve', choices=['producer', 'web'], help=argparse.SUPPRESS)
+    parser.add_argument('--queue', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.serve:
+        serve(args.serve, args.port, args.queue, args.mode, args.interval)
+        return
+    
+    raise_fd_limit()
+    broker = MessageBroker(port=0).start()
+    print(f"{'servers':>8} {'clients':>8} {'connected':>10} {'aggregated':>11} {'frames':>8} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    try:
+        for num_servers in args.servers:
+            for num_clients in args.clients:
+                connected, aggregated, latencies = run_case(num_servers, num_clients, broker.url, args)
+                p50, p95, p99 = (percentile(latencies, q) * 1000 for q in (50, 95, 99))
+                worst = latencies[-1] * 1000 if latencies else float('nan')
+                print(f"{num_servers:>8} {num_clients:>8} {connected:>10} {aggregated:>11} {len(latencies):>8} "
+                      f"{p50:>8.1f} {p95:>8.1f} {p99:>8.1f} {worst:>8.1f}")
+    finally:
+        broker.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Scaling of sharded herd evaluation with worker processes
+
+Moves every cow of a multi-million-cow herd each tick (so every row is
+re-evaluated) and times AlertEngine in the server process against
+ShardedAlertEngine over a shared-memory herd with 1, 2, 4, ... workers.
+Worker start-up is excluded (one warm-up tick per setting). Speedup is
+bounded by the physical cores of the machine.
+
+Usage:
+    python benchmarks/bench_sharding.py [--sizes 1000000 4000000] [--workers 1 2 4 8]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+import config
+from alert_engine import AlertEngine
+from herd_state import HerdState, SharedHerdState
+from sharding import ShardedAlertEngine
+
+DEFAULT_SIZES = [1000000, 4000000]
+
+
+def move_herd(herd, size, rng):
+    """Scatter every cow within ~200 m of the handler"""
+    herd.lat[:size] = config.FIXED_HUMAN_COORDS[0] + rng.uniform(-0.002, 0.002, size)
+    herd.lon[:size] = config.FIXED_HUMAN_COORDS[1] + rng.uniform(-0.002, 0.002, size)
+    herd.invalidate()
+
+
+def time_engine(engine, herd, size, ticks):
+    """Best evaluation time over several ticks, after one warm-up tick"""
+    rng = np.random.default_rng(0)
+    engine.set_handler('human', config.FIXED_HUMAN_COORDS)
+    herd.resize(size)
+    best = float('inf')
+    for tick in range(ticks + 1):
+        move_herd(herd, size, rng)
+        start = time.perf_counter()
+        engine.evaluate(herd)
+        if tick:
+            best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=[n for n in (1, 2, 4, 8, 16) if n <= (os.cpu_count() or 1)])
+    parser.add_argument('--ticks', type=int, default=3)
+    args = parser.parse_args()
+    
+    print(f"cores: {os.cpu_count()}")
+    print(f"{'cows':>10} {'workers':>8} {'seconds':>9} {'Mcows/s':>9} {'speedup':>8}")
+    for size in args.sizes:
+        baseline = time_engine(AlertEngine(), HerdState(size), size, args.ticks)
+        print(f"{size:>10} {'-':>8} {baseline:>9.3f} {size / baseline / 1e6:>9.2f} {1.0:>7.2f}x")
+        for workers in args.workers:
+            herd, engine = SharedHerdState(size), ShardedAlertEngine(workers=workers)
+            try:
+                seconds = time_engine(engine, herd, size, args.ticks)
+            finally:
+                engine.close()
+                herd.close()
+            print(f"{size:>10} {workers:>8} {seconds:>9.3f} {size / seconds / 1e6:>9.2f} "
+                  f"{baseline / seconds:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
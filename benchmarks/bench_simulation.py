@@ -0,0 +1,56 @@
+"""
+Benchmark for the LoRa simulation tick
+
+Times PositionSimulator.update_herd in scalar and batch mode and reports
+ticks per second and simulated collars per second, to check that a
+single core can drive a million collars per tick.
+
+Usage:
+    python benchmarks/bench_simulation.py [--sizes 1000 100000 1000000]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from simulation import PositionSimulator
+
+DEFAULT_SIZES = [1000, 100000, 1000000]
+
+
+def time_tick(simulator, num_cows, repeat):
+    """Return the best wall-clock time of one update_herd tick"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        simulator.update_herd(config.FIXED_HUMAN_COORDS, num_cows)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--scalar-max', type=int, default=100000,
+                        help='Largest herd to run through the per-cow scalar path')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    
+    print(f"{'cows':>10} {'mode':>7} {'ms/tick':>10} {'collars/s':>14}")
+    for size in args.sizes:
+        repeat = 5 if size <= 100000 else 2
+        for batch_mode in (False, True):
+            if not batch_mode and size > args.scalar_max:
+                continue
+            simulator = PositionSimulator(batch_mode=batch_mode, seed=args.seed)
+            elapsed = time_tick(simulator, size, repeat)
+            mode = 'batch' if batch_mode else 'scalar'
+            print(f"{size:>10} {mode:>7} {elapsed * 1000:>10.2f} {size / elapsed:>14,.0f}")
+
+
+if __name__ == '__main__':
+    main()
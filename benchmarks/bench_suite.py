@@ -0,0 +1,235 @@
+"""
+Benchmark suite for the monitoring hot paths, with baseline comparison
+
+Times every case at each herd size and reports the best and median of
+several runs:
+
+    distances        calculate_cow_distances over cow dictionaries
+    status_summary   get_distance_status_summary over cow dictionaries
+    bearing          calculate_bearing from the handler to every cow
+    simulate_lora    PositionSimulator.simulate_lora_signals (batch engine)
+    update_cycle     MonitoringSystem.perform_update_cycle, simulator source
+    json_encode      JSON encoding of the cycle's full payload (REST polls and
+                     clients without delta encoding)
+    fanout           Sending a cycle's stream frame to N in-process
+                     Socket.IO test clients (one row per --clients value)
+
+Runs are seeded, so every run times the same work. --output writes the
+results as JSON. Such a file, saved from an earlier run on the same machine,
+can be passed as --baseline: cases slower than the baseline by more than
+--tolerance are reported as regressions and the suite exits with status 1.
+
+Usage:
+    python benchmarks/bench_suite.py [--sizes 1000 10000 100000] [--clients 10 100]
+                                     [--cases distances fanout] [--output results.json]
+                                     [--baseline baseline.json] [--tolerance 0.25]
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+import numpy as np
+
+import config
+from distance import calculate_bearing, calculate_cow_distances, get_distance_status_summary
+from simulation import PositionSimulator
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+DEFAULT_CLIENTS = [10, 100]
+CASES = ('distances', 'status_summary', 'bearing', 'simulate_lora', 'update_cycle', 'json_encode', 'fanout')
+
+
+def make_cows(num_cows, human_pos, seed=42):
+    """Cow dictionaries scattered within ~200 m of the handler"""
+    rng = random.Random(seed)
+    return [
+        {
+            'id': i + 1,
+            'lat': human_pos[0] + rng.uniform(-0.002, 0.002),
+            'lon': human_pos[1] + rng.uniform(-0.002, 0.002),
+            'rssi': round(rng.uniform(config.RSSI_MIN, config.RSSI_MAX), 1)
+        }
+        for i in range(num_cows)
+    ]
+
+
+def measure(func, repeat, setup=None):
+    """Best and median wall-clock seconds of several runs, after one warm-up run"""
+    times = []
+    for run in range(repeat + 1):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        if run:
+            times.append(elapsed)
+    return min(times), statistics.median(times)
+
+
+def load_app(size, seed):
+    """The app, with a seeded batch simulator driving `size` cows"""
+    config.DEBUG = False
+    config.NUM_COWS = size
+    config.DATA_SOURCE = 'simulation'
+    config.TRACK_LOG_ENABLED = False
+    import app as server
+    logging.getLogger().setLevel(logging.ERROR)
+    
+    server.simulator.batch_mode = True
+    server.simulator.rng = np.random.default_rng(seed)
+    return server
+
+
+def run_case(case, size, clients, repeat, seed):
+    """Time one case; returns (best, median) seconds"""
+    human_pos = config.FIXED_HUMAN_COORDS
+    if case in ('distances', 'status_summary', 'bearing'):
+        cows = make_cows(size, human_pos, seed)
+        if case == 'distances':
+            return measure(lambda: calculate_cow_distances(human_pos, cows), repeat)
+        if case == 'status_summary':
+            return measure(lambda: get_distance_status_summary(human_pos, cows), repeat)
+        return measure(lambda: [calculate_bearing(human_pos, (cow['lat'], cow['lon'])) for cow in cows], repeat)
+    
+    if case == 'simulate_lora':
+        simulator = PositionSimulator(batch_mode=True, seed=seed)
+        return measure(lambda: simulator.simulate_lora_signals(human_pos, size), repeat)
+    
+    server = load_app(size, seed)
+    cycle = server.monitoring_system.perform_update_cycle
+    if case == 'update_cycle':
+        return measure(cycle, repeat)
+    
+    cycle()
+    if case == 'json_encode':
+        return measure(server.encode_current_data, repeat)
+    
+    # fanout: the stream frame of the last cycle to every test client
+    test_clients = [server.socketio.test_client(server.app) for _ in range(clients)]
+    entries = {name: server.snapshot_cache.get(name) for name in ('stream', 'binary')}
+    version = server.snapshot_cache.version
+    
+    def drain():
+        for client in test_clients:
+            client.get_received()
+    
+    try:
+        return measure(lambda: server.deliver_stream('position_update', entries, version), repeat, setup=drain)
+    finally:
+        for client in test_clients:
+            client.disconnect()
+
+
+def environment():
+    """Machine and code version the results were measured on"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S')
+    }
+
+
+def result_key(result):
+    return result['case'], result['size'], result.get('clients')
+
+
+def compare(results, baseline, tolerance):
+    """
+    Check results against a baseline run
+    
+    Args:
+        results: Result rows of this run
+        baseline: Parsed JSON output of an earlier run
+        tolerance: Allowed slowdown of the best time, e.g. 0.25 for 25%
+    
+    Returns:
+        Tuple of (changes, regressions): change ratios per result key, and the
+        keys slower than the tolerance allows
+    """
+    previous = {result_key(row): row for row in baseline.get('results', [])}
+    changes, regressions = {}, []
+    for row in results:
+        key = result_key(row)
+        if key not in previous:
+            continue
+        changes[key] = row['best_s'] / previous[key]['best_s'] - 1
+        if changes[key] > tolerance:
+            regressions.append(key)
+    return changes, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='Herd sizes')
+    parser.add_argument('--clients', type=int, nargs='+', default=DEFAULT_CLIENTS,
+                        help='Socket.IO test clients of the fanout case')
+    parser.add_argument('--cases', nargs='+', choices=CASES, default=list(CASES))
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs per case (after a warm-up run)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Write the results as JSON to this file')
+    parser.add_argument('--baseline', help='JSON results of an earlier run to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Slowdown against the baseline reported as a regression (0.25 = 25%%)')
+    args = parser.parse_args()
+    
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    
+    results = []
+    print(f"{'case':>15} {'cows':>8} {'clients':>8} {'best ms':>10} {'median ms':>10} {'us/item':>9}")
+    for case in args.cases:
+        for size in args.sizes:
+            for clients in (args.clients if case == 'fanout' else [None]):
+                best, median = run_case(case, size, clients, args.repeat, args.seed)
+                items = clients if case == 'fanout' else size
+                row = {'case': case, 'size': size, 'best_s': best, 'median_s': median,
+                       'per_item_us': best / items * 1e6}
+                if clients is not None:
+                    row['clients'] = clients
+                results.append(row)
+                print(f"{case:>15} {size:>8} {clients or '':>8} {best * 1000:>10.2f} {median * 1000:>10.2f} "
+                      f"{row['per_item_us']:>9.3f}")
+    
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'environment': environment(), 'results': results}, f, indent=2)
+        print(f"Results written to {args.output}")
+    
+    if baseline is None:
+        return
+    changes, regressions = compare(results, baseline, args.tolerance)
+    print()
+    print(f"Against {args.baseline} (measured at {baseline.get('environment', {}).get('commit')}):")
+    for key, change in changes.items():
+        case, size, clients = key
+        marker = '  REGRESSION' if key in regressions else ''
+        print(f"{case:>15} {size:>8} {clients or '':>8} {change:>+9.1%}{marker}")
+    if regressions:
+        print(f"{len(regressions)} case(s) more than {args.tolerance:.0%} slower than the baseline", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
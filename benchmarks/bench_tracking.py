@@ -0,0 +1,106 @@
+"""
+Track smoothing throughput and false alert benchmark
+
+Throughput: TrackFilter.update() over whole herds and over random subsets of
+rows (as with ingested uplinks), reported as tracks per millisecond.
+
+False alerts: stationary cows 60-140 m from the handler report positions
+with RSSI-like noise every tick. Since no cow moves, every transition after
+the first evaluation is false. Compares raw positions with the point
+estimate against smoothed tracks with confidence-gated alerts.
+
+Usage:
+    python benchmarks/bench_tracking.py [--sizes 10000 100000 1000000] [--noise 15]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+import config
+from alert_engine import AlertEngine
+from herd_state import HerdState
+from tracking import TrackFilter
+
+DEFAULT_SIZES = [10000, 100000, 1000000]
+M_PER_DEG = 110700  # Meters per degree of latitude near the handler
+T0 = 1_700_000_000_000
+
+
+def time_updates(size, rows, ticks, rng):
+    """Best update time over several ticks"""
+    tracker = TrackFilter()
+    lat0, lon0 = config.BASE_COORDS
+    count = size if rows is None else len(rows)
+    best = float('inf')
+    for tick in range(ticks + 1):
+        lat = lat0 + rng.normal(0, 1e-4, count)
+        lon = lon0 + rng.normal(0, 1e-4, count)
+        start = time.perf_counter()
+        tracker.update(lat, lon, T0 + tick * 10_000, 10.0, rows)
+        if tick:
+            best = min(best, time.perf_counter() - start)
+    return best
+
+
+def false_alerts(cows, ticks, noise, smooth, rng):
+    """Transitions of stationary cows after the first evaluation"""
+    lat0, lon0 = config.FIXED_HUMAN_COORDS
+    distance = rng.uniform(60, 140, cows)
+    bearing = rng.uniform(0, 2 * np.pi, cows)
+    north, east = distance * np.cos(bearing), distance * np.sin(bearing)
+    m_per_deg_lon = M_PER_DEG * np.cos(np.radians(lat0))
+    
+    herd = HerdState(cows)
+    herd.resize(cows)
+    tracker = TrackFilter(origin=(lat0, lon0)) if smooth else None
+    engine = AlertEngine(confidence=config.ALERT_CONFIDENCE if smooth else 0.5)
+    engine.set_handler('human', (lat0, lon0))
+    
+    false = 0
+    for tick in range(ticks):
+        herd.lat[:cows] = lat0 + (north + rng.normal(0, noise, cows)) / M_PER_DEG
+        herd.lon[:cows] = lon0 + (east + rng.normal(0, noise, cows)) / m_per_deg_lon
+        herd.timestamp_ms[:cows] = T0 + tick * 10_000
+        if tracker is not None:
+            tracker.smooth_herd(herd, noise)
+        herd.invalidate()
+        transitions = engine.evaluate(herd)['transitions']
+        if tick:
+            false += len(transitions)
+    wrong = np.count_nonzero((engine.status == 1) != (distance > config.DISTANCE_THRESHOLD))
+    return false, wrong
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--ticks', type=int, default=5)
+    parser.add_argument('--cows', type=int, default=10000, help='Herd size of the false alert run')
+    parser.add_argument('--alert-ticks', type=int, default=60, help='Ticks of the false alert run')
+    parser.add_argument('--noise', type=float, default=15.0, help='Position noise in meters (1 sigma)')
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+    
+    print(f"{'tracks':>10} {'updated':>10} {'ms':>9} {'tracks/ms':>10}")
+    for size in args.sizes:
+        for rows in (None, np.sort(rng.choice(size, size // 10, replace=False))):
+            seconds = time_updates(size, rows, args.ticks, rng)
+            updated = size if rows is None else len(rows)
+            print(f"{size:>10} {updated:>10} {seconds * 1000:>9.2f} {updated / seconds / 1000:>10.0f}")
+    
+    print()
+    print(f"{args.cows} stationary cows, {args.alert_ticks} ticks, {args.noise:g} m noise")
+    print(f"{'positions':>10} {'false transitions':>18} {'misclassified at end':>21}")
+    for smooth in (False, True):
+        false, wrong = false_alerts(args.cows, args.alert_ticks, args.noise, smooth, np.random.default_rng(1))
+        print(f"{'smoothed' if smooth else 'raw':>10} {false:>18} {wrong:>21}")
+
+
+if __name__ == '__main__':
+    main()
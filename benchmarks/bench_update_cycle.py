@@ -0,0 +1,110 @@
+"""
+Benchmark for the herd evaluation stage of MonitoringSystem.perform_update_cycle
+
+Compares the per-cow cost of the original path (geodesic loop in
+calculate_cow_distances, per-cow determine_alert_status, then a second
+geodesic loop in get_distance_status_summary) with the fused evaluate_herd
+stage, at 10, 1k, 100k and 1M cows.
+
+The original path costs the same per cow at every herd size, so by default it
+is timed on at most --legacy-sample cows and reported per cow; pass
+--full-legacy to time it on the whole herd (1M cows takes minutes).
+
+Usage:
+    python benchmarks/bench_update_cycle.py [--sizes 10 1000 100000 1000000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from geopy.distance import geodesic
+
+import config
+from distance import determine_alert_status, evaluate_herd
+
+DEFAULT_SIZES = [10, 1000, 100000, 1000000]
+
+
+def make_cow_data(num_cows, human_pos, seed=42):
+    """Generate cow dictionaries scattered within ~200 m of the human"""
+    rng = random.Random(seed)
+    return [
+        {
+            'id': i + 1,
+            'lat': human_pos[0] + rng.uniform(-0.002, 0.002),
+            'lon': human_pos[1] + rng.uniform(-0.002, 0.002),
+            'rssi': round(rng.uniform(config.RSSI_MIN, config.RSSI_MAX), 1)
+        }
+        for i in range(num_cows)
+    ]
+
+
+def legacy_evaluate(human_pos, cow_data):
+    """The original update cycle: two geodesic passes and a discarded detail list"""
+    distances = [geodesic(human_pos, (cow['lat'], cow['lon'])).meters for cow in cow_data]
+    for cow, distance in zip(cow_data, distances):
+        cow['distance'] = distance
+        cow['status'] = determine_alert_status(distance)
+    
+    # get_distance_status_summary recomputed everything
+    details = []
+    alerts = 0
+    for i, cow in enumerate(cow_data):
+        distance = geodesic(human_pos, (cow['lat'], cow['lon'])).meters
+        status = determine_alert_status(distance)
+        alerts += status == 'alert'
+        details.append({
+            'id': i + 1,
+            'position': (cow['lat'], cow['lon']),
+            'rssi': cow['rssi'],
+            'distance': round(distance, 2),
+            'status': status
+        })
+    return alerts
+
+
+def time_call(func, *args, repeat=3):
+    """Return the best wall-clock time of several runs"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--legacy-sample', type=int, default=10000,
+                        help='Maximum number of cows to time the original path on')
+    parser.add_argument('--full-legacy', action='store_true',
+                        help='Time the original path on the full herd')
+    args = parser.parse_args()
+    
+    human_pos = config.FIXED_HUMAN_COORDS
+    print(f"{'cows':>10} {'before us/cow':>15} {'after us/cow':>14} {'speedup':>9}")
+    
+    for size in args.sizes:
+        cow_data = make_cow_data(size, human_pos)
+        repeat = 3 if size <= 100000 else 1
+        
+        legacy_size = size if args.full_legacy else min(size, args.legacy_sample)
+        legacy_cows = cow_data[:legacy_size]
+        before = time_call(legacy_evaluate, human_pos, legacy_cows, repeat=repeat) / legacy_size
+        after = time_call(evaluate_herd, human_pos, cow_data, repeat=repeat) / size
+        
+        marker = '' if legacy_size == size else '*'
+        print(f"{size:>10} {before * 1e6:>14.2f}{marker or ' '} {after * 1e6:>14.3f} {before / after:>8.1f}x")
+    
+    if not args.full_legacy and any(size > args.legacy_sample for size in args.sizes):
+        print(f"* measured on the first {args.legacy_sample} cows (per-cow cost is size independent)")
+
+
+if __name__ == '__main__':
+    main()
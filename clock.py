@@ -0,0 +1,50 @@
+"""
+Tick clock for NavIC + LoRa monitoring system
+Reads the clocks once per update cycle and formats ISO timestamps only on demand
+"""
+
+import time
+from datetime import datetime
+from functools import lru_cache
+
+
+def now_ms():
+    """Current time in epoch milliseconds"""
+    return time.time_ns() // 1_000_000
+
+
+@lru_cache(maxsize=1024)
+def iso_timestamp(timestamp_ms):
+    """ISO string for an epoch-ms timestamp (cows in one tick share a value)"""
+    return datetime.fromtimestamp(timestamp_ms / 1000).isoformat()
+
+
+class Tick:
+    """
+    Clock readings of one update cycle
+    
+    Taken once when the cycle starts, so every cow, the handler and the
+    payload header of a cycle carry the same epoch-ms timestamp. Durations
+    use the monotonic reading. ISO strings are only formatted when a
+    payload asks for one, and then once per tick.
+    """
+    
+    __slots__ = ('timestamp_ms', 'monotonic')
+    
+    def __init__(self, timestamp_ms=None, monotonic=None):
+        self.timestamp_ms = now_ms() if timestamp_ms is None else int(timestamp_ms)
+        self.monotonic = time.monotonic() if monotonic is None else monotonic
+    
+    @property
+    def iso(self):
+        """ISO string of the tick time"""
+        return iso_timestamp(self.timestamp_ms)
+    
+    @property
+    def datetime(self):
+        """Tick time as a naive local datetime"""
+        return datetime.fromtimestamp(self.timestamp_ms / 1000)
+    
+    def elapsed(self, since):
+        """Seconds from a time.monotonic() reading to this tick"""
+        return self.monotonic - since
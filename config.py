@@ -12,6 +12,31 @@ MAX_RETRY_ATTEMPTS = 5  # Connection retry limit
 DISTANCE_THRESHOLD = 100  # Alert distance in meters
 RSSI_REFERENCE = -40  # RSSI at 1 meter (dBm)
 PATH_LOSS_EXPONENT = 2.7  # Signal propagation factor
+PATH_LOSS_MODEL_FILE = None  # Calibrated path-loss model fitted with `python path_loss.py`; reloaded when it changes
+PATH_LOSS_RSSI_RANGE = (-150, 0)  # RSSI span of the path-loss lookup tables (dBm, 0.1 dB steps)
+
+# Herd groups: each handler looks after one group, each group has its own alert distance
+DEFAULT_GROUP = 'default'  # Group for cows and handlers without an explicit assignment
+GROUP_THRESHOLDS = {}  # Alert distance per group in meters, e.g. {'dairy': 80}
+
+# Alert history store
+ALERT_HISTORY_BUCKET_SECONDS = 60  # Width of a history time bucket
+ALERT_HISTORY_RETENTION_SECONDS = 7 * 24 * 3600  # Alerts older than this are evicted
+ALERT_HISTORY_SPILL_DIR = None  # Directory for evicted alerts (None = discard them)
+
+# Track log (position history)
+TRACK_LOG_ENABLED = False  # Append every tick's herd positions to the track log
+TRACK_LOG_DIR = 'track_data'  # Directory of track log segments
+TRACK_SEGMENT_SECONDS = 3600  # Time span of one track log segment
+
+# Historical playback
+PLAYBACK_CELL_PX = 8  # Screen pixels per decimation cell at the client's zoom level
+PLAYBACK_MAX_FRAMES = 2000  # Maximum snapshots returned by one history request
+PLAYBACK_MAX_ROWS = 500000  # Maximum cow rows (after decimation) in one history response
+PLAYBACK_MAX_WAIT = 5  # Longest pause between playback frames in seconds
+
+# Spatial index settings
+SPATIAL_CELL_SIZE = 50  # Grid cell size in meters
 
 # Visualization settings
 MAP_ZOOM_LEVEL = 15  # Initial map zoom
@@ -35,10 +60,89 @@ COW_MOVEMENT_RANGE = 0.002  # Degrees of movement variation for cows
 RSSI_MIN = -120  # Minimum RSSI value (dBm)
 RSSI_MAX = -30   # Maximum RSSI value (dBm)
 
+# Simulation engine settings
+NUM_COWS = 2  # Number of simulated collars per tick
+SIMULATION_BATCH_MODE = False  # Set to True to use the vectorized NumPy simulation engine
+SIMULATION_SEED = None  # Seed for the batch engine's random generator (None = random)
+
+# Broadcast delta encoding
+DELTA_ENCODING_ENABLED = True  # Send keyframes + diffs instead of the full payload every tick
+DELTA_KEYFRAME_INTERVAL = 10  # Updates between full keyframes
+DELTA_COORD_QUANTUM = 1e-6  # Coordinate quantization step in degrees (~0.11 m)
+DELTA_MOVE_THRESHOLD = 1.0  # Minimum movement in meters before a cow is resent
+
+# Viewport filtering: clients registering their map bounds get only the
+# visible tiles, as grid clusters when zoomed out
+VIEWPORT_FILTERING_ENABLED = True  # Ask dashboards to register their viewport
+VIEWPORT_MAX_TILES = 64  # Tiles per viewport before coarser tiles are used
+VIEWPORT_MAX_ZOOM = 22  # Highest zoom level accepted from clients
+CLUSTER_MAX_ZOOM = 17  # Zoom levels below this send clusters for crowded tiles
+CLUSTER_GRID = 4  # Cluster cells per tile side (64 px cells for 256 px tiles)
+CLUSTER_TILE_LIMIT = 50  # Tiles with at most this many cows always send individual cows
+
+# Heatmap tiles
+TILE_CACHE_SIZE = 2048  # Rendered tiles kept in the LRU cache
+HEATMAP_RADIUS_PX = 6  # Blur radius of a cow in screen pixels
+HEATMAP_SATURATION = 50  # Cows per blur area at which the colour ramp tops out
+
+# Update scheduling
+SCHEDULER_MODE = 'interval'  # 'interval' (a cycle every UPDATE_INTERVAL) or 'event' (a cycle when updates arrive; needs DATA_SOURCE = 'ingest')
+SCHEDULER_MAX_LATENCY = 0.25  # Event mode: longest an update waits for others to batch with, in seconds
+SCHEDULER_MAX_BATCH = 10000  # Event mode: pending updates that start a cycle straight away
+SCHEDULER_IDLE_INTERVAL = UPDATE_INTERVAL  # Event mode: seconds between heartbeat cycles without updates
+ALERT_LATENCY_SAMPLES = 10000  # Recent alert latencies (report time to broadcast) kept for percentiles
+
+# Sharded evaluation
+SHARD_WORKERS = 0  # Worker processes evaluating the herd in shards (0 = evaluate in the server process)
+
+# Position data source
+DATA_SOURCE = 'simulation'  # 'simulation' (PositionSimulator) or 'ingest' (LoRa gateway / NMEA packets)
+
+# Packet ingestion (DATA_SOURCE = 'ingest')
+INGEST_HOST = '0.0.0.0'  # Interface the ingestion listeners bind to
+INGEST_UDP_PORT = 1700  # Semtech packet forwarder uplinks, compact binary frames and NMEA datagrams
+INGEST_TCP_PORT = 10110  # Newline-delimited NMEA sentences and rxpk JSON
+INGEST_QUEUE_SIZE = 200000  # Decoded uplinks buffered between the listeners and the update cycle
+INGEST_BATCH_SIZE = 1000  # Uplinks the UDP listener collects before queueing a batch
+INGEST_FLUSH_MS = 20  # Longest a partial UDP batch waits before being queued
+INGEST_TCP_PUT_TIMEOUT = 5  # Seconds a TCP sender is stalled on a full queue before its data is dropped
+INGEST_UDP_RCVBUF = 4 * 1024 * 1024  # Kernel receive buffer requested for the UDP socket
+
+# Instrumentation (/metrics)
+LOG_COW_SAMPLE = 100  # Log every N-th per-cow alert transition, at DEBUG level only
+EMIT_LATENCY_SAMPLE = 0.1  # Share of stream frames dashboards acknowledge, for emit latencies
+
 # Web server settings
 HOST = 'localhost'
 PORT = 5000
 DEBUG = True
+ASYNC_MODE = 'threading'  # 'threading' (thread per connection) or 'eventlet' (one event loop, needs eventlet installed)
+MAX_CONNECTIONS = 20000  # Concurrent connection cap in eventlet mode
+
+# Track smoothing (tracking.py)
+TRACK_FILTER_ENABLED = False  # Smooth cow positions with a per-cow constant-velocity Kalman filter
+TRACK_PROCESS_NOISE = 0.001  # White acceleration noise density (m^2/s^3); higher follows turns faster
+TRACK_INITIAL_SPEED_SIGMA = 1.0  # Speed uncertainty of a new track (m/s)
+GNSS_FIX_SIGMA = 5.0  # Position error of a collar GNSS fix (m, 1 sigma per axis)
+RSSI_SHADOWING_SIGMA = 4.0  # Log-normal shadowing of RSSI readings (dB)
+ALERT_CONFIDENCE = 0.9  # Probability beyond (or within) the threshold needed to change a cow's status
+
+# Scale-out: server processes sharing broadcasts through a message queue
+MESSAGE_QUEUE = None  # Redis-protocol pub/sub URL, e.g. 'redis://localhost:6379'; None for a single process
+MESSAGE_QUEUE_CHANNEL = 'navic-lora'  # Pub/sub channel shared by the processes
+RUN_MONITORING = True  # False for web workers that only serve clients from the message queue
+PRESENCE_INTERVAL = 1.0  # Seconds between client count reports of each process
+
+# Multilateration: cows located from several gateways (multilateration.py)
+GATEWAYS = {}  # Gateway name -> (latitude, longitude) of every gateway
+MULTILAT_MODE = 'rssi'  # Ranges from 'rssi' (path-loss model) or 'tdoa' (arrival times, needs synchronized gateways)
+MULTILAT_ITERATIONS = 10  # Maximum Gauss-Newton iterations per batch
+MULTILAT_MIN_GATEWAYS = 3  # Gateways that must hear a cow for a valid fix
+MULTILAT_MAX_RESIDUAL = 3.0  # Largest RMS residual (in expected errors) of a valid fix
+TDOA_TIMING_SIGMA_NS = 100  # Arrival timestamp error of a gateway (ns, 1 sigma)
+SIMULATION_GATEWAYS = 0  # Simulated gateways around the base for multilateration (0 = single-reading positions)
+SIMULATION_GATEWAY_RADIUS = 300  # Distance of the simulated gateways from the base (m) when GATEWAYS is empty
+SIMULATION_COW_SPEED = 0.5  # Random-walk speed of simulated ground-truth cows (m/s)
 
 # Fixed position mode
 FIXED_POSITION_MODE = True  # Set to True to keep human at fixed location
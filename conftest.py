@@ -0,0 +1,47 @@
+"""
+Shared fixtures for the test suite
+"""
+import numpy as np
+import pytest
+
+import config
+from herd_state import HerdState
+
+METERS_PER_DEG_LAT = 110574.0  # Latitude degree length near config.FIXED_HUMAN_COORDS
+
+
+@pytest.fixture
+def make_herd():
+    """
+    Factory of herds around config.FIXED_HUMAN_COORDS
+    
+    make_herd(num_cows, spread=0.01, seed=0) scatters cows uniformly within
+    spread degrees of the center (normally with sigma spread if normal=True).
+    north_m=[...] instead places one cow per offset, that many meters north
+    of the center. rssi=(low, high) draws RSSI in 0.1 dB steps. Pass rng to
+    continue a random stream and herd to refill an existing herd (e.g. once
+    per tick).
+    """
+    def make(num_cows=None, spread=0.01, seed=0, rng=None, normal=False, north_m=None, rssi=None, herd=None):
+        center = config.FIXED_HUMAN_COORDS
+        rng = np.random.default_rng(seed) if rng is None else rng
+        num_cows = len(north_m) if north_m is not None else num_cows
+        if herd is None:
+            herd = HerdState(capacity=num_cows)
+        herd.resize(num_cows)
+        
+        if north_m is not None:
+            herd.lat[:num_cows] = center[0] + np.asarray(north_m, dtype=np.float64) / METERS_PER_DEG_LAT
+            herd.lon[:num_cows] = center[1]
+        elif normal:
+            herd.lat[:num_cows] = center[0] + rng.normal(0, spread, num_cows)
+            herd.lon[:num_cows] = center[1] + rng.normal(0, spread, num_cows)
+        else:
+            herd.lat[:num_cows] = center[0] + rng.uniform(-spread, spread, num_cows)
+            herd.lon[:num_cows] = center[1] + rng.uniform(-spread, spread, num_cows)
+        if rssi is not None:
+            herd.rssi[:num_cows] = np.round(rng.uniform(rssi[0], rssi[1], num_cows), 1)
+        herd.positions_updated()
+        return herd
+    
+    return make
@@ -0,0 +1,313 @@
+"""
+Columnar herd state store for NavIC + LoRa monitoring system
+Keeps per-cow data in preallocated NumPy columns instead of per-cow dicts
+"""
+
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy as np
+import config
+from clock import iso_timestamp
+from distance import ALERT_STATUSES, assess_signal_quality, evaluate_distances_batch
+from path_loss import active_table
+
+
+# Status code for cows that have not been evaluated against a human position yet
+STATUS_UNKNOWN = 255
+
+# Column name -> dtype; 41 bytes per cow in total
+HERD_COLUMNS = {
+    'ids': np.uint32,  # Collar ids, unsigned 32-bit like the uplink packets
+    'lat': np.float64,
+    'lon': np.float64,
+    'rssi': np.float32,
+    'distance': np.float32,
+    'status': np.uint8,
+    'timestamp_ms': np.int64,
+    'accuracy': np.float32  # 1-sigma position error (m) of smoothed tracks, 0 if unknown
+}
+
+
+class HerdState:
+    """Struct-of-arrays storage for herd positions, RSSI, distances and statuses"""
+    
+    def __init__(self, capacity=2):
+        self.size = 0
+        self.capacity = 0
+        self._allocate(max(1, capacity))
+    
+    def _allocate(self, capacity):
+        """Allocate (or grow) the column buffers, keeping existing rows"""
+        for name, dtype in HERD_COLUMNS.items():
+            column = np.zeros(capacity, dtype=dtype)
+            if self.size:
+                column[:self.size] = getattr(self, name)[:self.size]
+            setattr(self, name, column)
+        self.status[self.size:] = STATUS_UNKNOWN
+        self.capacity = capacity
+    
+    def resize(self, size):
+        """
+        Set the number of cows in the herd
+        
+        Buffers only grow (geometrically), so a steady-state tick with an
+        unchanged herd size does not allocate. New rows get sequential ids.
+        
+        Args:
+            size: Number of cows
+        """
+        if size > self.capacity:
+            self._allocate(max(size, 2 * self.capacity))
+        if size > self.size:
+            self.ids[self.size:size] = np.arange(self.size + 1, size + 1, dtype=np.uint32)
+            self.status[self.size:size] = STATUS_UNKNOWN
+        self.size = size
+    
+    def positions_updated(self, rows=None):
+        """
+        Record that positions were written, for all rows or just some
+        
+        Marks distance/status as stale.
+        
+        Args:
+            rows: Array of changed row numbers (default: every row)
+        """
+        self.invalidate()
+    
+    def invalidate(self):
+        """Mark distance/status columns as stale after positions change"""
+        self.status[:self.size] = STATUS_UNKNOWN
+    
+    def evaluate(self, human_pos, threshold=None, method='vincenty'):
+        """
+        Compute distance and alert status columns against a human position
+        
+        Args:
+            human_pos: Tuple of (latitude, longitude) for human position
+            threshold: Safety threshold in meters (default from config)
+            method: Accuracy mode, see distance.DISTANCE_METHODS
+        
+        Returns:
+            Dictionary with alert/safe counts and min/max distance
+        """
+        n = self.size
+        batch = evaluate_distances_batch(human_pos, self.lat[:n], self.lon[:n], threshold, method)
+        self.distance[:n] = batch['distances']
+        self.status[:n] = batch['status_codes']
+        
+        return {
+            'human_position': human_pos,
+            'total_cows': n,
+            'alerts_active': batch['alerts_active'],
+            'cows_safe': batch['cows_safe'],
+            'max_distance': round(batch['max_distance'], 2),
+            'min_distance': round(batch['min_distance'], 2)
+        }
+    
+    def view(self):
+        """Return a read-only view of the live columns"""
+        return HerdView(self)
+    
+    def nbytes_per_cow(self):
+        """Bytes of column storage used per cow"""
+        return sum(np.dtype(dtype).itemsize for dtype in HERD_COLUMNS.values())
+
+
+def shared_layout(capacity):
+    """
+    Byte offsets of the columns in a shared herd table
+    
+    Args:
+        capacity: Rows per column
+    
+    Returns:
+        Tuple of ({column name: offset}, total size in bytes); columns start
+        on 64-byte boundaries
+    """
+    offsets = {}
+    offset = 0
+    for name, dtype in HERD_COLUMNS.items():
+        offsets[name] = offset
+        offset += -(-capacity * np.dtype(dtype).itemsize // 64) * 64
+    return offsets, max(offset, 64)
+
+
+def shared_columns(buffer, capacity):
+    """
+    Column arrays over a shared herd table
+    
+    Args:
+        buffer: Buffer of the table (SharedMemory.buf)
+        capacity: Rows per column
+    
+    Returns:
+        Dictionary of column name -> NumPy array backed by the buffer
+    """
+    offsets, _ = shared_layout(capacity)
+    return {name: np.ndarray(capacity, dtype=dtype, buffer=buffer, offset=offsets[name])
+            for name, dtype in HERD_COLUMNS.items()}
+
+
+class SharedHerdState(HerdState):
+    """
+    HerdState whose columns live in one multiprocessing.shared_memory block
+    
+    Worker processes attach to the block by name (see table()) and read or
+    write the columns in place, so nothing is pickled. Growing the herd
+    moves it to a new block; the old one is unlinked, and workers attach to
+    the new name on their next task.
+    """
+    
+    def __init__(self, capacity=2):
+        self._shm = None
+        self._retired = []  # Blocks still referenced by old views
+        super().__init__(capacity)
+    
+    def _allocate(self, capacity):
+        _, nbytes = shared_layout(capacity)
+        shm = shared_memory.SharedMemory(create=True, size=nbytes)
+        columns = shared_columns(shm.buf, capacity)
+        for name, column in columns.items():
+            column[:] = 0
+            if self.size:
+                column[:self.size] = getattr(self, name)[:self.size]
+            setattr(self, name, column)
+        self.status[self.size:] = STATUS_UNKNOWN
+        self.capacity = capacity
+        
+        previous, self._shm = self._shm, shm
+        if previous is not None:
+            previous.unlink()
+            self._retired.append(previous)
+        self._close_retired()
+    
+    def _close_retired(self):
+        """Close old blocks once no view of them is left"""
+        still_open = []
+        for shm in self._retired:
+            try:
+                shm.close()
+            except BufferError:
+                still_open.append(shm)
+        self._retired = still_open
+    
+    def table(self):
+        """
+        Location of the columns for worker processes
+        
+        Returns:
+            Tuple of (shared memory name, capacity, size)
+        """
+        return self._shm.name, self.capacity, self.size
+    
+    def close(self):
+        """Release and unlink the shared memory; the herd is unusable afterwards"""
+        if self._shm is None:
+            return
+        shm, self._shm = self._shm, None
+        for name in HERD_COLUMNS:
+            setattr(self, name, None)
+        shm.unlink()
+        self._retired.append(shm)
+        self._close_retired()
+
+
+def create_herd_state(capacity=2):
+    """
+    Herd state for a position source
+    
+    Args:
+        capacity: Initial capacity
+    
+    Returns:
+        SharedHerdState when sharded evaluation is enabled
+        (config.SHARD_WORKERS > 0), else HerdState. Shard workers only
+        attach to the server's table, so in a child process (which imports
+        the main module again when started with spawn) this is a HerdState.
+    """
+    if config.SHARD_WORKERS and multiprocessing.parent_process() is None:
+        return SharedHerdState(capacity)
+    return HerdState(capacity)
+
+
+class HerdView:
+    """
+    Read-only sequence over a HerdState
+    
+    Column attributes are non-writeable NumPy views of the live buffers, so
+    they reflect later ticks; call to_dicts() to take a snapshot. Indexing
+    materializes the per-cow dictionary used by the rest of the system.
+    """
+    
+    def __init__(self, state):
+        n = state.size
+        for name in HERD_COLUMNS:
+            column = getattr(state, name)[:n]
+            column.flags.writeable = False
+            setattr(self, name, column)
+    
+    def __len__(self):
+        return len(self.ids)
+    
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('herd index out of range')
+        
+        rssi = round(float(self.rssi[index]), 1)
+        cow = {
+            'id': int(self.ids[index]),
+            'lat': float(self.lat[index]),
+            'lon': float(self.lon[index]),
+            'rssi': rssi,
+            'timestamp': iso_timestamp(int(self.timestamp_ms[index])),
+            'signal_quality': assess_signal_quality(rssi)
+        }
+        
+        # Same rule as to_dicts: only accuracies that survive rounding
+        accuracy = round(float(self.accuracy[index]), 1)
+        if accuracy > 0:
+            cow['accuracy'] = accuracy
+        
+        status = int(self.status[index])
+        if status != STATUS_UNKNOWN:
+            cow['distance'] = float(self.distance[index])
+            cow['status'] = ALERT_STATUSES[status]
+        
+        return cow
+    
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+    
+    def positions(self):
+        """List of (latitude, longitude) tuples"""
+        return list(zip(self.lat.tolist(), self.lon.tolist()))
+    
+    def to_dicts(self):
+        """Materialize every cow as a dictionary"""
+        rssi = np.round(self.rssi.astype(np.float64), 1)
+        columns = zip(
+            self.ids.tolist(), self.lat.tolist(), self.lon.tolist(), rssi.tolist(),
+            self.timestamp_ms.tolist(), active_table().signal_qualities(rssi),
+            np.round(self.accuracy.astype(np.float64), 1).tolist(), self.distance.tolist(), self.status.tolist()
+        )
+        
+        cows = []
+        for cow_id, lat, lon, cow_rssi, timestamp_ms, quality, accuracy, distance, status in columns:
+            cow = {
+                'id': cow_id,
+                'lat': lat,
+                'lon': lon,
+                'rssi': cow_rssi,
+                'timestamp': iso_timestamp(timestamp_ms),
+                'signal_quality': quality
+            }
+            if accuracy > 0:
+                cow['accuracy'] = accuracy
+            if status != STATUS_UNKNOWN:
+                cow['distance'] = distance
+                cow['status'] = ALERT_STATUSES[status]
+            cows.append(cow)
+        return cows
@@ -0,0 +1,833 @@
+"""
+Packet ingestion for NavIC + LoRa monitoring system
+UDP/TCP listeners for LoRa gateway uplinks and NMEA/NavIC fixes, decoded
+into bounded batch queues and applied to a columnar herd state, plus a
+replay gateway that sends recorded or simulated uplinks at a fixed rate
+"""
+
+import base64
+import json
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+import numpy as np
+import config
+from clock import Tick, iso_timestamp
+from herd_state import create_herd_state
+from tracking import TrackFilter
+from track_log import TRACK_COORD_SCALE
+
+
+# Decoded collar uplink, one per cow report
+PACKET_DTYPE = np.dtype([
+    ('cow_id', '<u4'),
+    ('lat', '<f8'),
+    ('lon', '<f8'),
+    ('rssi', '<f4'),
+    ('timestamp_ms', '<i8')
+])
+
+# Application payload of a collar uplink: cow id and position in 1e-7 degrees
+COLLAR_PAYLOAD = struct.Struct('<Iii')
+
+# Semtech packet forwarder protocol (version 2) datagram header
+SEMTECH_VERSION = 2
+SEMTECH_PUSH_DATA = 0x00
+SEMTECH_PUSH_ACK = 0x01
+SEMTECH_HEADER_SIZE = 12  # Version, token, identifier, gateway EUI
+
+# Compact binary uplink frame: header, then `count` records
+BINARY_MAGIC = b'LRB1'
+BINARY_HEADER = struct.Struct('<4sHq')  # Magic, record count, gateway time in epoch ms
+BINARY_RECORD_DTYPE = np.dtype([
+    ('cow_id', '<u4'),
+    ('lat', '<i4'),
+    ('lon', '<i4'),
+    ('rssi_x10', '<i2')
+])
+
+# NMEA talker id -> positioning system reported for the handler
+NMEA_TALKERS = {
+    'GI': 'NavIC',
+    'GP': 'GPS',
+    'GN': 'GNSS',
+    'GL': 'GLONASS',
+    'GA': 'Galileo',
+    'GB': 'BeiDou',
+    'BD': 'BeiDou'
+}
+
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+
+def decode_rxpk(rxpk, timestamp_ms):
+    """
+    Decode the rxpk entries of a packet forwarder uplink
+    
+    Args:
+        rxpk: List of rxpk objects ('data' is the base64 collar payload,
+              'rssi' the signal strength in dBm)
+        timestamp_ms: Reception time in epoch milliseconds
+    
+    Returns:
+        Tuple of (PACKET_DTYPE array, number of malformed entries)
+    
+    Raises:
+        ValueError: If rxpk is not a list
+    """
+    if not isinstance(rxpk, list):
+        raise ValueError('rxpk is not a list')
+    records = np.empty(len(rxpk), dtype=PACKET_DTYPE)
+    n = 0
+    for packet in rxpk:
+        try:
+            payload = base64.b64decode(packet['data'], validate=True)
+            cow_id, lat, lon = COLLAR_PAYLOAD.unpack(payload)
+            rssi = float(packet['rssi'])
+        except (KeyError, TypeError, ValueError, struct.error):
+            continue
+        records[n] = (cow_id, lat / TRACK_COORD_SCALE, lon / TRACK_COORD_SCALE, rssi, timestamp_ms)
+        n += 1
+    return records[:n], len(rxpk) - n
+
+
+def decode_semtech(datagram, timestamp_ms):
+    """
+    Decode a Semtech PUSH_DATA datagram
+    
+    Args:
+        datagram: Datagram bytes
+        timestamp_ms: Reception time in epoch milliseconds
+    
+    Returns:
+        Tuple of (PACKET_DTYPE array, number of malformed rxpk entries);
+        status-only datagrams give an empty array
+    
+    Raises:
+        ValueError: If the datagram is not a valid PUSH_DATA
+    """
+    if (len(datagram) < SEMTECH_HEADER_SIZE or datagram[0] != SEMTECH_VERSION
+            or datagram[3] != SEMTECH_PUSH_DATA):
+        raise ValueError('not a PUSH_DATA datagram')
+    body = json.loads(datagram[SEMTECH_HEADER_SIZE:])
+    if not isinstance(body, dict):
+        raise ValueError('PUSH_DATA body is not a JSON object')
+    return decode_rxpk(body.get('rxpk') or [], timestamp_ms)
+
+
+def decode_binary(frame):
+    """
+    Decode a compact binary uplink frame
+    
+    Args:
+        frame: Frame bytes (BINARY_HEADER followed by BINARY_RECORD_DTYPE records)
+    
+    Returns:
+        PACKET_DTYPE array
+    
+    Raises:
+        ValueError: If the frame is truncated or has a bad magic
+    """
+    if len(frame) < BINARY_HEADER.size:
+        raise ValueError('truncated binary frame')
+    magic, count, timestamp_ms = BINARY_HEADER.unpack_from(frame)
+    if magic != BINARY_MAGIC or len(frame) != BINARY_HEADER.size + count * BINARY_RECORD_DTYPE.itemsize:
+        raise ValueError('bad binary frame')
+    raw = np.frombuffer(frame, dtype=BINARY_RECORD_DTYPE, count=count, offset=BINARY_HEADER.size)
+    records = np.empty(count, dtype=PACKET_DTYPE)
+    records['cow_id'] = raw['cow_id']
+    records['lat'] = raw['lat'] / TRACK_COORD_SCALE
+    records['lon'] = raw['lon'] / TRACK_COORD_SCALE
+    records['rssi'] = raw['rssi_x10'] / 10
+    records['timestamp_ms'] = timestamp_ms
+    return records
+
+
+def _nmea_degrees(value, hemisphere):
+    """Convert an NMEA (d)ddmm.mmmm field to signed degrees"""
+    raw = float(value)
+    degrees = int(raw // 100)
+    result = degrees + (raw - degrees * 100) / 60
+    return -result if hemisphere in ('S', 'W') else result
+
+
+def decode_nmea(sentence):
+    """
+    Decode an NMEA GGA or RMC sentence
+    
+    Args:
+        sentence: Sentence text, e.g. '$GIGGA,...*hh' (GI is the NavIC talker)
+    
+    Returns:
+        Tuple of (lat, lon, positioning system), or None for sentences
+        without a valid fix and other sentence types
+    
+    Raises:
+        ValueError: If the sentence is malformed or its checksum is wrong
+    """
+    sentence = sentence.strip()
+    if not sentence.startswith('$') or '*' not in sentence:
+        raise ValueError('not an NMEA sentence')
+    body, checksum = sentence[1:].rsplit('*', 1)
+    computed = 0
+    for char in body.encode('ascii'):
+        computed ^= char
+    if computed != int(checksum[:2], 16):
+        raise ValueError('NMEA checksum mismatch')
+    
+    fields = body.split(',')
+    talker, kind = fields[0][:2], fields[0][2:]
+    if kind == 'GGA' and len(fields) > 6:
+        valid = fields[6] not in ('', '0')
+        lat_field, lon_field = 2, 4
+    elif kind == 'RMC' and len(fields) > 6:
+        valid = fields[2] == 'A'
+        lat_field, lon_field = 3, 5
+    else:
+        return None
+    if not valid:
+        return None
+    lat = _nmea_degrees(fields[lat_field], fields[lat_field + 1])
+    lon = _nmea_degrees(fields[lon_field], fields[lon_field + 1])
+    return lat, lon, NMEA_TALKERS.get(talker, 'GNSS')
+
+
+def encode_rxpk(records):
+    """
+    Packet forwarder rxpk entries for uplink records
+    
+    Args:
+        records: PACKET_DTYPE array
+    
+    Returns:
+        List of rxpk dictionaries
+    """
+    lats = np.rint(records['lat'] * TRACK_COORD_SCALE).astype(np.int64).tolist()
+    lons = np.rint(records['lon'] * TRACK_COORD_SCALE).astype(np.int64).tolist()
+    return [
+        {
+            'rssi': round(rssi, 1),
+            'size': COLLAR_PAYLOAD.size,
+            'data': base64.b64encode(COLLAR_PAYLOAD.pack(cow_id, lat, lon)).decode('ascii')
+        }
+        for cow_id, lat, lon, rssi in zip(records['cow_id'].tolist(), lats, lons, records['rssi'].tolist())
+    ]
+
+
+def encode_semtech(records, gateway_eui=b'\x00' * 8, token=0):
+    """
+    Semtech PUSH_DATA datagram carrying uplink records
+    
+    Args:
+        records: PACKET_DTYPE array
+        gateway_eui: 8-byte gateway identifier
+        token: 16-bit random token
+    
+    Returns:
+        Datagram bytes
+    """
+    header = struct.pack('>BHB', SEMTECH_VERSION, token & 0xFFFF, SEMTECH_PUSH_DATA) + gateway_eui
+    body = json.dumps({'rxpk': encode_rxpk(records)}, separators=(',', ':'))
+    return header + body.encode('utf-8')
+
+
+def encode_binary(records, timestamp_ms=None):
+    """
+    Compact binary uplink frame
+    
+    Args:
+        records: PACKET_DTYPE array
+        timestamp_ms: Gateway time in epoch milliseconds (default: now)
+    
+    Returns:
+        Frame bytes
+    """
+    raw = np.empty(len(records), dtype=BINARY_RECORD_DTYPE)
+    raw['cow_id'] = records['cow_id']
+    raw['lat'] = np.rint(records['lat'] * TRACK_COORD_SCALE)
+    raw['lon'] = np.rint(records['lon'] * TRACK_COORD_SCALE)
+    raw['rssi_x10'] = np.rint(records['rssi'].astype(np.float64) * 10)
+    timestamp_ms = _now_ms() if timestamp_ms is None else int(timestamp_ms)
+    return BINARY_HEADER.pack(BINARY_MAGIC, len(raw), timestamp_ms) + raw.tobytes()
+
+
+def encode_nmea_gga(lat, lon, talker='GI', timestamp_ms=None):
+    """
+    NMEA GGA sentence for a position fix
+    
+    Args:
+        lat: Latitude in degrees
+        lon: Longitude in degrees
+        talker: Talker id (GI = NavIC)
+        timestamp_ms: Fix time in epoch milliseconds (default: now)
+    
+    Returns:
+        Sentence text with checksum, without line terminator
+    """
+    fix_time = time.gmtime((_now_ms() if timestamp_ms is None else timestamp_ms) / 1000)
+    lat_deg, lon_deg = int(abs(lat)), int(abs(lon))
+    body = ','.join([
+        f'{talker}GGA',
+        time.strftime('%H%M%S.00', fix_time),
+        f'{lat_deg:02d}{(abs(lat) - lat_deg) * 60:07.4f}', 'N' if lat >= 0 else 'S',
+        f'{lon_deg:03d}{(abs(lon) - lon_deg) * 60:07.4f}', 'E' if lon >= 0 else 'W',
+        '1', '08', '0.9', '920.0', 'M', '-86.3', 'M', '', ''
+    ])
+    checksum = 0
+    for char in body.encode('ascii'):
+        checksum ^= char
+    return f'${body}*{checksum:02X}'
+
+
+class RecordQueue(queue.Queue):
+    """
+    Queue of record batches bounded by the total number of records
+    
+    A batch is admitted while fewer than maxsize records are queued, so the
+    bound can be exceeded by at most one batch.
+    """
+    
+    def _init(self, maxsize):
+        super()._init(maxsize)
+        self.records = 0
+    
+    def _qsize(self):
+        return self.records
+    
+    def _put(self, item):
+        super()._put(item)
+        self.records += len(item)
+    
+    def _get(self):
+        item = super()._get()
+        self.records -= len(item)
+        return item
+
+
+class IngestPipeline:
+    """
+    Position source fed by LoRa gateways and NMEA receivers
+    
+    Listener threads decode packets as they arrive and queue them as batches
+    of PACKET_DTYPE records in a queue bounded by the number of records.
+    UDP gives no flow control, so batches that do not fit are dropped and
+    counted; the TCP listener blocks instead, which stops reading the socket
+    and lets TCP slow the sender down. The update cycle drains the queue
+    once per tick and applies the newest report of each cow to the herd in
+    one vectorized pass. get_current_herd() has the same layout as the
+    simulator's, so the pipeline can stand in for it.
+    """
+    
+    def __init__(self, host=None, udp_port=None, tcp_port=None, queue_size=None,
+                 batch_size=None, flush_ms=None):
+        """
+        Args:
+            host: Interface to listen on (default config.INGEST_HOST)
+            udp_port: UDP port, 0 for any free port, None for config.INGEST_UDP_PORT
+            tcp_port: TCP port, 0 for any free port, None for config.INGEST_TCP_PORT;
+                      False disables the TCP listener
+            queue_size: Maximum number of queued uplinks
+            batch_size: Uplinks per UDP batch
+            flush_ms: Longest wait before a partial UDP batch is queued
+        """
+        self.host = config.INGEST_HOST if host is None else host
+        self.udp_port = config.INGEST_UDP_PORT if udp_port is None else udp_port
+        self.tcp_port = config.INGEST_TCP_PORT if tcp_port is None else tcp_port
+        self.batch_size = config.INGEST_BATCH_SIZE if batch_size is None else batch_size
+        self.flush_ms = config.INGEST_FLUSH_MS if flush_ms is None else flush_ms
+        self.queue = RecordQueue(config.INGEST_QUEUE_SIZE if queue_size is None else queue_size)
+        
+        self.herd = create_herd_state(capacity=16)
+        self._ids = np.zeros(0, dtype=np.int64)  # Known cow ids, sorted
+        self._rows = np.zeros(0, dtype=np.int64)  # Herd row of each known id
+        self.tracker = TrackFilter() if config.TRACK_FILTER_ENABLED else None  # Smooths collar fixes
+        
+        default = config.FIXED_HUMAN_COORDS if config.FIXED_POSITION_MODE else config.BASE_COORDS
+        self.human = {'lat': default[0], 'lon': default[1], 'timestamp_ms': None, 'positioning_system': None}
+        self._fix = None  # Newest handler fix not yet applied
+        
+        self.stats = {
+            'received': 0,  # Datagrams and lines
+            'decoded': 0,  # Uplinks decoded
+            'queued': 0,  # Uplinks accepted into the queue
+            'dropped': 0,  # Uplinks dropped on a full queue
+            'malformed': 0,  # Undecodable datagrams, lines and rxpk entries
+            'fixes': 0,  # Handler fixes decoded
+            'applied': 0  # Uplinks written to the herd
+        }
+        self._lock = threading.Lock()
+        self._arrivals = threading.Condition(self._lock)  # Notified when updates are queued
+        self._pending_since = None  # Monotonic time of the oldest update not yet drained
+        self._stopping = threading.Event()
+        self._threads = []
+        self._udp_socket = None
+        self._tcp_server = None
+    
+    def _count(self, **deltas):
+        with self._lock:
+            for name, delta in deltas.items():
+                self.stats[name] += delta
+    
+    def snapshot_stats(self):
+        """Copy of the counters plus the current queue depth"""
+        with self._lock:
+            stats = dict(self.stats)
+        stats['queue_depth'] = self.queue.qsize()
+        return stats
+    
+    # -- Listeners --
+    
+    def start(self):
+        """Bind the listeners and start their threads"""
+        self._stopping.clear()
+        self._udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._udp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, config.INGEST_UDP_RCVBUF)
+        self._udp_socket.bind((self.host, self.udp_port))
+        self._udp_socket.settimeout(self.flush_ms / 1000)
+        self.udp_port = self._udp_socket.getsockname()[1]
+        self._spawn(self._serve_udp)
+        
+        if self.tcp_port is not False:
+            self._tcp_server = _TCPServer((self.host, self.tcp_port), _TCPHandler)
+            self._tcp_server.pipeline = self
+            self.tcp_port = self._tcp_server.server_address[1]
+            self._spawn(self._tcp_server.serve_forever, 0.1)
+    
+    def _spawn(self, target, *args):
+        thread = threading.Thread(target=target, args=args, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+    
+    def stop(self):
+        """Stop the listeners and close their sockets"""
+        self._stopping.set()
+        if self._tcp_server is not None:
+            self._tcp_server.shutdown()
+            self._tcp_server.server_close()
+            self._tcp_server = None
+        for thread in self._threads:
+            thread.join(timeout=2)
+        self._threads = []
+        if self._udp_socket is not None:
+            self._udp_socket.close()
+            self._udp_socket = None
+    
+    def _serve_udp(self):
+        """Receive datagrams, collecting uplinks into batches"""
+        sock = self._udp_socket
+        pending, pending_count, deadline = [], 0, None
+        while not self._stopping.is_set():
+            try:
+                datagram, address = sock.recvfrom(65535)
+            except socket.timeout:
+                datagram = None
+            except OSError:
+                break
+            
+            if datagram is not None:
+                try:
+                    if (len(datagram) >= SEMTECH_HEADER_SIZE and datagram[0] == SEMTECH_VERSION
+                            and datagram[3] == SEMTECH_PUSH_DATA):
+                        sock.sendto(datagram[:3] + bytes([SEMTECH_PUSH_ACK]), address)
+                    records = self.decode(datagram)
+                except Exception:
+                    # No datagram may end the listener; count it and go on
+                    self._count(received=1, malformed=1)
+                    records = None
+                if records is not None and len(records):
+                    if deadline is None:
+                        deadline = time.monotonic() + self.flush_ms / 1000
+                    pending.append(records)
+                    pending_count += len(records)
+            
+            if pending and (pending_count >= self.batch_size or time.monotonic() >= deadline):
+                self.enqueue(np.concatenate(pending) if len(pending) > 1 else pending[0], block=False)
+                pending, pending_count, deadline = [], 0, None
+    
+    def decode(self, data, timestamp_ms=None):
+        """
+        Decode one datagram or line in any supported format
+        
+        Uplinks are returned; handler fixes are kept for the next drain().
+        
+        Args:
+            data: Semtech PUSH_DATA datagram, compact binary frame, rxpk JSON
+                  object or NMEA sentence(s)
+            timestamp_ms: Reception time in epoch milliseconds (default: now)
+        
+        Returns:
+            PACKET_DTYPE array of uplinks, or None if nothing was decoded
+        """
+        timestamp_ms = _now_ms() if timestamp_ms is None else timestamp_ms
+        malformed = 0
+        records = None
+        try:
+            if data[:1] == b'$':
+                for line in data.decode('ascii').splitlines():
+                    if line.strip():
+                        self._set_fix(decode_nmea(line), timestamp_ms)
+            elif data[:4] == BINARY_MAGIC:
+                records = decode_binary(data)
+            elif data[:1] == b'{':
+                body = json.loads(data)
+                records, malformed = decode_rxpk(body.get('rxpk') or [], timestamp_ms)
+            else:
+                records, malformed = decode_semtech(data, timestamp_ms)
+        except (ValueError, TypeError, AttributeError, UnicodeDecodeError):
+            records, malformed = None, 1
+        
+        self._count(received=1, malformed=malformed, decoded=0 if records is None else len(records))
+        return records
+    
+    def _set_fix(self, fix, timestamp_ms):
+        if fix is None:
+            return
+        lat, lon, system = fix
+        with self._lock:
+            self._fix = {'lat': lat, 'lon': lon, 'timestamp_ms': timestamp_ms, 'positioning_system': system}
+            self.stats['fixes'] += 1
+            self._arrived()
+    
+    def enqueue(self, records, block=True, timeout=None):
+        """
+        Queue a batch of uplinks for the next drain()
+        
+        Args:
+            records: PACKET_DTYPE array
+            block: Wait for room in the queue instead of dropping the batch
+            timeout: Longest wait in seconds when blocking
+        
+        Returns:
+            True if queued, False if the batch was dropped
+        """
+        try:
+            self.queue.put(records, block=block, timeout=timeout)
+        except queue.Full:
+            self._count(dropped=len(records))
+            return False
+        with self._lock:
+            self.stats['queued'] += len(records)
+            self._arrived()
+        return True
+    
+    def _arrived(self):
+        """Wake wait_pending() callers; the lock must be held"""
+        if self._pending_since is None:
+            self._pending_since = time.monotonic()
+        self._arrivals.notify_all()
+    
+    def _pending(self):
+        return self.queue.qsize() + (self._fix is not None)
+    
+    def wait_pending(self, count, timeout):
+        """
+        Wait until updates are pending for the next drain()
+        
+        Args:
+            count: Number of pending updates (uplinks plus a handler fix) to wait for
+            timeout: Longest wait in seconds
+        
+        Returns:
+            Tuple of (pending updates, monotonic time the oldest of them
+            arrived or None)
+        """
+        with self._arrivals:
+            self._arrivals.wait_for(lambda: self._pending() >= count, timeout)
+            return self._pending(), self._pending_since
+    
+    # -- Update cycle side --
+    
+    def drain(self):
+        """
+        Apply every queued uplink and the newest handler fix to the herd
+        
+        Returns:
+            Number of uplinks applied
+        """
+        batches = []
+        while True:
+            try:
+                batches.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        with self._lock:
+            fix, self._fix = self._fix, None
+            if not self.queue.qsize():
+                self._pending_since = None  # Otherwise updates queued meanwhile keep their arrival time
+        if fix is not None:
+            self.human = fix
+        if not batches:
+            return 0
+        
+        records = np.concatenate(batches) if len(batches) > 1 else batches[0]
+        self._apply(records)
+        self._count(applied=len(records))
+        return len(records)
+    
+    def _apply(self, records):
+        """
+        Write the uplinks into the herd rows of their cows
+        
+        Without track smoothing the newest record of each cow wins; with it,
+        every record is fused into the cow's track, oldest first.
+        """
+        herd = self.herd
+        ids = records['cow_id'].astype(np.int64)
+        
+        if self.tracker is None:
+            # Later records win: first occurrence in reversed order, per id
+            _, last = np.unique(ids[::-1], return_index=True)
+            newest = len(ids) - 1 - last
+            ids, records = ids[newest], records[newest]
+            passes = [np.arange(len(ids))]
+        else:
+            # One pass per report rank, so each pass has a row at most once
+            order = np.lexsort((records['timestamp_ms'], ids))
+            sorted_ids = ids[order]
+            starts = np.flatnonzero(np.r_[True, sorted_ids[1:] != sorted_ids[:-1]])
+            rank = np.arange(len(ids)) - np.repeat(starts, np.diff(np.r_[starts, len(ids)]))
+            passes = [order[rank == r] for r in range(int(rank.max()) + 1)] if len(ids) else []
+        
+        rows, grown = self._herd_rows(ids)
+        for selected in passes:
+            batch, batch_rows = records[selected], rows[selected]
+            herd.lat[batch_rows] = batch['lat']
+            herd.lon[batch_rows] = batch['lon']
+            herd.rssi[batch_rows] = batch['rssi']
+            herd.timestamp_ms[batch_rows] = batch['timestamp_ms']
+            if self.tracker is not None:
+                self.tracker.smooth_herd(herd, config.GNSS_FIX_SIGMA, batch_rows)
+        
+        # New rows also need the spatial index resized, which a full update does
+        herd.positions_updated(None if grown else np.unique(rows))
+    
+    def _herd_rows(self, ids):
+        """
+        Herd rows of cow ids, appending rows for unknown cows
+        
+        Returns:
+            Tuple of (row per id, whether the herd grew)
+        """
+        herd = self.herd
+        unique_ids = np.unique(ids)
+        positions = np.searchsorted(self._ids, unique_ids)
+        found = positions < len(self._ids)
+        found[found] = self._ids[positions[found]] == unique_ids[found]
+        new_ids = unique_ids[~found]
+        if len(new_ids):
+            first = herd.size
+            herd.resize(first + len(new_ids))
+            herd.ids[first:herd.size] = new_ids
+            all_ids = np.concatenate([self._ids, new_ids])
+            all_rows = np.concatenate([self._rows, np.arange(first, herd.size)])
+            order = np.argsort(all_ids, kind='stable')
+            self._ids, self._rows = all_ids[order], all_rows[order]
+        return self._rows[np.searchsorted(self._ids, ids)], bool(len(new_ids))
+    
+    def get_current_herd(self, tick=None):
+        """
+        Drain the queue and get current positions
+        
+        Args:
+            tick: Tick of the update cycle (default: now)
+        
+        Returns:
+            Dictionary with the handler's latest fix and a read-only HerdView,
+            in the layout of PositionSimulator.get_current_herd()
+        """
+        tick = Tick() if tick is None else tick
+        self.drain()
+        human = self.human
+        return {
+            'human': {
+                'lat': human['lat'],
+                'lon': human['lon'],
+                'timestamp': tick.iso if human['timestamp_ms'] is None else iso_timestamp(human['timestamp_ms']),
+                'positioning_system': human['positioning_system'] or 'NavIC'
+            },
+            'cows': self.herd.view(),
+            'system_time': tick.iso,
+            'timestamp_ms': tick.timestamp_ms,
+            'update_interval': config.UPDATE_INTERVAL
+        }
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _TCPHandler(socketserver.StreamRequestHandler):
+    """Newline-delimited NMEA sentences and rxpk JSON from one sender"""
+    
+    def handle(self):
+        pipeline = self.server.pipeline
+        for line in self.rfile:
+            line = line.strip()
+            if not line:
+                continue
+            records = pipeline.decode(line)
+            if records is not None and len(records):
+                # Blocking here stops reading the socket: TCP backpressure
+                pipeline.enqueue(records, block=True, timeout=config.INGEST_TCP_PUT_TIMEOUT)
+            if pipeline._stopping.is_set():
+                break
+
+
+def simulated_source(num_cows, seed=None, interval_ms=1000):
+    """
+    Endless simulated uplinks: one report per cow per tick
+    
+    Args:
+        num_cows: Number of collars
+        seed: Seed for the random walk
+        interval_ms: Simulated time between ticks
+    
+    Yields:
+        PACKET_DTYPE arrays, one per tick
+    """
+    rng = np.random.default_rng(seed)
+    center = np.array(config.FIXED_HUMAN_COORDS)
+    lat = center[0] + rng.uniform(-0.001, 0.001, num_cows)
+    lon = center[1] + rng.uniform(-0.001, 0.001, num_cows)
+    timestamp_ms = _now_ms()
+    while True:
+        lat += rng.normal(0, config.COW_MOVEMENT_RANGE / 20, num_cows)
+        lon += rng.normal(0, config.COW_MOVEMENT_RANGE / 20, num_cows)
+        records = np.empty(num_cows, dtype=PACKET_DTYPE)
+        records['cow_id'] = np.arange(1, num_cows + 1)
+        records['lat'] = lat
+        records['lon'] = lon
+        records['rssi'] = np.round(rng.uniform(config.RSSI_MIN, config.RSSI_MAX, num_cows), 1)
+        records['timestamp_ms'] = timestamp_ms
+        timestamp_ms += interval_ms
+        yield records
+
+
+def track_log_source(reader, start_ms=None, end_ms=None):
+    """
+    Uplinks recorded in a track log, one batch per tick
+    
+    Args:
+        reader: TrackReader
+        start_ms: Window start in epoch milliseconds (default: start of the log)
+        end_ms: Window end in epoch milliseconds (default: end of the log)
+    
+    Yields:
+        PACKET_DTYPE arrays, one per recorded tick
+    """
+    time_range = reader.time_range()
+    if time_range is None:
+        return
+    start_ms = time_range[0] if start_ms is None else start_ms
+    end_ms = time_range[1] + 1 if end_ms is None else end_ms
+    for timestamp_ms, ticks in reader.ticks(start_ms, end_ms):
+        records = np.empty(len(ticks), dtype=PACKET_DTYPE)
+        records['cow_id'] = ticks['cow_id']
+        records['lat'] = ticks['lat'] / TRACK_COORD_SCALE
+        records['lon'] = ticks['lon'] / TRACK_COORD_SCALE
+        records['rssi'] = ticks['rssi_x10'] / 10
+        records['timestamp_ms'] = timestamp_ms
+        yield records
+
+
+class ReplayGateway:
+    """
+    Local stand-in for a LoRa gateway
+    
+    Sends the uplinks of a source (simulated_source, track_log_source or any
+    iterable of PACKET_DTYPE arrays) over UDP at a fixed rate, packed
+    several to a datagram, optionally interleaved with NavIC GGA fixes of
+    the handler.
+    """
+    
+    def __init__(self, host, port, source, rate, fmt='semtech', per_datagram=1,
+                 fix_interval=None, fix_position=None):
+        """
+        Args:
+            host: Ingestion host
+            port: Ingestion UDP port
+            source: Iterable of PACKET_DTYPE arrays
+            rate: Uplinks per second
+            fmt: 'semtech' (PUSH_DATA JSON) or 'binary' (compact frames)
+            per_datagram: Uplinks per datagram
+            fix_interval: Seconds between handler fixes (None: no fixes)
+            fix_position: (lat, lon) of the handler fixes (default: fixed coordinates)
+        """
+        if fmt not in ('semtech', 'binary'):
+            raise ValueError(f'unknown gateway format: {fmt}')
+        self.address = (host, port)
+        self.source = source
+        self.rate = float(rate)
+        self.fmt = fmt
+        self.per_datagram = max(1, int(per_datagram))
+        self.fix_interval = fix_interval
+        self.fix_position = config.FIXED_HUMAN_COORDS if fix_position is None else fix_position
+        self.sent = 0
+        self.datagrams = 0
+        self._stopped = threading.Event()
+    
+    def stop(self):
+        """Stop sending after the current datagram"""
+        self._stopped.set()
+    
+    def _datagrams(self):
+        token = 0
+        for records in self.source:
+            for start in range(0, len(records), self.per_datagram):
+                chunk = records[start:start + self.per_datagram]
+                if self.fmt == 'binary':
+                    yield len(chunk), encode_binary(chunk)
+                else:
+                    token = (token + 1) & 0xFFFF
+                    yield len(chunk), encode_semtech(chunk, token=token)
+    
+    def run(self, duration=None, max_packets=None):
+        """
+        Send uplinks until the source is exhausted, a limit is hit or stop() is called
+        
+        Args:
+            duration: Longest sending time in seconds
+            max_packets: Maximum number of uplinks
+        
+        Returns:
+            Dictionary with uplinks and datagrams sent, elapsed seconds and
+            the achieved rate
+        """
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        start = time.perf_counter()
+        next_fix = start
+        try:
+            for count, datagram in self._datagrams():
+                now = time.perf_counter()
+                if self._stopped.is_set() or (duration is not None and now - start >= duration):
+                    break
+                if max_packets is not None and self.sent >= max_packets:
+                    break
+                
+                # Pace on the cumulative schedule, so short sleeps average out
+                delay = start + self.sent / self.rate - now
+                if delay > 0:
+                    time.sleep(delay)
+                if self.fix_interval is not None and now >= next_fix:
+                    sock.sendto(encode_nmea_gga(*self.fix_position).encode('ascii') + b'\r\n', self.address)
+                    next_fix = now + self.fix_interval
+                
+                sock.sendto(datagram, self.address)
+                self.sent += count
+                self.datagrams += 1
+        finally:
+            sock.close()
+        
+        elapsed = time.perf_counter() - start
+        return {
+            'packets': self.sent,
+            'datagrams': self.datagrams,
+            'seconds': elapsed,
+            'rate': self.sent / elapsed if elapsed > 0 else 0.0
+        }
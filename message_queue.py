@@ -0,0 +1,384 @@
+"""
+Message queue scale-out for NavIC + LoRa monitoring system
+Lets one monitoring process and several web worker processes share Socket.IO
+broadcasts through a Redis-protocol pub/sub channel
+"""
+
+import argparse
+import pickle
+import socket
+import socketserver
+import threading
+import time
+from urllib.parse import urlparse
+
+import socketio
+import config
+
+
+def parse_queue_url(url):
+    """
+    Split a message queue URL into its connection settings
+    
+    Args:
+        url: 'redis://[:password@]host[:port][/db]' (the db has no effect on
+             pub/sub channels)
+    
+    Returns:
+        Tuple of (host, port, password)
+    """
+    parsed = urlparse(url)
+    if parsed.scheme not in ('redis', 'resp'):
+        raise ValueError(f'Unsupported message queue URL: {url}')
+    return parsed.hostname or 'localhost', parsed.port or 6379, parsed.password
+
+
+class RespConnection:
+    """Blocking connection speaking the Redis serialization protocol (RESP)"""
+    
+    def __init__(self, host, port, password=None, timeout=None):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile('rb')
+        if password:
+            self.command('AUTH', password)
+    
+    def send(self, *args):
+        """Send one command as an array of bulk strings"""
+        parts = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            if isinstance(arg, str):
+                arg = arg.encode()
+            parts.append(b'$%d\r\n' % len(arg))
+            parts.append(arg)
+            parts.append(b'\r\n')
+        self.sock.sendall(b''.join(parts))
+    
+    def read(self):
+        """Read one reply; error replies raise RuntimeError"""
+        line = self.reader.readline()
+        if not line.endswith(b'\r\n'):
+            raise ConnectionError('message queue connection closed')
+        kind, rest = line[:1], line[1:-2]
+        if kind == b'+':
+            return rest.decode()
+        if kind == b'-':
+            raise RuntimeError(f'message queue error: {rest.decode()}')
+        if kind == b':':
+            return int(rest)
+        if kind == b'$':
+            length = int(rest)
+            if length < 0:
+                return None
+            data = self.reader.read(length + 2)
+            if len(data) != length + 2:
+                raise ConnectionError('message queue connection closed')
+            return data[:-2]
+        if kind == b'*':
+            length = int(rest)
+            return None if length < 0 else [self.read() for _ in range(length)]
+        raise ConnectionError(f'invalid message queue reply: {line[:32]!r}')
+    
+    def command(self, *args):
+        """Send a command and return its reply"""
+        self.send(*args)
+        return self.read()
+    
+    def close(self):
+        try:
+            self.reader.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class QueueManager(socketio.PubSubManager):
+    """
+    Socket.IO client manager over a Redis-protocol pub/sub channel
+    
+    Works with a redis-server or the MessageBroker stand-in, without a Redis
+    client library. Every emit is published on the channel and each server
+    process delivers it to its own clients, so rooms span processes. Replies
+    to a client connected to this process skip the queue. Besides Socket.IO
+    traffic, processes can exchange their own messages: publish(method, ...)
+    reaches the handler registered with on(method, handler) in every process,
+    including the sender.
+    """
+    
+    name = 'resp'
+    
+    def __init__(self, url='redis://localhost:6379', channel='socketio', write_only=False, logger=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self.url = url
+        self.host, self.port, self.password = parse_queue_url(url)
+        self.published = 0  # Messages sent to the channel
+        self.received = 0  # Messages read from the channel
+        self._handlers = {}
+        self._publisher = None
+        self._publish_lock = threading.Lock()
+    
+    def _connect(self):
+        return RespConnection(self.host, self.port, self.password)
+    
+    def on(self, method, handler):
+        """
+        Register the handler of an application message
+        
+        Args:
+            method: Message name passed to publish()
+            handler: Callable taking the message dictionary (with 'host_id'
+                     set to the sending process), run on the listener task
+        """
+        self._handlers[method] = handler
+    
+    def publish(self, method, **fields):
+        """Send an application message to every process on the channel"""
+        self._publish(dict(fields, method=method, host_id=self.host_id))
+    
+    def emit(self, event, data, namespace=None, room=None, skip_sid=None, callback=None, **kwargs):
+        # Replies to a client of this process need not travel through the queue
+        if isinstance(room, str) and self.is_connected(room, namespace or '/'):
+            kwargs['ignore_queue'] = True
+        return super().emit(event, data, namespace=namespace, room=room, skip_sid=skip_sid,
+                            callback=callback, **kwargs)
+    
+    def _publish(self, data):
+        payload = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._publish_lock:
+            for attempt in range(2):
+                try:
+                    if self._publisher is None:
+                        self._publisher = self._connect()
+                    self._publisher.command('PUBLISH', self.channel, payload)
+                    self.published += 1
+                    return
+                except (OSError, RuntimeError) as e:
+                    if self._publisher is not None:
+                        self._publisher.close()
+                        self._publisher = None
+                    if attempt:
+                        self._get_logger().error(f'Cannot publish to message queue {self.url}: {e}')
+    
+    def _listen(self):
+        retry = 1
+        while True:
+            connection = None
+            try:
+                connection = self._connect()
+                connection.command('SUBSCRIBE', self.channel)
+                retry = 1
+                while True:
+                    reply = connection.read()
+                    if not isinstance(reply, list) or reply[0] != b'message':
+                        continue
+                    self.received += 1
+                    try:
+                        message = pickle.loads(reply[2])
+                    except Exception:
+                        self._get_logger().error('Dropped undecodable message queue message')
+                        continue
+                    handler = self._handlers.get(message.get('method'))
+                    if handler is None:
+                        yield message  # Socket.IO traffic, dispatched by PubSubManager
+                        continue
+                    try:
+                        handler(message)
+                    except Exception:
+                        self._get_logger().exception(f"Error handling queue message {message['method']}")
+            except (OSError, RuntimeError) as e:
+                self._get_logger().error(f'Message queue {self.url} unavailable ({e}), retrying in {retry}s')
+            finally:
+                if connection is not None:
+                    connection.close()
+            self.server.sleep(retry)
+            retry = min(retry * 2, 60)
+
+
+class ClusterPresence:
+    """
+    Connected clients and viewports of the server processes sharing a queue
+    
+    Each process reports its own count and viewport keys every
+    PRESENCE_INTERVAL seconds; reports older than ttl seconds, e.g. from a
+    stopped worker, no longer count.
+    """
+    
+    def __init__(self, host_id, ttl=None):
+        self.host_id = host_id
+        self.ttl = 3 * config.PRESENCE_INTERVAL if ttl is None else ttl
+        self._reports = {}  # host id -> (received at, clients, viewport keys)
+        self._lock = threading.Lock()
+    
+    def update(self, host_id, clients, viewports=(), now=None):
+        """Record a process's report"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._reports[host_id] = (now, clients, frozenset(viewports))
+    
+    def _live(self, now):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            for host_id in [h for h, report in self._reports.items() if now - report[0] > self.ttl]:
+                del self._reports[host_id]
+            return [report for host_id, report in self._reports.items() if host_id != self.host_id]
+    
+    def hosts(self, now=None):
+        """Number of live server processes, this one included"""
+        return len(self._live(now)) + 1
+    
+    def clients(self, local=0, now=None):
+        """
+        Clients connected across the live processes
+        
+        Args:
+            local: This process's current count (its own reports are ignored)
+            now: Monotonic time (default: now)
+        """
+        return local + sum(report[1] for report in self._live(now))
+    
+    def viewports(self, local=(), now=None):
+        """Viewport keys in use across the live processes"""
+        keys = set(local)
+        for report in self._live(now):
+            keys |= report[2]
+        return keys
+
+
+class MessageBroker:
+    """
+    In-process stand-in for a Redis pub/sub server
+    
+    Implements SUBSCRIBE, UNSUBSCRIBE, PUBLISH and PING over RESP, enough for
+    QueueManager (and redis-cli) on a development machine or in tests. A
+    subscriber that stops reading stalls its publishers; use redis-server in
+    production.
+    """
+    
+    def __init__(self, host='127.0.0.1', port=6379):
+        self.host = host
+        self.port = port
+        self.subscribers = {}  # channel -> set of handlers
+        self.lock = threading.Lock()
+        self._server = None
+        self._thread = None
+    
+    def start(self):
+        """Start serving; port 0 picks a free port (see self.port)"""
+        self._server = _BrokerServer((self.host, self.port), _BrokerHandler)
+        self._server.broker = self
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+    
+    @property
+    def url(self):
+        return f'redis://{self.host}:{self.port}'
+    
+    def publish(self, channel, payload):
+        """Forward a payload to the channel's subscribers; returns their count"""
+        message = b'*3\r\n$7\r\nmessage\r\n$%d\r\n%s\r\n$%d\r\n' % (len(channel), channel, len(payload))
+        with self.lock:
+            handlers = list(self.subscribers.get(channel, ()))
+        for handler in handlers:
+            handler.write(message, payload, b'\r\n')
+        return len(handlers)
+
+
+class _BrokerServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _BrokerHandler(socketserver.StreamRequestHandler):
+    """Commands of one broker client"""
+    
+    def setup(self):
+        super().setup()
+        self.channels = set()
+        self.write_lock = threading.Lock()
+    
+    def write(self, *parts):
+        try:
+            with self.write_lock:
+                for part in parts:
+                    self.wfile.write(part)
+                self.wfile.flush()
+        except OSError:
+            pass  # Gone; removed from the channels when its handler exits
+    
+    def read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b'*'):
+            return line.split()  # Inline command, e.g. PING typed into telnet
+        args = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+    
+    def handle(self):
+        broker = self.server.broker
+        try:
+            while True:
+                args = self.read_command()
+                if args is None:
+                    break
+                if not args:
+                    continue
+                command = args[0].upper()
+                if command == b'PUBLISH' and len(args) == 3:
+                    self.write(b':%d\r\n' % broker.publish(args[1], args[2]))
+                elif command in (b'SUBSCRIBE', b'UNSUBSCRIBE'):
+                    for channel in args[1:] or list(self.channels):
+                        with broker.lock:
+                            subscribers = broker.subscribers.setdefault(channel, set())
+                            if command == b'SUBSCRIBE':
+                                subscribers.add(self)
+                                self.channels.add(channel)
+                            else:
+                                subscribers.discard(self)
+                                self.channels.discard(channel)
+                        kind = command.lower()
+                        self.write(b'*3\r\n$%d\r\n%s\r\n$%d\r\n%s\r\n:%d\r\n' % (
+                            len(kind), kind, len(channel), channel, len(self.channels)))
+                elif command == b'PING':
+                    self.write(b'+PONG\r\n')
+                elif command == b'QUIT':
+                    self.write(b'+OK\r\n')
+                    break
+                else:
+                    self.write(b"-ERR unknown command '%s'\r\n" % command)
+        except (OSError, ValueError):
+            pass
+        finally:
+            with broker.lock:
+                for channel in self.channels:
+                    broker.subscribers.get(channel, set()).discard(self)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the stand-in Redis pub/sub broker')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=6379)
+    args = parser.parse_args()
+    
+    broker = MessageBroker(args.host, args.port).start()
+    print(f'Message broker listening on {broker.url}')
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        broker.stop()
+
+
+if __name__ == '__main__':
+    main()
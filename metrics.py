@@ -0,0 +1,210 @@
+"""
+Metrics for NavIC + LoRa monitoring system
+Counters, gauges and histograms with fixed buckets, rendered in the
+Prometheus text exposition format
+"""
+
+import bisect
+import math
+import threading
+import time
+
+
+# Bucket upper bounds (seconds) for update cycle stages and emit latencies
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Content type of the text exposition format
+METRICS_MIME_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if value == -math.inf:
+        return '-Inf'
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _format_labels(pairs):
+    if not pairs:
+        return ''
+    escaped = (name + '="' + str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+               for name, value in pairs)
+    return '{' + ','.join(escaped) + '}'
+
+
+class Metric:
+    """Base of the metric types: a name, help text and an optional label"""
+    
+    kind = 'untyped'
+    
+    def __init__(self, name, documentation, label=None):
+        self.name = name
+        self.documentation = documentation
+        self.label = label
+        self._lock = threading.Lock()
+    
+    def _labels(self, value, *extra):
+        pairs = [(self.label, value)] if self.label is not None else []
+        return _format_labels(pairs + list(extra))
+    
+    def samples(self):
+        """(suffix, label string, value) triples of the current values"""
+        raise NotImplementedError
+    
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        lines += [f'{self.name}{suffix}{labels} {_format_value(value)}' for suffix, labels, value in self.samples()]
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    """
+    Monotonically increasing count
+    
+    Either incremented with inc(), or read from a function returning the
+    current total (or a dictionary of label value -> total) at render time.
+    """
+    
+    kind = 'counter'
+    
+    def __init__(self, name, documentation, label=None, function=None):
+        super().__init__(name, documentation, label)
+        self.function = function
+        self._values = {}
+    
+    def inc(self, amount=1, label_value=None):
+        with self._lock:
+            self._values[label_value] = self._values.get(label_value, 0) + amount
+    
+    def value(self, label_value=None):
+        return self._values.get(label_value, 0)
+    
+    def _current(self):
+        if self.function is None:
+            with self._lock:
+                return dict(self._values)
+        value = self.function()
+        return value if isinstance(value, dict) else {None: value}
+    
+    def samples(self):
+        return [('', self._labels(key), value) for key, value in self._current().items()]
+
+
+class Gauge(Counter):
+    """Value that goes up and down; set() it or give a function"""
+    
+    kind = 'gauge'
+    
+    def set(self, value, label_value=None):
+        with self._lock:
+            self._values[label_value] = value
+
+
+class Histogram(Metric):
+    """
+    Observations counted into fixed buckets, per label value
+    
+    observe() is a bisect and three additions under a lock, cheap enough
+    for every stage of every update cycle.
+    """
+    
+    kind = 'histogram'
+    
+    def __init__(self, name, documentation, buckets=STAGE_BUCKETS, label=None):
+        super().__init__(name, documentation, label)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # Label value -> [bucket counts..., +Inf count, sum]
+    
+    def observe(self, value, label_value=None):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = self._series[label_value] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+    
+    def lap(self, label_value, since):
+        """
+        Observe the seconds since a time.perf_counter() reading
+        
+        Returns:
+            The new reading, to time the next stage from
+        """
+        now = time.perf_counter()
+        self.observe(now - since, label_value)
+        return now
+    
+    def time(self, label_value=None):
+        """Context manager observing the seconds its block takes"""
+        return _Timer(self, label_value)
+    
+    def count(self, label_value=None):
+        series = self._series.get(label_value)
+        return sum(series[:-1]) if series else 0
+    
+    def sum(self, label_value=None):
+        series = self._series.get(label_value)
+        return series[-1] if series else 0.0
+    
+    def samples(self):
+        with self._lock:
+            series = {key: list(values) for key, values in self._series.items()}
+        samples = []
+        for key, values in series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), values):
+                cumulative += count
+                samples.append(('_bucket', self._labels(key, ('le', _format_value(float(bound)))), cumulative))
+            samples.append(('_sum', self._labels(key), values[-1]))
+            samples.append(('_count', self._labels(key), cumulative))
+        return samples
+
+
+class _Timer:
+    """Times a block into a histogram (see Histogram.time)"""
+    
+    __slots__ = ('histogram', 'label_value', 'start')
+    
+    def __init__(self, histogram, label_value):
+        self.histogram = histogram
+        self.label_value = label_value
+    
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start, self.label_value)
+        return False
+
+
+class MetricsRegistry:
+    """Named metrics rendered together for the /metrics endpoint"""
+    
+    def __init__(self, prefix=''):
+        self.prefix = prefix
+        self.metrics = {}
+    
+    def _add(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f'duplicate metric: {metric.name}')
+        self.metrics[metric.name] = metric
+        return metric
+    
+    def counter(self, name, documentation, label=None, function=None):
+        return self._add(Counter(self.prefix + name, documentation, label, function))
+    
+    def gauge(self, name, documentation, label=None, function=None):
+        return self._add(Gauge(self.prefix + name, documentation, label, function))
+    
+    def histogram(self, name, documentation, buckets=STAGE_BUCKETS, label=None):
+        return self._add(Histogram(self.prefix + name, documentation, buckets, label))
+    
+    def render(self):
+        """Every metric in the text exposition format"""
+        return '\n'.join(metric.render() for metric in self.metrics.values()) + '\n'
@@ -0,0 +1,227 @@
+"""
+Multilateration engine for NavIC + LoRa monitoring system
+Locates collars heard by several LoRa gateways from their RSSI ranges or
+arrival times, solving every cow at once with a vectorized Gauss-Newton
+least-squares fit
+"""
+
+import math
+import numpy as np
+import config
+from distance import EARTH_MEAN_RADIUS
+from path_loss import active_table
+
+# Speed of light in meters per nanosecond, for arrival times
+LIGHT_M_PER_NS = 0.299792458
+
+
+class MultilaterationFix:
+    """
+    Position fixes of a batch of cows, one entry per cow
+    
+    Attributes:
+        lat, lon: Fixed positions
+        accuracy: 1-sigma position error in meters, per axis, from the fit's
+                  covariance (inf if the gateways cannot determine a position)
+        residual: RMS of the residuals in units of their expected errors; about
+                  1 for a consistent fix, NaN without redundant readings
+        gateways: Number of gateways that heard the cow
+        valid: Fixes with enough gateways and a residual within
+               config.MULTILAT_MAX_RESIDUAL
+    """
+    
+    __slots__ = ('lat', 'lon', 'accuracy', 'residual', 'gateways', 'valid')
+    
+    def __init__(self, lat, lon, accuracy, residual, gateways, valid):
+        self.lat = lat
+        self.lon = lon
+        self.accuracy = accuracy
+        self.residual = residual
+        self.gateways = gateways
+        self.valid = valid
+    
+    def __len__(self):
+        return len(self.lat)
+
+
+class Multilateration:
+    """
+    Least-squares position solver for a fixed set of gateways
+    
+    Positions are solved on a local east/north plane around the origin, which
+    is accurate to well below a meter over a few kilometers. Readings come as
+    (cows x gateways) matrices with NaN where a gateway did not hear a cow.
+    Each Gauss-Newton iteration linearizes the ranges of every reading and
+    solves each cow's 2x2 normal equations in closed form; arrival times add
+    the unknown transmit time, which is eliminated from the normal equations
+    (Schur complement). A small Levenberg damping keeps cows with too few
+    readings finite.
+    """
+    
+    def __init__(self, gateways=None, origin=None, iterations=None, min_gateways=None, max_residual=None):
+        """
+        Args:
+            gateways: Dictionary of gateway name -> (latitude, longitude)
+                      (default: config.GATEWAYS)
+            origin: (latitude, longitude) of the plane's origin (default: the
+                    gateways' centroid)
+            iterations: Maximum Gauss-Newton iterations
+            min_gateways: Gateways a valid fix needs
+            max_residual: Largest normalized residual of a valid fix
+        """
+        gateways = config.GATEWAYS if gateways is None else gateways
+        if not gateways:
+            raise ValueError('multilateration needs at least one gateway')
+        self.names = list(gateways)
+        positions = np.array([gateways[name] for name in self.names], dtype=np.float64)
+        self.origin = tuple(positions.mean(axis=0)) if origin is None else tuple(origin)
+        self.iterations = config.MULTILAT_ITERATIONS if iterations is None else iterations
+        self.min_gateways = config.MULTILAT_MIN_GATEWAYS if min_gateways is None else min_gateways
+        self.max_residual = config.MULTILAT_MAX_RESIDUAL if max_residual is None else max_residual
+        
+        self._m_per_deg_lat = math.radians(1) * EARTH_MEAN_RADIUS
+        self._m_per_deg_lon = self._m_per_deg_lat * math.cos(math.radians(self.origin[0]))
+        self.gateway_east, self.gateway_north = self.to_plane(positions[:, 0], positions[:, 1])
+    
+    def to_plane(self, lat, lon):
+        """(east, north) meters of positions relative to the origin"""
+        east = (np.asarray(lon, dtype=np.float64) - self.origin[1]) * self._m_per_deg_lon
+        north = (np.asarray(lat, dtype=np.float64) - self.origin[0]) * self._m_per_deg_lat
+        return east, north
+    
+    def to_geo(self, east, north):
+        """(latitude, longitude) of plane positions"""
+        return self.origin[0] + north / self._m_per_deg_lat, self.origin[1] + east / self._m_per_deg_lon
+    
+    def locate_rssi(self, rssi, collars=None, sigma_db=None, table=None):
+        """
+        Fix positions from the RSSI each gateway measured
+        
+        Ranges and their errors come from the calibrated path-loss model of
+        each gateway (and collar), so nearby gateways, whose ranges are more
+        precise, weigh more.
+        
+        Args:
+            rssi: (cows x gateways) RSSI in dBm, NaN where not heard; columns
+                  in the order of the gateways
+            collars: Cow id of every row, for per-collar calibration
+            sigma_db: Shadowing standard deviation in dB (default from config)
+            table: PathLossTable to use (default: the active one)
+        
+        Returns:
+            MultilaterationFix
+        """
+        rssi = np.asarray(rssi, dtype=np.float64)
+        table = active_table() if table is None else table
+        heard = ~np.isnan(rssi)
+        filled = np.where(heard, rssi, 0.0)
+        ranges = np.empty_like(filled)
+        sigma = np.empty_like(filled)
+        for j, name in enumerate(self.names):
+            ranges[:, j] = table.distance(filled[:, j], gateway=name, collar=collars)
+            sigma[:, j] = table.position_sigma(filled[:, j], sigma_db, gateway=name, collar=collars)
+        return self.solve(ranges, np.where(heard, 1 / np.square(sigma), 0.0))
+    
+    def locate_tdoa(self, arrival_ns, sigma_ns=None):
+        """
+        Fix positions from the arrival time at each gateway (TDOA)
+        
+        Gateways need synchronized clocks (e.g. GNSS-disciplined fine
+        timestamps); the transmit time is unknown and solved for, so only
+        the arrival time differences matter.
+        
+        Args:
+            arrival_ns: (cows x gateways) arrival times in nanoseconds, NaN
+                        where not heard
+            sigma_ns: Timestamp error in nanoseconds (default from config)
+        
+        Returns:
+            MultilaterationFix
+        """
+        arrival_ns = np.asarray(arrival_ns, dtype=np.float64)
+        sigma_ns = config.TDOA_TIMING_SIGMA_NS if sigma_ns is None else sigma_ns
+        heard = ~np.isnan(arrival_ns)
+        # Relative to each cow's earliest arrival, to keep the bias small
+        earliest = np.nanmin(np.where(heard.any(axis=1, keepdims=True), arrival_ns, 0.0), axis=1, keepdims=True)
+        pseudo_ranges = np.where(heard, arrival_ns - earliest, 0.0) * LIGHT_M_PER_NS
+        weight = np.where(heard, 1 / (sigma_ns * LIGHT_M_PER_NS) ** 2, 0.0)
+        return self.solve(pseudo_ranges, weight, bias=True)
+    
+    def solve(self, ranges, weight, bias=False, tolerance=0.01):
+        """
+        Weighted least-squares positions for (pseudo-)ranges to the gateways
+        
+        Args:
+            ranges: (cows x gateways) ranges in meters
+            weight: (cows x gateways) inverse range variances; 0 where the
+                    gateway did not hear the cow
+            bias: True for pseudo-ranges sharing an unknown offset per cow
+                  (arrival times)
+            tolerance: Stop once no position moves more than this (m)
+        
+        Returns:
+            MultilaterationFix
+        """
+        ranges = np.asarray(ranges, dtype=np.float64)
+        weight = np.asarray(weight, dtype=np.float64)
+        gx, gy = self.gateway_east, self.gateway_north
+        count = np.count_nonzero(weight, axis=1)
+        total = np.maximum(weight.sum(axis=1), 1e-30)
+        
+        # Start at the centroid of the gateways that heard the cow, weighted
+        # towards the closer ones for ranges
+        start = weight if bias else weight / np.maximum(ranges, 1.0) ** 2
+        start_total = np.maximum(start.sum(axis=1), 1e-30)
+        x = start @ gx / start_total
+        y = start @ gy / start_total
+        offset = np.zeros(len(x))
+        
+        for _ in range(max(self.iterations, 1)):
+            dx, dy = x[:, None] - gx, y[:, None] - gy
+            d = np.maximum(np.hypot(dx, dy), 1e-3)
+            ux, uy = dx / d, dy / d
+            if bias:
+                offset = np.einsum('ij,ij->i', weight, ranges - d) / total
+            r = ranges - d - offset[:, None]
+            wx, wy = weight * ux, weight * uy
+            hxx, hxy, hyy = np.einsum('ij,ij->i', wx, ux), np.einsum('ij,ij->i', wx, uy), np.einsum('ij,ij->i', wy, uy)
+            bx, by = np.einsum('ij,ij->i', wx, r), np.einsum('ij,ij->i', wy, r)
+            if bias:
+                # Eliminate the offset: H - h h' / w, b - h (sum w r) / w; the
+                # offset above makes sum w r vanish
+                sx, sy = wx.sum(axis=1), wy.sum(axis=1)
+                hxx, hxy, hyy = hxx - sx * sx / total, hxy - sx * sy / total, hyy - sy * sy / total
+            damping = 1e-6 * (hxx + hyy) + 1e-12
+            a, c = hxx + damping, hyy + damping
+            det = a * c - hxy * hxy
+            step_x = (c * bx - hxy * by) / det
+            step_y = (a * by - hxy * bx) / det
+            x += step_x
+            y += step_y
+            if np.max(np.abs(step_x) + np.abs(step_y), initial=0.0) < tolerance:
+                break
+        
+        # Residuals and covariance at the solution
+        dx, dy = x[:, None] - gx, y[:, None] - gy
+        d = np.maximum(np.hypot(dx, dy), 1e-3)
+        if bias:
+            offset = np.einsum('ij,ij->i', weight, ranges - d) / total
+        r = ranges - d - offset[:, None]
+        chi2 = np.einsum('ij,ij->i', weight, r * r)
+        unknowns = 3 if bias else 2
+        with np.errstate(divide='ignore', invalid='ignore'):
+            residual = np.where(count > unknowns, np.sqrt(chi2 / (count - unknowns)), np.nan)
+            ux, uy = dx / d, dy / d
+            wx, wy = weight * ux, weight * uy
+            hxx, hxy, hyy = np.einsum('ij,ij->i', wx, ux), np.einsum('ij,ij->i', wx, uy), np.einsum('ij,ij->i', wy, uy)
+            if bias:
+                sx, sy = wx.sum(axis=1), wy.sum(axis=1)
+                hxx, hxy, hyy = hxx - sx * sx / total, hxy - sx * sy / total, hyy - sy * sy / total
+            det = hxx * hyy - hxy * hxy
+            # Mean per-axis variance: trace of the inverse / 2
+            determined = det > 1e-12 * np.maximum(hxx + hyy, 1e-30) ** 2
+            accuracy = np.where(determined, np.sqrt(np.abs((hxx + hyy) / (2 * det))), np.inf)
+        
+        valid = (count >= self.min_gateways) & determined & ~(residual > self.max_residual)
+        lat, lon = self.to_geo(x, y)
+        return MultilaterationFix(lat, lon, accuracy, residual, count, valid)
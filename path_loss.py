@@ -0,0 +1,369 @@
+"""
+Calibrated path-loss model for NavIC + LoRa monitoring system
+Log-distance path-loss parameters per gateway and per collar, fitted offline
+from logged (RSSI, true distance) pairs and compiled into lookup tables
+indexed by RSSI x 10
+"""
+
+import argparse
+import csv
+import json
+import math
+import os
+import threading
+import numpy as np
+import config
+
+
+# Signal quality labels by code; an RSSI above SIGNAL_QUALITY_THRESHOLDS[i]
+# (dBm) has at least code i + 1
+SIGNAL_QUALITIES = ('Poor', 'Fair', 'Good', 'Excellent')
+SIGNAL_QUALITY_THRESHOLDS = (-100, -85, -70)
+
+
+class PathLossModel:
+    """
+    Log-distance path-loss model: RSSI = rssi0 + offset - 10 n log10(d)
+    
+    rssi0 (RSSI at 1 m) and the exponent n describe a gateway's surroundings,
+    with defaults for gateways without calibration. The offset (dB) is the
+    collar's deviation from a typical collar, e.g. transmit power or antenna
+    gain, and is 0 for collars without calibration.
+    """
+    
+    def __init__(self, rssi0=None, n=None, gateways=None, collars=None):
+        self.rssi0 = float(config.RSSI_REFERENCE if rssi0 is None else rssi0)
+        self.n = float(config.PATH_LOSS_EXPONENT if n is None else n)
+        self.gateways = {str(name): (float(g_rssi0), float(g_n)) for name, (g_rssi0, g_n) in (gateways or {}).items()}
+        self.collars = {int(cow_id): float(offset) for cow_id, offset in (collars or {}).items()}
+    
+    def gateway_parameters(self, gateway=None):
+        """(rssi0, n) of a gateway, the defaults for unknown gateways"""
+        return self.gateways.get(gateway, (self.rssi0, self.n))
+    
+    def expected_rssi(self, distance, gateway=None, collar=None):
+        """
+        RSSI the model predicts at a distance
+        
+        Args:
+            distance: Distance(s) in meters
+            gateway: Gateway name (default: uncalibrated gateway)
+            collar: Cow id of the collar (default: uncalibrated collar)
+        
+        Returns:
+            RSSI value(s) in dBm
+        """
+        rssi0, n = self.gateway_parameters(gateway)
+        return rssi0 + self.collars.get(collar, 0.0) - 10 * n * np.log10(distance)
+    
+    def compile(self, rssi_range=None):
+        """Build the lookup tables of this model"""
+        return PathLossTable(self, rssi_range)
+    
+    def to_dict(self):
+        return {
+            'rssi0': self.rssi0,
+            'n': self.n,
+            'gateways': {name: {'rssi0': g_rssi0, 'n': g_n} for name, (g_rssi0, g_n) in self.gateways.items()},
+            'collars': {str(cow_id): offset for cow_id, offset in self.collars.items()}
+        }
+    
+    @classmethod
+    def from_dict(cls, data):
+        gateways = {name: (g['rssi0'], g['n']) for name, g in data.get('gateways', {}).items()}
+        return cls(data.get('rssi0'), data.get('n'), gateways, data.get('collars'))
+    
+    def save(self, path):
+        """Write the model as JSON (atomically, for running servers reloading it)"""
+        temp = f'{path}.tmp'
+        with open(temp, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+        os.replace(temp, path)
+    
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+
+class PathLossTable:
+    """
+    Lookup tables compiled from a PathLossModel
+    
+    RSSI values are quantized to 0.1 dB, the resolution collars and gateways
+    report, and clamped to the table range. Row 0 of the distance tables
+    holds the default gateway parameters, the other rows the calibrated
+    gateways. A collar offset shifts the column: converting many readings is
+    one gather instead of a power per reading. Signal quality depends on the
+    RSSI only and has a single row.
+    """
+    
+    def __init__(self, model, rssi_range=None):
+        self.model = model
+        low, high = config.PATH_LOSS_RSSI_RANGE if rssi_range is None else rssi_range
+        self.low_x10 = int(round(low * 10))
+        self.high_x10 = int(round(high * 10))
+        rssi = np.arange(self.low_x10, self.high_x10 + 1) / 10
+        
+        self.gateway_rows = {name: row for row, name in enumerate(model.gateways, start=1)}
+        parameters = [(model.rssi0, model.n)] + list(model.gateways.values())
+        rssi0 = np.array([p[0] for p in parameters])[:, None]
+        n = np.array([p[1] for p in parameters])[:, None]
+        self.distance_lut = (10 ** ((rssi0 - rssi) / (10 * n))).astype(np.float32)
+        # Range error per dB of log-normal shadowing: d ln(10) / (10 n)
+        self.sigma_lut = (self.distance_lut * (math.log(10) / (10 * n))).astype(np.float32)
+        
+        self.quality_lut = np.searchsorted(
+            np.array(SIGNAL_QUALITY_THRESHOLDS) * 10, np.arange(self.low_x10, self.high_x10 + 1), side='left'
+        ).astype(np.uint8)
+        self._quality_labels = tuple(SIGNAL_QUALITIES[code] for code in self.quality_lut.tolist())
+        
+        self.collar_ids = np.array(sorted(model.collars), dtype=np.int64)
+        self.collar_offsets_x10 = np.array(
+            [int(round(model.collars[cow_id] * 10)) for cow_id in self.collar_ids.tolist()], dtype=np.int64
+        )
+    
+    def _columns(self, rssi, collar=None):
+        """Table columns of RSSI readings, corrected by their collars' offsets"""
+        # Truncating x + 0.5 rounds to the nearest 0.1 dB once x is clipped to >= 0
+        column = np.asarray(rssi, dtype=np.float64) * 10 + (0.5 - self.low_x10)
+        if collar is not None and len(self.collar_ids):
+            collar = np.asarray(collar, dtype=np.int64)
+            found = np.minimum(np.searchsorted(self.collar_ids, collar), len(self.collar_ids) - 1)
+            column = column - np.where(self.collar_ids[found] == collar, self.collar_offsets_x10[found], 0)
+        return np.clip(column, 0, self.high_x10 - self.low_x10 + 0.5).astype(np.intp)
+    
+    def _gather(self, lut, rssi, gateway, collar):
+        rows, columns = self._rows(gateway), self._columns(rssi, collar)
+        if np.ndim(rows) == 0:
+            return lut[rows].take(columns)
+        return lut[rows, columns]
+    
+    def _rows(self, gateway):
+        """Table rows of gateway names (0 for uncalibrated gateways)"""
+        if gateway is None or isinstance(gateway, str):
+            return self.gateway_rows.get(gateway, 0)
+        return np.fromiter((self.gateway_rows.get(name, 0) for name in gateway), dtype=np.int64, count=len(gateway))
+    
+    def distance(self, rssi, gateway=None, collar=None):
+        """
+        Estimated distance of RSSI readings
+        
+        Args:
+            rssi: RSSI value(s) in dBm
+            gateway: Gateway name, or one name per reading (default:
+                     uncalibrated gateway)
+            collar: Cow id of the collar, or one per reading (default:
+                    uncalibrated collar)
+        
+        Returns:
+            Distance(s) in meters (float32)
+        """
+        return self._gather(self.distance_lut, rssi, gateway, collar)
+    
+    def position_sigma(self, rssi, sigma_db=None, gateway=None, collar=None):
+        """
+        Position error of locations estimated from RSSI readings
+        
+        Log-normal shadowing of sigma_db decibels scales a range estimate d
+        by 10^(sigma_db / (10 n)), i.e. a range error of about
+        d ln(10) sigma_db / (10 n).
+        
+        Args:
+            rssi: RSSI value(s) in dBm
+            sigma_db: Shadowing standard deviation in dB (default from config)
+            gateway: Gateway name, or one name per reading
+            collar: Cow id of the collar, or one per reading
+        
+        Returns:
+            1-sigma position error(s) in meters, per axis
+        """
+        if sigma_db is None:
+            sigma_db = config.RSSI_SHADOWING_SIGMA
+        return self._gather(self.sigma_lut, rssi, gateway, collar) * np.float32(sigma_db)
+    
+    def quality_codes(self, rssi):
+        """Signal quality codes (indexes into SIGNAL_QUALITIES) of RSSI readings"""
+        return self.quality_lut.take(self._columns(rssi))
+    
+    def signal_quality(self, rssi):
+        """Signal quality label of a single RSSI reading"""
+        column = min(max(int(round(rssi * 10)) - self.low_x10, 0), self.high_x10 - self.low_x10)
+        return self._quality_labels[column]
+    
+    def signal_qualities(self, rssi):
+        """Signal quality labels of many RSSI readings"""
+        labels = self._quality_labels
+        return [labels[column] for column in self._columns(rssi).tolist()]
+
+
+def fit_path_loss(rssi, distance, gateways=None, collars=None, iterations=10):
+    """
+    Fit a path-loss model to logged readings of known distance
+    
+    Least squares on RSSI = rssi0_g + offset_c - 10 n_g log10(d): each
+    gateway g gets its own rssi0 and exponent, each collar c an offset
+    relative to the average collar. Gateway and collar terms are fitted
+    alternately; both are closed-form grouped regressions. The default
+    parameters fit every reading. Gateways whose readings do not span
+    several distances keep the default exponent.
+    
+    Args:
+        rssi: Logged RSSI values in dBm
+        distance: True distances of the readings in meters
+        gateways: Gateway name of every reading (default: one gateway)
+        collars: Cow id of every reading (default: no collar offsets)
+        iterations: Alternating gateway/collar passes
+    
+    Returns:
+        Fitted PathLossModel
+    """
+    y = np.asarray(rssi, dtype=np.float64)
+    x = -10 * np.log10(np.asarray(distance, dtype=np.float64))
+    
+    def regress(groups, count, target):
+        """Per-group least squares of target = a + n x"""
+        weights = np.bincount(groups, minlength=count).astype(np.float64)
+        sx = np.bincount(groups, x, count)
+        sy = np.bincount(groups, target, count)
+        sxx = np.bincount(groups, x * x, count)
+        sxy = np.bincount(groups, x * target, count)
+        spread = weights * sxx - sx * sx
+        with np.errstate(divide='ignore', invalid='ignore'):
+            slope = (weights * sxy - sx * sy) / spread
+            usable = spread > 1e-9 * np.maximum(weights * sxx, 1)
+            return slope, usable, sx, sy, weights
+    
+    if gateways is None:
+        gateway_names, gateway_index = [], np.zeros(len(y), dtype=np.int64)
+    else:
+        gateway_names, gateway_index = np.unique(np.asarray(gateways, dtype=str), return_inverse=True)
+        gateway_names = gateway_names.tolist()
+    if collars is None:
+        collar_ids, collar_index = np.zeros(0, dtype=np.int64), None
+    else:
+        collar_ids, collar_index = np.unique(np.asarray(collars, dtype=np.int64), return_inverse=True)
+    num_gateways = max(len(gateway_names), 1)
+    offsets = np.zeros(len(collar_ids))
+    
+    for _ in range(iterations if collar_index is not None else 1):
+        target = y - offsets[collar_index] if collar_index is not None else y
+        (default_n,), _, (sx,), (sy,), (weights,) = regress(np.zeros(len(y), dtype=np.int64), 1, target)
+        default_rssi0 = (sy - default_n * sx) / weights
+        n, usable, sx, sy, weights = regress(gateway_index, num_gateways, target)
+        n = np.where(usable, n, default_n)
+        rssi0 = (sy - n * sx) / np.maximum(weights, 1)
+        if collar_index is None:
+            break
+        # Collar offsets: mean residual per collar, centred on the average collar
+        residual = y - rssi0[gateway_index] - n[gateway_index] * x
+        offsets = np.bincount(collar_index, residual) / np.bincount(collar_index)
+        offsets -= offsets.mean()
+    
+    gateway_parameters = {name: (rssi0[i], n[i]) for i, name in enumerate(gateway_names)}
+    return PathLossModel(default_rssi0, default_n, gateway_parameters, dict(zip(collar_ids.tolist(), offsets.tolist())))
+
+
+# Active table shared by every conversion; swapped as a whole, so readers
+# that take it once per batch never see a half-updated model
+_active = None
+_model_mtime = None
+_swap_lock = threading.Lock()
+
+
+def active_table():
+    """Lookup table of the installed model (the config defaults until one is installed)"""
+    table = _active
+    if table is None:
+        table = install(PathLossModel())
+    return table
+
+
+def install(model):
+    """
+    Compile a model and make it the active one, e.g. from a running server
+    
+    Args:
+        model: PathLossModel to use for every later conversion
+    
+    Returns:
+        The new active PathLossTable
+    """
+    global _active
+    table = model.compile()
+    _active = table
+    return table
+
+
+def refresh(path=None):
+    """
+    Install the model file if it changed since the last call
+    
+    Called once per update cycle; a model saved with PathLossModel.save() (or
+    `python path_loss.py`) replaces the active model without a restart.
+    
+    Args:
+        path: Model file (default: config.PATH_LOSS_MODEL_FILE)
+    
+    Returns:
+        True if a new model was installed
+    """
+    global _model_mtime
+    path = config.PATH_LOSS_MODEL_FILE if path is None else path
+    if not path:
+        return False
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return False
+    with _swap_lock:
+        if mtime == _model_mtime:
+            return False
+        install(PathLossModel.load(path))
+        _model_mtime = mtime
+    return True
+
+
+def read_samples(path):
+    """
+    Read logged readings from a CSV file
+    
+    Args:
+        path: CSV with 'rssi' and 'distance' columns and optional 'gateway'
+              and 'collar' (cow id) columns
+    
+    Returns:
+        Tuple of (rssi, distance, gateways, collars); gateways and collars
+        are None when the file has no such column
+    """
+    with open(path, newline='') as f:
+        rows = list(csv.DictReader(f))
+    rssi = np.array([float(row['rssi']) for row in rows])
+    distance = np.array([float(row['distance']) for row in rows])
+    fields = rows[0].keys() if rows else ()
+    gateways = [row['gateway'] for row in rows] if 'gateway' in fields else None
+    collars = [int(row['collar']) for row in rows] if 'collar' in fields else None
+    return rssi, distance, gateways, collars
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fit a path-loss model to logged (RSSI, distance) readings')
+    parser.add_argument('samples', help="CSV with 'rssi', 'distance' and optional 'gateway', 'collar' columns")
+    parser.add_argument('-o', '--output', default='path_loss_model.json', help='Model file to write')
+    args = parser.parse_args()
+    
+    rssi, distance, gateways, collars = read_samples(args.samples)
+    model = fit_path_loss(rssi, distance, gateways, collars)
+    residual = rssi - np.array([model.expected_rssi(d, g, c) for d, g, c in
+                                zip(distance, gateways or [None] * len(rssi), collars or [None] * len(rssi))])
+    model.save(args.output)
+    
+    print(f'{len(rssi)} readings, residual {np.std(residual):.2f} dB (1 sigma)')
+    print(f'default: rssi0 {model.rssi0:.1f} dBm, n {model.n:.2f}')
+    for name, (rssi0, n) in model.gateways.items():
+        print(f'gateway {name}: rssi0 {rssi0:.1f} dBm, n {n:.2f}')
+    print(f'{len(model.collars)} collar offsets written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,291 @@
+"""
+Historical playback for NavIC + LoRa monitoring system
+Time-window queries and paced replay of track log snapshots, decimated to
+the client's viewport and zoom level
+"""
+
+import math
+import threading
+from datetime import datetime
+import numpy as np
+import config
+from track_log import TRACK_COORD_SCALE
+
+
+# Fields of a compact playback cow row, in order; count is the number of
+# cows the row stands for after zoom decimation
+PLAYBACK_ROW_FIELDS = ('id', 'lat', 'lon', 'rssi', 'status', 'count')
+
+
+def parse_time(value):
+    """
+    Parse a time parameter
+    
+    Args:
+        value: Epoch milliseconds (int or numeric string) or an ISO 8601 string
+    
+    Returns:
+        Epoch milliseconds
+    """
+    if isinstance(value, (int, float)):
+        return int(value)
+    value = str(value).strip()
+    if value.lstrip('-').isdigit():
+        return int(value)
+    return int(datetime.fromisoformat(value).timestamp() * 1000)
+
+
+def parse_bbox(value):
+    """
+    Parse a viewport parameter
+    
+    Args:
+        value: 'south,west,north,east' string, a 4-sequence, or None
+    
+    Returns:
+        Tuple of (south, west, north, east) in degrees, or None
+    """
+    if value is None or value == '':
+        return None
+    if isinstance(value, str):
+        value = value.split(',')
+    south, west, north, east = (float(v) for v in value)
+    return south, west, north, east
+
+
+def parse_zoom(value):
+    """
+    Parse a zoom parameter, clamped to the levels clients may request
+    
+    Args:
+        value: Zoom level (int or numeric string), '' or None
+    
+    Returns:
+        Zoom level in 0..config.VIEWPORT_MAX_ZOOM, or None
+    """
+    if value is None or value == '':
+        return None
+    return max(0, min(int(value), config.VIEWPORT_MAX_ZOOM))
+
+
+def zoom_cell_size(zoom, latitude=None):
+    """
+    Decimation cell size in degrees for a web-map zoom level
+    
+    One cell covers config.PLAYBACK_CELL_PX screen pixels, so at most one
+    row is drawn per marker-sized area. In Web Mercator a pixel spans the
+    same degrees of longitude everywhere, and cos(latitude) times as many
+    degrees of latitude.
+    
+    Args:
+        zoom: Web Mercator zoom level
+        latitude: Latitude the cell is measured at (default: base coordinates)
+    
+    Returns:
+        Tuple of (latitude, longitude) cell sizes in degrees
+    """
+    latitude = config.BASE_COORDS[0] if latitude is None else latitude
+    lon_cell = 360.0 / (256 * 2 ** zoom) * config.PLAYBACK_CELL_PX
+    return lon_cell * math.cos(math.radians(latitude)), lon_cell
+
+
+def decimate(records, bbox=None, zoom=None):
+    """
+    Restrict one tick of track records to a viewport and zoom level
+    
+    Args:
+        records: TRACK_RECORD_DTYPE array of one tick
+        bbox: Optional (south, west, north, east) viewport
+        zoom: Optional zoom level; cows sharing a decimation cell collapse
+              into the lowest-id cow of the cell
+    
+    Returns:
+        Tuple of (records, counts)
+    """
+    lat, lon = records['lat'], records['lon']
+    if bbox is not None:
+        south, west, north, east = (round(v * TRACK_COORD_SCALE) for v in bbox)
+        inside = (lat >= south) & (lat <= north) & (lon >= west) & (lon <= east)
+        records, lat, lon = records[inside], lat[inside], lon[inside]
+    
+    if zoom is None or not len(records):
+        return records, np.ones(len(records), dtype=np.int64)
+    
+    lat_cell, lon_cell = (max(1, round(size * TRACK_COORD_SCALE)) for size in zoom_cell_size(zoom))
+    keys = (lat.astype(np.int64) // lat_cell) * (1 << 32) + (lon.astype(np.int64) // lon_cell)
+    _, first, counts = np.unique(keys, return_index=True, return_counts=True)
+    order = np.argsort(first)
+    return records[first[order]], counts[order]
+
+
+def snapshot(timestamp_ms, records, counts):
+    """
+    Build a playback frame
+    
+    Args:
+        timestamp_ms: Tick time in epoch milliseconds
+        records: TRACK_RECORD_DTYPE rows
+        counts: Cows represented by each row
+    
+    Returns:
+        Dictionary with timestamp, timestamp_ms and compact cow rows
+        (see PLAYBACK_ROW_FIELDS)
+    """
+    cows = list(zip(
+        records['cow_id'].tolist(),
+        (records['lat'] / TRACK_COORD_SCALE).tolist(),
+        (records['lon'] / TRACK_COORD_SCALE).tolist(),
+        (records['rssi_x10'] / 10).tolist(),
+        records['status'].tolist(),
+        counts.tolist()
+    ))
+    return {
+        'timestamp': datetime.fromtimestamp(timestamp_ms / 1000).isoformat(),
+        'timestamp_ms': timestamp_ms,
+        'cows': cows
+    }
+
+
+def history_frames(reader, start_ms, end_ms, step_ms=None, bbox=None, zoom=None, limit=None, max_rows=None):
+    """
+    Decimated herd snapshots of a time window
+    
+    Args:
+        reader: TrackReader
+        start_ms: Window start in epoch milliseconds (inclusive)
+        end_ms: Window end in epoch milliseconds (exclusive)
+        step_ms: Minimum time between frames; ticks in between are skipped
+        bbox: Optional (south, west, north, east) viewport
+        zoom: Optional zoom level for spatial decimation
+        limit: Maximum number of frames
+        max_rows: Maximum number of cow rows over all frames
+    
+    Yields:
+        Playback frames (see snapshot)
+    
+    Raises:
+        ValueError: If the frames would hold more than max_rows rows; checked
+                    before each frame is built
+    """
+    next_ms = start_ms
+    produced = 0
+    rows = 0
+    for timestamp_ms, records in reader.ticks(start_ms, end_ms):
+        if timestamp_ms < next_ms:
+            continue
+        if limit is not None and produced >= limit:
+            return
+        records, counts = decimate(records, bbox, zoom)
+        rows += len(records)
+        if max_rows is not None and rows > max_rows:
+            raise ValueError(f'more than {max_rows} cow rows; narrow the window or pass step, bbox or zoom')
+        yield snapshot(timestamp_ms, records, counts)
+        produced += 1
+        next_ms = timestamp_ms + (step_ms or 0)
+
+
+def snapshot_at(reader, at_ms, bbox=None, zoom=None):
+    """
+    Herd snapshot of the last tick at or before a time
+    
+    Args:
+        reader: TrackReader
+        at_ms: Time in epoch milliseconds
+        bbox: Optional (south, west, north, east) viewport
+        zoom: Optional zoom level for spatial decimation
+    
+    Returns:
+        Playback frame, or None if the log has no tick before at_ms
+    """
+    for segment in reversed(reader.segments):
+        if segment.start_ms > at_ms:
+            continue
+        position = int(np.searchsorted(segment.index['timestamp_ms'], at_ms, side='right')) - 1
+        timestamp_ms, first, count = segment.index[position].tolist()
+        return snapshot(timestamp_ms, *decimate(segment.records[first:first + count], bbox, zoom))
+    return None
+
+
+def cow_track(reader, cow_id, start_ms, end_ms, step_ms=None):
+    """
+    Track of one cow over a time window
+    
+    Args:
+        reader: TrackReader
+        cow_id: Cow identifier
+        start_ms: Window start in epoch milliseconds (inclusive)
+        end_ms: Window end in epoch milliseconds (exclusive)
+        step_ms: Optional minimum time between points
+    
+    Returns:
+        Dictionary of equal-length lists: timestamp_ms, lat, lon, rssi, status
+    """
+    timestamps, records = reader.query(start_ms, end_ms, cow_ids=[cow_id])
+    if step_ms:
+        buckets = (timestamps - start_ms) // step_ms
+        keep = np.ones(len(buckets), dtype=bool)
+        keep[1:] = buckets[1:] != buckets[:-1]
+        timestamps, records = timestamps[keep], records[keep]
+    return {
+        'cow_id': int(cow_id),
+        'timestamp_ms': timestamps.tolist(),
+        'lat': (records['lat'] / TRACK_COORD_SCALE).tolist(),
+        'lon': (records['lon'] / TRACK_COORD_SCALE).tolist(),
+        'rssi': (records['rssi_x10'] / 10).tolist(),
+        'status': records['status'].tolist()
+    }
+
+
+class PlaybackSession:
+    """
+    Paced replay of a time window to one client
+    
+    Frames are sent as fast as the recorded tick spacing divided by speed
+    (gaps are capped at config.PLAYBACK_MAX_WAIT seconds); run() returns
+    when the window is exhausted or stop() is called.
+    """
+    
+    def __init__(self, reader, send, sleep, start_ms, end_ms, speed=1.0, step_ms=None, bbox=None, zoom=None):
+        """
+        Args:
+            reader: TrackReader
+            send: Callable taking an (event name, payload) pair
+            sleep: Sleep function cooperative with the server (socketio.sleep)
+            start_ms: Window start in epoch milliseconds
+            end_ms: Window end in epoch milliseconds
+            speed: Playback speed relative to real time
+            step_ms: Minimum recorded time between frames
+            bbox: Optional (south, west, north, east) viewport
+            zoom: Optional zoom level for spatial decimation
+        """
+        self.reader = reader
+        self.send = send
+        self.sleep = sleep
+        self.start_ms, self.end_ms = start_ms, end_ms
+        self.speed = max(float(speed), 1e-3)
+        self.step_ms, self.bbox, self.zoom = step_ms, bbox, zoom
+        self.frames_sent = 0
+        self._stopped = threading.Event()
+    
+    def stop(self):
+        """Stop the replay after the current frame"""
+        self._stopped.set()
+    
+    def run(self):
+        """Replay the window, then send playback_end"""
+        previous_ms = None
+        for frame in history_frames(self.reader, self.start_ms, self.end_ms, self.step_ms, self.bbox, self.zoom):
+            if self._stopped.is_set():
+                break
+            if previous_ms is not None:
+                self.sleep(min((frame['timestamp_ms'] - previous_ms) / 1000 / self.speed, config.PLAYBACK_MAX_WAIT))
+                if self._stopped.is_set():
+                    break
+            previous_ms = frame['timestamp_ms']
+            self.send('playback_frame', frame)
+            self.frames_sent += 1
+        
+        self.send('playback_end', {
+            'frames': self.frames_sent,
+            'stopped': self._stopped.is_set()
+        })
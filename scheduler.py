@@ -0,0 +1,175 @@
+"""
+Update scheduling for NavIC + LoRa monitoring system
+Decides when the monitoring loop runs its next update cycle: on a fixed
+interval, or as soon as position updates arrive, micro-batched under a
+latency and batch-size bound
+"""
+
+import threading
+import time
+from collections import deque
+import numpy as np
+import config
+
+
+SCHEDULER_MODES = ('interval', 'event')
+
+# Longest single wait, so stop() takes effect promptly
+_WAIT_SLICE = 1.0
+
+
+class UpdateScheduler:
+    """
+    Pacing of the monitoring loop
+    
+    In 'interval' mode a cycle is due every interval seconds, as before. In
+    'event' mode a cycle is due once position updates are pending and
+    either max_batch of them have arrived or the oldest has waited
+    max_latency seconds; without updates, a heartbeat cycle still runs every
+    idle_interval seconds. Lower max_latency means fresher alerts and more
+    (smaller) cycles, i.e. more CPU per update.
+    
+    Event mode needs a source with wait_pending() (IngestPipeline); sources
+    that produce positions on demand (the simulator) always use the interval.
+    """
+    
+    def __init__(self, source, sleep=time.sleep, mode=None, interval=None, max_latency=None,
+                 max_batch=None, idle_interval=None):
+        """
+        Args:
+            source: Position source (see IngestPipeline.wait_pending)
+            sleep: Sleep function cooperative with the server (socketio.sleep)
+            mode: 'interval' or 'event' (default config.SCHEDULER_MODE)
+            interval: Seconds between cycles in interval mode
+            max_latency: Event mode: longest wait of a pending update, in seconds
+            max_batch: Event mode: pending updates that make a cycle due at once
+            idle_interval: Event mode: seconds between heartbeat cycles, None for none
+        """
+        mode = config.SCHEDULER_MODE if mode is None else mode
+        if mode not in SCHEDULER_MODES:
+            raise ValueError(f'unknown scheduler mode: {mode}')
+        if mode == 'event' and not hasattr(source, 'wait_pending'):
+            mode = 'interval'
+        self.mode = mode
+        self.source = source
+        self.sleep = sleep
+        self._interval = interval
+        self.max_latency = config.SCHEDULER_MAX_LATENCY if max_latency is None else max_latency
+        self.max_batch = config.SCHEDULER_MAX_BATCH if max_batch is None else max_batch
+        self.idle_interval = config.SCHEDULER_IDLE_INTERVAL if idle_interval is None else idle_interval
+        
+        self.cycles = 0
+        self.idle_cycles = 0  # Heartbeat cycles run without pending updates
+        self._last_cycle = None
+        self._stopped = threading.Event()
+    
+    @property
+    def interval(self):
+        """Seconds between interval-mode cycles (config.UPDATE_INTERVAL unless overridden)"""
+        return config.UPDATE_INTERVAL if self._interval is None else self._interval
+    
+    def start(self):
+        """Re-arm the scheduler after stop(), before the monitoring loop starts"""
+        self._stopped.clear()
+    
+    def stop(self):
+        """Make pending and later wait_for_cycle() calls return until start()"""
+        self._stopped.set()
+    
+    def wait_for_cycle(self):
+        """
+        Block until the next update cycle is due
+        
+        Returns:
+            True if a cycle should run, False if stop() was called
+        """
+        if self.mode == 'event':
+            due = self._wait_for_updates()
+        else:
+            due = self._wait_until(None if self._last_cycle is None else self._last_cycle + self.interval)
+        if due:
+            self.cycles += 1
+            self._last_cycle = time.monotonic()
+        return due
+    
+    def _wait_until(self, deadline):
+        """Sleep until a monotonic deadline, in slices"""
+        while not self._stopped.is_set():
+            remaining = 0 if deadline is None else deadline - time.monotonic()
+            if remaining <= 0:
+                return True
+            self.sleep(min(remaining, _WAIT_SLICE))
+        return False
+    
+    def _wait_for_updates(self):
+        """Event mode: wait for a first update, then for the batch to fill"""
+        if self._last_cycle is None:
+            return True  # The first cycle publishes the initial state
+        idle_deadline = None if self.idle_interval is None else self._last_cycle + self.idle_interval
+        while True:
+            if self._stopped.is_set():
+                return False
+            timeout = _WAIT_SLICE if idle_deadline is None else min(_WAIT_SLICE, idle_deadline - time.monotonic())
+            pending, since = self.source.wait_pending(1, max(timeout, 0))
+            if pending:
+                break
+            if idle_deadline is not None and time.monotonic() >= idle_deadline:
+                self.idle_cycles += 1
+                return True
+        
+        # Micro-batch: more updates may join until the oldest has waited max_latency
+        remaining = (time.monotonic() if since is None else since) + self.max_latency - time.monotonic()
+        if pending < self.max_batch and remaining > 0:
+            self.source.wait_pending(self.max_batch, remaining)
+        return True
+    
+    def stats(self):
+        """Scheduler settings and counters for status reports"""
+        stats = {'mode': self.mode, 'cycles': self.cycles}
+        if self.mode == 'event':
+            stats.update(max_latency=self.max_latency, max_batch=self.max_batch, idle_cycles=self.idle_cycles)
+        else:
+            stats['interval'] = self.interval
+        return stats
+
+
+class LatencyWindow:
+    """Percentiles over the most recent latency samples"""
+    
+    def __init__(self, size=None):
+        self._samples = deque(maxlen=config.ALERT_LATENCY_SAMPLES if size is None else size)
+        self._lock = threading.Lock()
+    
+    def __len__(self):
+        return len(self._samples)
+    
+    def add(self, values):
+        """
+        Record latency samples
+        
+        Args:
+            values: Iterable of latencies in milliseconds
+        """
+        with self._lock:
+            self._samples.extend(values)
+    
+    def percentiles(self):
+        """
+        Latency summary
+        
+        Returns:
+            Dictionary with count, p50, p95, p99 and max in milliseconds
+            (None without samples)
+        """
+        with self._lock:
+            samples = np.array(self._samples, dtype=np.float64)
+        if not len(samples):
+            return {'count': 0, 'p50': None, 'p95': None, 'p99': None, 'max': None}
+        p50, p95, p99 = np.percentile(samples, [50, 95, 99]).tolist()
+        return {
+            'count': len(samples),
+            'p50': round(p50, 1),
+            'p95': round(p95, 1),
+            'p99': round(p99, 1),
+            'max': round(float(samples.max()), 1)
+        }
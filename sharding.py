@@ -0,0 +1,195 @@
+"""
+Sharded herd evaluation for NavIC + LoRa monitoring system
+Splits alert evaluation of a shared-memory herd table across worker
+processes, each running an AlertEngine over its own shard of the rows
+"""
+
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy as np
+import config
+from alert_engine import AlertEngine, transition_dicts
+from herd_state import SharedHerdState, shared_columns
+
+
+class HerdShard:
+    """
+    Rows shard, shard + num_shards, shard + 2 * num_shards, ... of a herd table
+    
+    Columns are strided views of the shared buffer, so AlertEngine reads
+    positions and writes distances and statuses in place. Row r of the herd
+    is row r // num_shards of shard r % num_shards; the mapping does not
+    change when the herd grows, so each worker's engine state stays aligned.
+    """
+    
+    def __init__(self, columns, size, shard, num_shards):
+        self.size = len(range(shard, size, num_shards))
+        for name, column in columns.items():
+            setattr(self, name, column[shard:size:num_shards])
+
+
+def _worker(conn, shard, num_shards, thresholds, method, confidence):
+    """Evaluate one shard per request until told to stop (worker process entry point)"""
+    engine = AlertEngine(thresholds, method, confidence)
+    shm = None
+    try:
+        while True:
+            message = conn.recv()
+            if message is None:
+                break
+            commands, (name, capacity, size) = message
+            try:
+                for command, args in commands:
+                    getattr(engine, command)(*args)
+                if shm is None or shm.name != name:
+                    if shm is not None:
+                        shm.close()
+                    shm = shared_memory.SharedMemory(name=name)
+                columns = shared_columns(shm.buf, capacity)
+                result = engine.evaluate(HerdShard(columns, size, shard, num_shards), packed=True)
+                del columns  # Drop the views so the block can be closed on the next growth
+                conn.send((True, result))
+            except Exception as e:
+                conn.send((False, repr(e)))
+    finally:
+        if shm is not None:
+            shm.close()
+        conn.close()
+
+
+class ShardedAlertEngine:
+    """
+    AlertEngine spread over a pool of worker processes
+    
+    Same interface as AlertEngine, for a SharedHerdState herd. Each worker
+    owns an AlertEngine for one shard of rows (see HerdShard) and keeps its
+    incremental state between evaluations; handler, threshold and group
+    changes are queued and sent along with the next evaluation. Workers
+    write distances and statuses straight into the shared table and return
+    only their summary and transition columns, so per-cow data is never
+    pickled.
+    The pool starts on the first evaluation.
+    """
+    
+    def __init__(self, workers=None, thresholds=None, method='vincenty', confidence=None):
+        self.workers = max(1, config.SHARD_WORKERS if workers is None else workers)
+        self.thresholds = {config.DEFAULT_GROUP: config.DISTANCE_THRESHOLD}
+        self.thresholds.update(config.GROUP_THRESHOLDS if thresholds is None else thresholds)
+        self.method = method
+        self.confidence = config.ALERT_CONFIDENCE if confidence is None else confidence
+        self.handlers = {}
+        self._pending = [[] for _ in range(self.workers)]
+        self._connections = []
+        self._processes = []
+    
+    def start(self):
+        """Start the worker processes"""
+        if self._processes:
+            return
+        context = multiprocessing.get_context('spawn')  # No fork of a threaded server
+        for shard in range(self.workers):
+            parent_conn, child_conn = context.Pipe()
+            process = context.Process(
+                target=_worker,
+                args=(child_conn, shard, self.workers, self.thresholds, self.method, self.confidence),
+                daemon=True
+            )
+            process.start()
+            child_conn.close()
+            self._connections.append(parent_conn)
+            self._processes.append(process)
+    
+    def close(self):
+        """Stop the worker processes"""
+        for conn in self._connections:
+            try:
+                conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self._processes:
+            process.join(timeout=5)
+        for conn in self._connections:
+            conn.close()
+        self._connections, self._processes = [], []
+    
+    def _broadcast(self, command, *args):
+        for pending in self._pending:
+            pending.append((command, args))
+    
+    def _scatter(self, command, rows, *args):
+        """Queue a per-row command for the shards owning the rows, in shard-local rows"""
+        rows = np.asarray(rows, dtype=np.int64)
+        for shard, pending in enumerate(self._pending):
+            local = rows[rows % self.workers == shard] // self.workers
+            if len(local):
+                pending.append((command, (local, *args)))
+    
+    def set_handler(self, handler_id, position, group=None):
+        """Add or move a handler (see AlertEngine.set_handler)"""
+        group = config.DEFAULT_GROUP if group is None else group
+        position = (float(position[0]), float(position[1]))
+        if self.handlers.get(handler_id) == {'position': position, 'group': group}:
+            return
+        self.handlers[handler_id] = {'position': position, 'group': group}
+        self._broadcast('set_handler', handler_id, position, group)
+    
+    def remove_handler(self, handler_id):
+        """Remove a handler (see AlertEngine.remove_handler)"""
+        if self.handlers.pop(handler_id, None) is not None:
+            self._broadcast('remove_handler', handler_id)
+    
+    def set_group_threshold(self, group, threshold):
+        """Set a group's alert distance (see AlertEngine.set_group_threshold)"""
+        if self.thresholds.get(group) != threshold:
+            self.thresholds[group] = threshold
+            self._broadcast('set_group_threshold', group, threshold)
+    
+    def assign_group(self, rows, group):
+        """Assign cows to a herd group (see AlertEngine.assign_group)"""
+        self._scatter('assign_group', rows, group)
+    
+    def mark_dirty(self, rows):
+        """Force re-evaluation of some cows (see AlertEngine.mark_dirty)"""
+        self._scatter('mark_dirty', rows)
+    
+    def evaluate(self, herd):
+        """
+        Re-evaluate dirty cows in every shard, in parallel
+        
+        Args:
+            herd: SharedHerdState with current positions
+        
+        Returns:
+            Dictionary in the format of AlertEngine.evaluate(); transitions
+            are ordered by cow id
+        """
+        if not isinstance(herd, SharedHerdState):
+            raise TypeError('sharded evaluation needs a SharedHerdState herd (see create_herd_state)')
+        self.start()
+        table = herd.table()
+        for conn, pending in zip(self._connections, self._pending):
+            conn.send((pending, table))
+        self._pending = [[] for _ in range(self.workers)]
+        
+        results = []
+        for conn in self._connections:
+            ok, result = conn.recv()
+            if not ok:
+                raise RuntimeError(f'shard evaluation failed: {result}')
+            results.append(result)
+        
+        columns = {
+            key: np.concatenate([r['transitions'][key] for r in results])
+            for key in results[0]['transitions']
+        }
+        order = np.argsort(columns['cow_id'], kind='stable')
+        distances = [r for r in results if r['min_distance'] is not None]
+        return {
+            'transitions': transition_dicts({key: column[order] for key, column in columns.items()}),
+            'total_cows': herd.size,
+            'alerts_active': sum(r['alerts_active'] for r in results),
+            'cows_safe': sum(r['cows_safe'] for r in results),
+            'min_distance': min((r['min_distance'] for r in distances), default=None),
+            'max_distance': max((r['max_distance'] for r in distances), default=None),
+            'evaluated': sum(r['evaluated'] for r in results)
+        }
@@ -6,30 +6,70 @@ Generates realistic positioning data when hardware is unavailable
 import random
 import time
 import math
-from datetime import datetime
+import numpy as np
 import config
-from distance import calculate_position_from_rssi
+from clock import Tick
+from distance import (
+    assess_signal_quality,
+    calculate_position_from_rssi,
+    calculate_positions_from_rssi_batch
+)
+from herd_state import create_herd_state
+from multilateration import LIGHT_M_PER_NS, Multilateration
+from path_loss import active_table
+from tracking import TrackFilter, rssi_position_sigma
 
 
 class PositionSimulator:
     """Handles simulation of NavIC and LoRa positioning data"""
     
-    def __init__(self):
+    def __init__(self, batch_mode=None, seed=None, gateways=None):
         self.base_lat, self.base_lon = config.BASE_COORDS
         self.human_pos = (self.base_lat, self.base_lon)
-        self.cow_positions = [
-            (self.base_lat + 0.001, self.base_lon + 0.001),  # Cow 1
-            (self.base_lat - 0.001, self.base_lon + 0.002)   # Cow 2
-        ]
-        self.simulation_start_time = time.time()
+        self.herd = create_herd_state(capacity=2)
+        self._place_initial_cows()
+        self.simulation_start_time = time.monotonic()
+        
+        # Vectorized engine settings (see simulate_lora_batch)
+        self.batch_mode = config.SIMULATION_BATCH_MODE if batch_mode is None else batch_mode
+        self.seed = config.SIMULATION_SEED if seed is None else seed
+        self.rng = np.random.default_rng(self.seed)
+        
+        # RSSI-derived positions are smoothed per cow across ticks
+        self.tracker = TrackFilter() if config.TRACK_FILTER_ENABLED else None
+        
+        # Multi-gateway mode: cows walk around as ground truth, gateways hear
+        # them and positions are multilaterated fixes
+        if gateways is None and config.SIMULATION_GATEWAYS:
+            gateways = config.GATEWAYS or ring_gateways(
+                config.FIXED_HUMAN_COORDS if config.FIXED_POSITION_MODE else config.BASE_COORDS,
+                config.SIMULATION_GATEWAYS, config.SIMULATION_GATEWAY_RADIUS
+            )
+        self.multilateration = Multilateration(gateways) if gateways else None
+        self.truth_east = np.zeros(0)
+        self.truth_north = np.zeros(0)
+        self.last_fix = None
+        self._truth_time = None
     
-    def simulate_navic_position(self, base_lat=None, base_lon=None):
+    def _place_initial_cows(self):
+        """Seed the herd state with the two default cow positions"""
+        self.herd.resize(2)
+        self.herd.lat[:2] = (self.base_lat + 0.001, self.base_lat - 0.001)  # Cow 1, Cow 2
+        self.herd.lon[:2] = (self.base_lon + 0.001, self.base_lon + 0.002)
+    
+    @property
+    def cow_positions(self):
+        """Current cow positions as a list of (latitude, longitude) tuples"""
+        return self.herd.view().positions()
+    
+    def simulate_navic_position(self, base_lat=None, base_lon=None, tick=None):
         """
         Simulate realistic human movement using NavIC positioning
         
         Args:
             base_lat: Base latitude (optional, uses config default)
             base_lon: Base longitude (optional, uses config default)
+            tick: Tick of the update cycle (default: now)
         
         Returns:
             Tuple of (latitude, longitude) for current human position
@@ -45,7 +85,7 @@ class PositionSimulator:
             base_lon = self.base_lon
         
         # Create realistic movement pattern
-        elapsed_time = time.time() - self.simulation_start_time
+        elapsed_time = (time.monotonic() if tick is None else tick.monotonic) - self.simulation_start_time
         
         # Slow walking pattern with some randomness
         movement_scale = config.HUMAN_MOVEMENT_RANGE
@@ -69,18 +109,67 @@ class PositionSimulator:
         
         return self.human_pos
     
-    def simulate_lora_signals(self, human_pos, num_cows=2):
+    def simulate_lora_signals(self, human_pos, num_cows=2, tick=None):
         """
         Generate RSSI values and estimate cow positions based on signal strength
         
         Args:
             human_pos: Tuple of (latitude, longitude) for human position
             num_cows: Number of cows to simulate (default: 2)
+            tick: Tick of the update cycle (default: now)
         
         Returns:
             List of dictionaries containing cow data with positions and RSSI
         """
-        cow_data = []
+        return self.update_herd(human_pos, num_cows, tick=tick).to_dicts()
+    
+    def update_herd(self, human_pos, num_cows=2, elapsed_time=None, tick=None):
+        """
+        Run one LoRa simulation tick, writing results into the herd state columns
+        
+        Args:
+            human_pos: Tuple of (latitude, longitude) for human position
+            num_cows: Number of cows to simulate (default: 2)
+            elapsed_time: Simulation time in seconds (default: time since start)
+            tick: Tick of the update cycle, whose time stamps every cow
+                  (default: now)
+        
+        Returns:
+            Read-only HerdView over the updated herd state
+        """
+        herd = self.herd
+        herd.resize(num_cows)
+        
+        # Time-based variation is shared by every cow in this tick
+        tick = Tick() if tick is None else tick
+        if elapsed_time is None:
+            elapsed_time = tick.elapsed(self.simulation_start_time)
+        
+        if self.multilateration is not None:
+            sigma = self._simulate_multilateration(human_pos, num_cows, elapsed_time)
+        elif self.batch_mode:
+            simulate_lora_batch(
+                human_pos, num_cows, elapsed_time, self.rng,
+                out=(herd.lat[:num_cows], herd.lon[:num_cows], herd.rssi[:num_cows])
+            )
+            sigma = rssi_position_sigma(herd.rssi[:num_cows])
+        else:
+            self._simulate_lora_scalar(human_pos, num_cows, elapsed_time)
+            sigma = rssi_position_sigma(herd.rssi[:num_cows])
+        
+        herd.timestamp_ms[:num_cows] = tick.timestamp_ms
+        if self.tracker is not None:
+            self.tracker.smooth_herd(herd, sigma)
+        
+        # Positions changed: stale distance/status, spatial index needs moving
+        herd.positions_updated()
+        
+        return herd.view()
+    
+    def _simulate_lora_scalar(self, human_pos, num_cows, elapsed_time):
+        """Per-cow reference implementation of the LoRa tick"""
+        herd = self.herd
+        movement_scale = config.COW_MOVEMENT_RANGE
         
         for i in range(num_cows):
             # Simulate RSSI with realistic values
@@ -88,7 +177,6 @@ class PositionSimulator:
             base_rssi = random.uniform(config.RSSI_MIN, config.RSSI_MAX)
             
             # Add some time-based variation to simulate movement
-            elapsed_time = time.time() - self.simulation_start_time
             rssi_variation = 5 * math.sin(elapsed_time / (30 + i * 10))  # Different periods for each cow
             current_rssi = base_rssi + rssi_variation
             
@@ -101,29 +189,69 @@ class PositionSimulator:
             estimated_pos = calculate_position_from_rssi(human_pos, current_rssi, angle_offset)
             
             # Add some random movement to cow positions
-            movement_scale = config.COW_MOVEMENT_RANGE
-            lat_noise = movement_scale * random.uniform(-0.5, 0.5)
-            lon_noise = movement_scale * random.uniform(-0.5, 0.5)
-            
-            final_lat = estimated_pos[0] + lat_noise
-            final_lon = estimated_pos[1] + lon_noise
-            
-            cow_info = {
-                'id': i + 1,
-                'lat': final_lat,
-                'lon': final_lon,
-                'rssi': round(current_rssi, 1),
-                'timestamp': datetime.now().isoformat(),
-                'signal_quality': self._assess_signal_quality(current_rssi)
-            }
-            
-            cow_data.append(cow_info)
-            
-            # Update internal cow positions
-            if i < len(self.cow_positions):
-                self.cow_positions[i] = (final_lat, final_lon)
+            herd.lat[i] = estimated_pos[0] + movement_scale * random.uniform(-0.5, 0.5)
+            herd.lon[i] = estimated_pos[1] + movement_scale * random.uniform(-0.5, 0.5)
+            herd.rssi[i] = round(current_rssi, 1)
+    
+    def _move_truth(self, human_pos, num_cows, elapsed_time):
+        """Random-walk the ground-truth cows, placing new ones near the handler"""
+        dt = 0.0 if self._truth_time is None else max(elapsed_time - self._truth_time, 0.0)
+        self._truth_time = elapsed_time
+        human_east, human_north = self.multilateration.to_plane(human_pos[0], human_pos[1])
+        
+        known = min(len(self.truth_east), num_cows)
+        east, north = np.empty(num_cows), np.empty(num_cows)
+        east[:known], north[:known] = self.truth_east[:known], self.truth_north[:known]
         
-        return cow_data
+        # New cows: uniform over a disk inside the alert distance and a bit beyond
+        radius = 1.5 * config.DISTANCE_THRESHOLD * np.sqrt(self.rng.uniform(0, 1, num_cows - known))
+        angle = self.rng.uniform(0, 2 * np.pi, num_cows - known)
+        east[known:] = human_east + radius * np.cos(angle)
+        north[known:] = human_north + radius * np.sin(angle)
+        
+        step = self.rng.normal(0, config.SIMULATION_COW_SPEED * dt, (2, known))
+        east[:known] += step[0]
+        north[:known] += step[1]
+        
+        # Cows wandering off too far turn back
+        offset_east, offset_north = east - human_east, north - human_north
+        scale = np.minimum(1.0, 2.5 * config.DISTANCE_THRESHOLD / np.maximum(np.hypot(offset_east, offset_north), 1e-9))
+        self.truth_east = human_east + offset_east * scale
+        self.truth_north = human_north + offset_north * scale
+    
+    def _simulate_multilateration(self, human_pos, num_cows, elapsed_time):
+        """
+        Multi-gateway tick: readings of the ground truth, fixed by multilateration
+        
+        Returns:
+            Per-cow position errors (m) for the track filter
+        """
+        herd = self.herd
+        solver = self.multilateration
+        self._move_truth(human_pos, num_cows, elapsed_time)
+        rssi, arrival_ns = simulate_gateway_readings(
+            self.truth_east, self.truth_north, solver.gateway_east, solver.gateway_north, self.rng,
+            gateways=solver.names, collars=herd.ids[:num_cows]
+        )
+        
+        if config.MULTILAT_MODE == 'tdoa':
+            fix = solver.locate_tdoa(arrival_ns)
+        else:
+            fix = solver.locate_rssi(rssi, collars=herd.ids[:num_cows])
+        self.last_fix = fix
+        
+        # Unheard cows keep their last position; weak fixes count for little
+        heard = fix.gateways > 0
+        herd.lat[:num_cows] = np.where(heard, fix.lat, herd.lat[:num_cows])
+        herd.lon[:num_cows] = np.where(heard, fix.lon, herd.lon[:num_cows])
+        strongest = np.max(np.where(np.isnan(rssi), -np.inf, rssi), axis=1, initial=-np.inf)
+        herd.rssi[:num_cows] = np.round(np.maximum(strongest, config.RSSI_MIN), 1)
+        herd.accuracy[:num_cows] = np.where(fix.valid, fix.accuracy, 0.0)
+        return np.where(fix.valid, fix.accuracy, 1000.0)
+    
+    def truth_positions(self):
+        """Ground-truth (latitudes, longitudes) of the multi-gateway simulation"""
+        return self.multilateration.to_geo(self.truth_east, self.truth_north)
     
     def _assess_signal_quality(self, rssi):
         """
@@ -135,37 +263,54 @@ class PositionSimulator:
         Returns:
             String describing signal quality
         """
-        if rssi > -70:
-            return 'Excellent'
-        elif rssi > -85:
-            return 'Good'
-        elif rssi > -100:
-            return 'Fair'
-        else:
-            return 'Poor'
+        return assess_signal_quality(rssi)
     
-    def get_current_positions(self):
+    def get_current_positions(self, tick=None):
         """
         Get current positions for human and all cows
         
+        Args:
+            tick: Tick of the update cycle (default: now)
+        
         Returns:
             Dictionary with human coordinates and cow data
         """
+        position_data = self.get_current_herd(tick)
+        position_data['cows'] = position_data['cows'].to_dicts()
+        return position_data
+    
+    def get_current_herd(self, tick=None):
+        """
+        Get current positions with the herd as a lazy columnar view
+        
+        Same layout as get_current_positions(), but 'cows' is a read-only
+        HerdView over self.herd; per-cow dicts are only built on demand.
+        
+        Args:
+            tick: Tick of the update cycle (default: now)
+        
+        Returns:
+            Dictionary with human coordinates, herd view and the tick time
+            (system_time, and timestamp_ms in epoch milliseconds)
+        """
+        tick = Tick() if tick is None else tick
+        
         # Update human position with NavIC simulation
-        human_coords = self.simulate_navic_position()
+        human_coords = self.simulate_navic_position(tick=tick)
         
         # Generate cow positions with LoRa simulation
-        cow_data = self.simulate_lora_signals(human_coords)
+        herd_view = self.update_herd(human_coords, config.NUM_COWS, tick=tick)
         
         return {
             'human': {
                 'lat': human_coords[0],
                 'lon': human_coords[1],
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': tick.iso,
                 'positioning_system': 'NavIC'
             },
-            'cows': cow_data,
-            'system_time': datetime.now().isoformat(),
+            'cows': herd_view,
+            'system_time': tick.iso,
+            'timestamp_ms': tick.timestamp_ms,
             'update_interval': config.UPDATE_INTERVAL
         }
     
@@ -179,7 +324,8 @@ class PositionSimulator:
         Returns:
             Position data for the specified scenario
         """
-        human_pos = self.simulate_navic_position()
+        tick = Tick()
+        human_pos = self.simulate_navic_position(tick=tick)
         
         if scenario_type == 'alert':
             # Force cows to be beyond alert threshold
@@ -204,37 +350,152 @@ class PositionSimulator:
                     'lat': cow_lat,
                     'lon': cow_lon,
                     'rssi': round(rssi, 1),
-                    'timestamp': datetime.now().isoformat(),
+                    'timestamp': tick.iso,
                     'signal_quality': self._assess_signal_quality(rssi)
                 })
         
         elif scenario_type == 'normal':
             # Keep cows within safe distance
-            cow_data = self.simulate_lora_signals(human_pos)
+            cow_data = self.simulate_lora_signals(human_pos, tick=tick)
             
         else:  # mixed scenario
-            cow_data = self.simulate_lora_signals(human_pos)
+            cow_data = self.simulate_lora_signals(human_pos, tick=tick)
             
         return {
             'human': {
                 'lat': human_pos[0],
                 'lon': human_pos[1],
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': tick.iso,
                 'positioning_system': 'NavIC'
             },
             'cows': cow_data,
-            'system_time': datetime.now().isoformat(),
+            'system_time': tick.iso,
             'scenario_type': scenario_type
         }
     
     def reset_simulation(self):
         """Reset simulation to initial state"""
         self.human_pos = (self.base_lat, self.base_lon)
-        self.cow_positions = [
-            (self.base_lat + 0.001, self.base_lon + 0.001),
-            (self.base_lat - 0.001, self.base_lon + 0.002)
-        ]
-        self.simulation_start_time = time.time()
+        self.herd = create_herd_state(capacity=2)
+        self._place_initial_cows()
+        self.simulation_start_time = time.monotonic()
+        self.rng = np.random.default_rng(self.seed)
+        if self.tracker is not None:
+            self.tracker.reset()
+        self.truth_east = np.zeros(0)
+        self.truth_north = np.zeros(0)
+        self.last_fix = None
+        self._truth_time = None
+
+
+def simulate_lora_batch(human_pos, num_cows, elapsed_time, rng, out=None):
+    """
+    Vectorized LoRa tick: RSSI, angle offsets, RSSI-to-position inversion and
+    noise for all cows at once
+    
+    Follows the same model as PositionSimulator's per-cow loop, so the output
+    has the same distribution; with a seeded Generator and a fixed
+    elapsed_time the result is identical on every run.
+    
+    Args:
+        human_pos: Tuple of (latitude, longitude) for human position
+        num_cows: Number of cows to simulate
+        elapsed_time: Seconds since the simulation started
+        rng: numpy.random.Generator supplying the random components
+        out: Optional (lats, lons, rssi) arrays of length num_cows to write into
+    
+    Returns:
+        Tuple of (lats, lons, rssi) arrays
+    """
+    index = np.arange(num_cows, dtype=np.float64)
+    
+    # Base RSSI plus a per-cow periodic variation, clamped to realistic bounds
+    rssi = rng.uniform(config.RSSI_MIN, config.RSSI_MAX, num_cows)
+    rssi += 5 * np.sin(elapsed_time / (30 + index * 10))
+    np.clip(rssi, config.RSSI_MIN, config.RSSI_MAX, out=rssi)
+    
+    # Rotating angle offsets, 120 degrees apart per cow
+    angle_offsets = index * 120 + (elapsed_time / 10) % 360
+    lats, lons = calculate_positions_from_rssi_batch(human_pos, rssi, angle_offsets)
+    
+    # Random movement noise
+    noise = rng.uniform(-0.5, 0.5, (2, num_cows))
+    noise *= config.COW_MOVEMENT_RANGE
+    lats += noise[0]
+    lons += noise[1]
+    rssi = np.round(rssi, 1)
+    
+    if out is None:
+        return lats, lons, rssi
+    
+    out_lats, out_lons, out_rssi = out
+    out_lats[:] = lats
+    out_lons[:] = lons
+    out_rssi[:] = rssi
+    return out_lats, out_lons, out_rssi
+
+
+def ring_gateways(center, count, radius):
+    """
+    Gateways evenly spaced on a circle
+    
+    Args:
+        center: (latitude, longitude) of the circle's center
+        count: Number of gateways
+        radius: Circle radius in meters
+    
+    Returns:
+        Dictionary of gateway name -> (latitude, longitude)
+    """
+    angle = 2 * np.pi * np.arange(count) / count
+    lats = center[0] + radius * np.cos(angle) / 111000
+    lons = center[1] + radius * np.sin(angle) / (111000 * math.cos(math.radians(center[0])))
+    return {f'gw-{i + 1}': (lat, lon) for i, (lat, lon) in enumerate(zip(lats.tolist(), lons.tolist()))}
+
+
+def simulate_gateway_readings(east, north, gateway_east, gateway_north, rng, gateways=None, collars=None,
+                              sigma_db=None, timing_sigma_ns=None, sensitivity=None):
+    """
+    Readings of every gateway for cows at known positions
+    
+    RSSI follows the active path-loss model (per gateway and collar) with
+    log-normal shadowing; arrival times are the flight times after a random
+    transmit time, with timestamp noise. Gateways only hear cows above their
+    sensitivity.
+    
+    Args:
+        east, north: Ground-truth cow positions on the local plane (m)
+        gateway_east, gateway_north: Gateway positions on the same plane (m)
+        rng: numpy.random.Generator supplying the noise
+        gateways: Gateway names, for per-gateway calibration
+        collars: Cow ids, for per-collar calibration
+        sigma_db: Shadowing standard deviation in dB (default from config)
+        timing_sigma_ns: Timestamp error in ns (default from config)
+        sensitivity: Weakest RSSI a gateway receives (default: config.RSSI_MIN)
+    
+    Returns:
+        Tuple of (rssi, arrival_ns) (cows x gateways) arrays, NaN where a
+        gateway did not hear the cow
+    """
+    sigma_db = config.RSSI_SHADOWING_SIGMA if sigma_db is None else sigma_db
+    timing_sigma_ns = config.TDOA_TIMING_SIGMA_NS if timing_sigma_ns is None else timing_sigma_ns
+    sensitivity = config.RSSI_MIN if sensitivity is None else sensitivity
+    model = active_table().model
+    
+    distance = np.maximum(np.hypot(east[:, None] - gateway_east, north[:, None] - gateway_north), 1.0)
+    rssi = np.empty_like(distance)
+    offsets = 0.0 if collars is None else np.array([model.collars.get(c, 0.0) for c in np.asarray(collars).tolist()])
+    for j in range(distance.shape[1]):
+        rssi0, n = model.gateway_parameters(None if gateways is None else gateways[j])
+        rssi[:, j] = rssi0 + offsets - 10 * n * np.log10(distance[:, j])
+    rssi += rng.normal(0, sigma_db, rssi.shape)
+    rssi = np.round(rssi, 1)
+    
+    transmit_ns = rng.uniform(0, 1e9, (len(distance), 1))
+    arrival_ns = transmit_ns + distance / LIGHT_M_PER_NS + rng.normal(0, timing_sigma_ns, distance.shape)
+    
+    heard = rssi >= sensitivity
+    return np.where(heard, rssi, np.nan), np.where(heard, arrival_ns, np.nan)
 
 
 # Global simulator instance
@@ -251,6 +512,16 @@ def get_current_positions():
     return simulator.get_current_positions()
 
 
+def get_current_herd():
+    """
+    Convenience function to get current positions with a columnar herd view
+    
+    Returns:
+        Current position data with 'cows' as a read-only HerdView
+    """
+    return simulator.get_current_herd()
+
+
 def simulate_navic_position(base_lat=None, base_lon=None):
     """
     Convenience function for NavIC position simulation
@@ -0,0 +1,356 @@
+"""
+Spatial index for NavIC + LoRa monitoring system
+Grid-bucket index over the herd for radius, nearest-K and geofence queries
+"""
+
+import math
+import numpy as np
+import config
+from distance import (
+    ALERT_STATUSES,
+    WGS84_A,
+    WGS84_E2,
+    calculate_distances_batch
+)
+
+
+# Cell keys pack (ix, iy) grid coordinates into one int64
+_KEY_OFFSET = 1 << 20
+_KEY_STRIDE = 1 << 21
+
+# Radius queries cover slightly more cells than needed so projection error
+# can never drop a cow; candidates are then checked with exact distances
+_RADIUS_MARGIN = 1.01
+
+# Rings of cells query_nearest walks before scanning every row instead
+_NEAREST_MAX_RINGS = 16
+
+
+class GridIndex:
+    """
+    Incrementally updatable uniform-grid index in a local metric projection
+    
+    Positions are projected to meters around a fixed origin and hashed into
+    square cells of cell_size meters. Rows are herd state row numbers. Only
+    rows whose cell changed are moved on update, so maintenance cost scales
+    with movement, and queries only touch cells near the query region.
+    """
+    
+    def __init__(self, cell_size=None, origin=None):
+        self.cell_size = config.SPATIAL_CELL_SIZE if cell_size is None else cell_size
+        self.origin = config.BASE_COORDS if origin is None else origin
+        
+        # Meters per degree from the WGS-84 radii of curvature at the origin
+        lat0 = math.radians(self.origin[0])
+        w = math.sqrt(1 - WGS84_E2 * math.sin(lat0) ** 2)
+        self._m_per_deg_lat = math.radians(1) * WGS84_A * (1 - WGS84_E2) / w ** 3
+        self._m_per_deg_lon = math.radians(1) * WGS84_A / w * math.cos(lat0)
+        
+        self.size = 0
+        self._lat = np.empty(0)
+        self._lon = np.empty(0)
+        self._keys = np.empty(0, dtype=np.int64)
+        self._buckets = {}
+    
+    def __len__(self):
+        return self.size
+    
+    def project(self, lats, lons):
+        """
+        Project latitudes/longitudes to local metric coordinates
+        
+        Args:
+            lats: Array-like of latitudes in degrees
+            lons: Array-like of longitudes in degrees
+        
+        Returns:
+            Tuple of (x, y) arrays in meters east/north of the origin
+        """
+        x = (np.asarray(lons, dtype=np.float64) - self.origin[1]) * self._m_per_deg_lon
+        y = (np.asarray(lats, dtype=np.float64) - self.origin[0]) * self._m_per_deg_lat
+        return x, y
+    
+    def _cell_coords(self, lats, lons):
+        x, y = self.project(lats, lons)
+        return np.floor(x / self.cell_size).astype(np.int64), np.floor(y / self.cell_size).astype(np.int64)
+    
+    def _cell_keys(self, lats, lons):
+        ix, iy = self._cell_coords(lats, lons)
+        return (ix + _KEY_OFFSET) * _KEY_STRIDE + (iy + _KEY_OFFSET)
+    
+    def update(self, lats, lons, rows=None):
+        """
+        Insert or move entities
+        
+        Args:
+            lats: Array of latitudes in degrees
+            lons: Array of longitudes in degrees
+            rows: Row numbers being updated; None means rows 0..len(lats)-1
+                  and sets the index size to len(lats)
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        if rows is None:
+            self.resize(len(lats))
+            rows = np.arange(len(lats))
+        else:
+            rows = np.asarray(rows, dtype=np.int64)
+            if len(rows) and rows.max() >= self.size:
+                self.resize(int(rows.max()) + 1)
+        
+        new_keys = self._cell_keys(lats, lons)
+        self._lat[rows] = lats
+        self._lon[rows] = lons
+        
+        moved = new_keys != self._keys[rows]
+        moved_rows = rows[moved]
+        if len(moved_rows) > self.size // 4:
+            # Most of the herd changed cell; regrouping in bulk is cheaper
+            self._keys[rows] = new_keys
+            self._rebuild()
+            return
+        
+        for row, old_key, new_key in zip(moved_rows.tolist(), self._keys[moved_rows].tolist(),
+                                         new_keys[moved].tolist()):
+            self._discard(old_key, row)
+            self._buckets.setdefault(new_key, set()).add(row)
+        self._keys[moved_rows] = new_keys[moved]
+    
+    def resize(self, size):
+        """
+        Set the number of indexed rows, dropping rows beyond size
+        
+        Args:
+            size: Number of rows
+        """
+        if size < self.size:
+            for row, key in zip(range(size, self.size), self._keys[size:self.size].tolist()):
+                self._discard(key, row)
+        elif size > len(self._keys):
+            capacity = max(size, 2 * len(self._keys))
+            self._lat = np.resize(self._lat, capacity)
+            self._lon = np.resize(self._lon, capacity)
+            self._keys = np.resize(self._keys, capacity)
+        # Unindexed rows carry a key that never matches a real cell
+        self._keys[self.size:size] = -1
+        self.size = size
+    
+    def _discard(self, key, row):
+        bucket = self._buckets.get(key)
+        if bucket is not None:
+            bucket.discard(row)
+            if not bucket:
+                del self._buckets[key]
+    
+    def _rebuild(self):
+        """Regroup every row into buckets from the key array"""
+        keys = self._keys[:self.size]
+        order = np.argsort(keys, kind='stable')
+        unique_keys, starts = np.unique(keys[order], return_index=True)
+        groups = np.split(order, starts[1:])
+        self._buckets = {
+            key: set(group.tolist())
+            for key, group in zip(unique_keys.tolist(), groups)
+            if key >= 0
+        }
+    
+    def _rows_in_cells(self, ix_range, iy_range):
+        """Rows in the rectangle of cells [ix0, ix1] x [iy0, iy1]"""
+        ix0, ix1 = ix_range
+        iy0, iy1 = iy_range
+        found = []
+        if (ix1 - ix0 + 1) * (iy1 - iy0 + 1) > len(self._buckets):
+            # Query region spans more cells than are occupied; scan buckets
+            for key, bucket in self._buckets.items():
+                ix = key // _KEY_STRIDE - _KEY_OFFSET
+                iy = key % _KEY_STRIDE - _KEY_OFFSET
+                if ix0 <= ix <= ix1 and iy0 <= iy <= iy1:
+                    found.extend(bucket)
+        else:
+            for ix in range(ix0, ix1 + 1):
+                base = (ix + _KEY_OFFSET) * _KEY_STRIDE + _KEY_OFFSET
+                for iy in range(iy0, iy1 + 1):
+                    bucket = self._buckets.get(base + iy)
+                    if bucket:
+                        found.extend(bucket)
+        return np.fromiter(found, dtype=np.int64, count=len(found))
+    
+    def query_radius(self, center, radius, return_distances=False):
+        """
+        Rows within radius meters of a point
+        
+        Args:
+            center: Tuple of (latitude, longitude)
+            radius: Radius in meters
+            return_distances: Also return exact distances for the rows
+        
+        Returns:
+            Array of rows (and array of distances in meters if requested)
+        """
+        x, y = self.project(center[0], center[1])
+        reach = radius * _RADIUS_MARGIN
+        candidates = self._rows_in_cells(
+            (math.floor((x - reach) / self.cell_size), math.floor((x + reach) / self.cell_size)),
+            (math.floor((y - reach) / self.cell_size), math.floor((y + reach) / self.cell_size))
+        )
+        distances = calculate_distances_batch(center, self._lat[candidates], self._lon[candidates])
+        inside = distances <= radius
+        if return_distances:
+            return candidates[inside], distances[inside]
+        return candidates[inside]
+    
+    def query_radius_many(self, centers, radius):
+        """
+        Run query_radius for several points (e.g. every handler)
+        
+        Args:
+            centers: Sequence of (latitude, longitude) tuples
+            radius: Radius in meters, or a sequence with one radius per center
+        
+        Returns:
+            List of row arrays, one per center
+        """
+        radii = np.broadcast_to(np.asarray(radius, dtype=np.float64), (len(centers),))
+        return [self.query_radius(center, r) for center, r in zip(centers, radii.tolist())]
+    
+    def query_nearest(self, center, k):
+        """
+        The k rows nearest to a point
+        
+        Searches rings of cells outwards from the point's cell until the k-th
+        nearest candidate is closer than any unvisited cell can be. Past
+        _NEAREST_MAX_RINGS rings (sparse herds, far outliers) it scans every
+        row at once instead.
+        
+        Args:
+            center: Tuple of (latitude, longitude)
+            k: Number of neighbours
+        
+        Returns:
+            Tuple of (rows, distances in meters), nearest first
+        """
+        k = min(k, self.size)
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        
+        x, y = self.project(center[0], center[1])
+        cx, cy = math.floor(x / self.cell_size), math.floor(y / self.cell_size)
+        occupied = np.array(list(self._buckets.keys()), dtype=np.int64)
+        max_ring = int(max(
+            np.abs(occupied // _KEY_STRIDE - _KEY_OFFSET - cx).max(),
+            np.abs(occupied % _KEY_STRIDE - _KEY_OFFSET - cy).max()
+        ))
+        
+        found, planar = [], []  # Rows and planar distances, per ring
+        count = 0
+        for ring in range(max_ring + 1):
+            if ring > _NEAREST_MAX_RINGS:
+                rows = np.flatnonzero(self._keys[:self.size] >= 0)
+                break
+            ring_rows = []
+            for ix in range(cx - ring, cx + ring + 1):
+                step = 1 if abs(ix - cx) == ring else 2 * ring
+                for iy in range(cy - ring, cy + ring + 1, max(step, 1)):
+                    bucket = self._buckets.get((ix + _KEY_OFFSET) * _KEY_STRIDE + iy + _KEY_OFFSET)
+                    if bucket:
+                        ring_rows.extend(bucket)
+            if ring_rows:
+                rows = np.fromiter(ring_rows, dtype=np.int64, count=len(ring_rows))
+                px, py = self.project(self._lat[rows], self._lon[rows])
+                found.append(rows)
+                planar.append(np.hypot(px - x, py - y))
+                count += len(rows)
+            if count >= k:
+                kth = np.partition(np.concatenate(planar), k - 1)[k - 1]
+                if kth * _RADIUS_MARGIN <= ring * self.cell_size:
+                    rows = np.concatenate(found)
+                    break
+        else:
+            rows = np.concatenate(found)
+        
+        distances = calculate_distances_batch(center, self._lat[rows], self._lon[rows])
+        nearest = np.argsort(distances, kind='stable')[:k]
+        return rows[nearest], distances[nearest]
+    
+    def query_outside_polygon(self, polygon):
+        """
+        Rows outside a geofence polygon
+        
+        Cells that do not overlap the polygon's bounding box are returned
+        wholesale; only rows in overlapping cells get a point-in-polygon test.
+        
+        Args:
+            polygon: Sequence of (latitude, longitude) vertices
+        
+        Returns:
+            Array of rows outside the polygon
+        """
+        vertices = np.asarray(polygon, dtype=np.float64)
+        ix, iy = self._cell_coords(vertices[:, 0], vertices[:, 1])
+        ix0, ix1, iy0, iy1 = ix.min(), ix.max(), iy.min(), iy.max()
+        
+        outside, boundary = [], []
+        for key, bucket in self._buckets.items():
+            kx = key // _KEY_STRIDE - _KEY_OFFSET
+            ky = key % _KEY_STRIDE - _KEY_OFFSET
+            if ix0 <= kx <= ix1 and iy0 <= ky <= iy1:
+                boundary.extend(bucket)
+            else:
+                outside.extend(bucket)
+        
+        boundary = np.fromiter(boundary, dtype=np.int64, count=len(boundary))
+        inside = points_in_polygon(self._lat[boundary], self._lon[boundary], vertices)
+        result = np.concatenate([np.fromiter(outside, dtype=np.int64, count=len(outside)), boundary[~inside]])
+        result.sort()
+        return result
+
+
+def points_in_polygon(lats, lons, polygon):
+    """
+    Vectorized even-odd (ray casting) point-in-polygon test
+    
+    Treats latitude/longitude as planar, which is accurate for field-sized
+    geofences.
+    
+    Args:
+        lats: Array of point latitudes
+        lons: Array of point longitudes
+        polygon: Array of (latitude, longitude) vertices
+    
+    Returns:
+        Boolean array, True where the point is inside
+    """
+    polygon = np.asarray(polygon, dtype=np.float64)
+    inside = np.zeros(len(lats), dtype=bool)
+    y1, x1 = polygon[-1]
+    for y2, x2 in polygon.tolist():
+        crosses = (y1 > lats) != (y2 > lats)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x_cross = x1 + (lats - y1) * (x2 - x1) / (y2 - y1)
+        inside ^= crosses & (lons < x_cross)
+        y1, x1 = y2, x2
+    return inside
+
+
+def determine_alert_statuses(index, human_pos, threshold=None):
+    """
+    Alert status codes for every indexed row using a radius query
+    
+    Index-backed counterpart of distance.determine_alert_status: only the
+    cells around the human are examined, everything else is beyond the
+    threshold by construction.
+    
+    Args:
+        index: GridIndex over the herd (e.g. HerdState.spatial_index())
+        human_pos: Tuple of (latitude, longitude) for human position
+        threshold: Safety threshold in meters (default from config)
+    
+    Returns:
+        NumPy uint8 array of status codes (see distance.ALERT_STATUSES)
+    """
+    if threshold is None:
+        threshold = config.DISTANCE_THRESHOLD
+    
+    status_codes = np.full(index.size, ALERT_STATUSES.index('alert'), dtype=np.uint8)
+    status_codes[index.query_radius(human_pos, threshold)] = ALERT_STATUSES.index('safe')
+    return status_codes
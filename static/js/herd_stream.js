@@ -0,0 +1,169 @@
+// Decoders for the server's position stream: JSON keyframes + deltas,
+// binary frames and viewport frames
+
+// Rebuilds full position updates from the server's keyframe + delta stream
+class HerdStreamDecoder {
+    constructor() {
+        this.seq = null;
+        this.origin = null;
+        this.coordQuantum = null;
+        this.cows = new Map();
+    }
+    
+    // Replace all state with a keyframe; returns the decoded update
+    applyKeyframe(frame) {
+        this.origin = frame.origin;
+        this.coordQuantum = frame.coord_quantum;
+        this.cows.clear();
+        frame.cows.forEach(row => this.cows.set(row[0], row));
+        this.seq = frame.seq;
+        return this.toUpdate(frame);
+    }
+    
+    // Apply a diff; returns null if it does not follow the state we hold
+    applyDelta(frame) {
+        if (this.seq === null || frame.base_seq !== this.seq) {
+            return null;
+        }
+        frame.cows.forEach(row => this.cows.set(row[0], row));
+        frame.removed.forEach(id => this.cows.delete(id));
+        this.seq = frame.seq;
+        return this.toUpdate(frame);
+    }
+    
+    // Expand compact rows [id, lat_q, lon_q, rssi_x10, distance_x10, status]
+    // into the position_update layout used by the map and sidebar
+    toUpdate(frame) {
+        const cows = [];
+        this.cows.forEach(row => {
+            const rssi = row[3] / 10;
+            cows.push({
+                id: row[0],
+                lat: this.origin[0] + row[1] * this.coordQuantum,
+                lon: this.origin[1] + row[2] * this.coordQuantum,
+                rssi: rssi,
+                distance: row[4] / 10,
+                status: row[5] === 0 ? 'safe' : (row[5] === 1 ? 'alert' : 'unknown'),
+                signal_quality: HerdStreamDecoder.signalQuality(rssi),
+                timestamp: frame.system_time
+            });
+        });
+        
+        return {
+            human: frame.human,
+            cows: cows,
+            system_time: frame.system_time,
+            update_count: frame.update_count,
+            alerts_active: frame.alerts_active,
+            cows_safe: frame.cows_safe,
+            distance_summary: frame.distance_summary
+        };
+    }
+    
+    // Decode a binary frame (wire.encode_binary_frame) using typed-array
+    // views straight onto the received buffer
+    static decodeBinaryFrame(buffer) {
+        const bytes = new Uint8Array(buffer);
+        const magic = String.fromCharCode(bytes[0], bytes[1], bytes[2], bytes[3]);
+        if (magic !== 'HRD1') {
+            throw new Error('Not a herd binary frame');
+        }
+        
+        const headerLength = new DataView(buffer).getUint32(4, true);
+        const header = JSON.parse(new TextDecoder().decode(bytes.subarray(8, 8 + headerLength)));
+        const count = header.count;
+        let offset = 8 + headerLength;
+        const column = (ArrayType) => {
+            const values = new ArrayType(buffer, offset, count);
+            offset += count * ArrayType.BYTES_PER_ELEMENT;
+            return values;
+        };
+        
+        const ids = column(Uint32Array);
+        const lat = column(Int32Array);
+        const lon = column(Int32Array);
+        const distance = column(Uint32Array);
+        const rssi = column(Int16Array);
+        const status = column(Uint8Array);
+        
+        const cows = new Array(count);
+        for (let i = 0; i < count; i++) {
+            cows[i] = {
+                id: ids[i],
+                lat: lat[i] / header.coord_scale,
+                lon: lon[i] / header.coord_scale,
+                rssi: rssi[i] / 10,
+                distance: distance[i] / 10,
+                status: status[i] === 0 ? 'safe' : (status[i] === 1 ? 'alert' : 'unknown'),
+                signal_quality: HerdStreamDecoder.signalQuality(rssi[i] / 10),
+                timestamp: header.system_time
+            };
+        }
+        
+        return {
+            human: header.human,
+            cows: cows,
+            system_time: header.system_time,
+            update_count: header.update_count,
+            alerts_active: header.alerts_active,
+            cows_safe: header.cows_safe,
+            distance_summary: header.distance_summary
+        };
+    }
+    
+    // Expand a viewport frame (viewport.ViewportFrames) into the update
+    // shape used by the dashboard, plus a list of clusters
+    static decodeViewportFrame(frame) {
+        const header = frame.header;
+        const cows = [];
+        const clusters = [];
+        frame.tiles.forEach(tile => {
+            (tile.cows || []).forEach(row => {
+                cows.push({
+                    id: row[0],
+                    lat: row[1],
+                    lon: row[2],
+                    rssi: row[3],
+                    distance: row[4],
+                    status: row[5] === 0 ? 'safe' : (row[5] === 1 ? 'alert' : 'unknown'),
+                    signal_quality: HerdStreamDecoder.signalQuality(row[3]),
+                    timestamp: header.system_time
+                });
+            });
+            (tile.clusters || []).forEach(row => {
+                clusters.push({ lat: row[0], lon: row[1], count: row[2], alerts: row[3] });
+            });
+        });
+        
+        return {
+            human: header.human,
+            cows: cows,
+            clusters: clusters,
+            system_time: header.system_time,
+            update_count: header.update_count,
+            alerts_active: header.alerts_active,
+            cows_safe: header.cows_safe,
+            distance_summary: header.distance_summary
+        };
+    }
+    
+    // Payloads the server pre-encodes once per cycle arrive as JSON bytes
+    // (an ArrayBuffer); older servers send parsed objects
+    static decodeJsonPayload(data) {
+        if (data instanceof ArrayBuffer) {
+            return JSON.parse(new TextDecoder().decode(data));
+        }
+        if (typeof data === 'string') {
+            return JSON.parse(data);
+        }
+        return data;
+    }
+    
+    // Same bands as distance.assess_signal_quality on the server
+    static signalQuality(rssi) {
+        if (rssi > -70) return 'Excellent';
+        if (rssi > -85) return 'Good';
+        if (rssi > -100) return 'Fair';
+        return 'Poor';
+    }
+}
@@ -0,0 +1,53 @@
+"""
+Tests for the incremental multi-handler alert engine
+"""
+import config
+from alert_engine import AlertEngine
+
+ORIGIN = config.FIXED_HUMAN_COORDS
+METERS_PER_DEG = 110574.0  # Latitude degree length near the origin
+
+
+def test_only_transitions_are_reported(make_herd):
+    herd = make_herd(north_m=[50, 150, 80])
+    engine = AlertEngine(thresholds={})
+    engine.set_handler('h1', ORIGIN)
+    
+    first = engine.evaluate(herd)
+    assert [(t['cow_id'], t['from'], t['to']) for t in first['transitions']] == [(2, None, 'alert')]
+    assert first['alerts_active'] == 1
+    
+    # Nothing moved: no work, no events
+    second = engine.evaluate(herd)
+    assert second['evaluated'] == 0
+    assert second['transitions'] == []
+    
+    herd.lat[0] = ORIGIN[0] + 200 / METERS_PER_DEG
+    herd.lat[1] = ORIGIN[0] + 20 / METERS_PER_DEG
+    third = engine.evaluate(herd)
+    assert third['evaluated'] == 2
+    assert sorted((t['cow_id'], t['to']) for t in third['transitions']) == [(1, 'alert'), (2, 'safe')]
+    assert third['alerts_active'] == 1
+    assert herd.status[:3].tolist() == [1, 0, 0]
+
+
+def test_nearest_handler_and_group_thresholds(make_herd):
+    herd = make_herd(north_m=[0, 300, 600])
+    engine = AlertEngine(thresholds={'east': 50})
+    engine.set_handler('north', (ORIGIN[0] + 600 / METERS_PER_DEG, ORIGIN[1]))
+    engine.set_handler('south', ORIGIN)
+    engine.assign_group([1], 'east')
+    engine.set_handler('east-1', (ORIGIN[0] + 360 / METERS_PER_DEG, ORIGIN[1]), group='east')
+    
+    result = engine.evaluate(herd)
+    
+    by_cow = {t['cow_id']: t for t in result['transitions']}
+    assert set(by_cow) == {2}
+    assert by_cow[2]['handler_id'] == 'east-1'
+    assert engine.nearest_handler.tolist() == [1, 2, 0]
+    
+    # Relaxing the group threshold re-evaluates only that group
+    engine.set_group_threshold('east', 100)
+    relaxed = engine.evaluate(herd)
+    assert relaxed['evaluated'] == 1
+    assert [(t['cow_id'], t['to']) for t in relaxed['transitions']] == [(2, 'safe')]
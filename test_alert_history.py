@@ -0,0 +1,57 @@
+"""
+Tests for the bounded alert history store
+"""
+import random
+
+from alert_history import AlertHistory, read_spilled
+
+T0 = 1_700_000_000_000  # Epoch ms, aligned to a minute
+
+
+def test_windowed_counts_match_a_linear_scan():
+    history = AlertHistory(bucket_seconds=60, retention_seconds=3600)
+    rng = random.Random(5)
+    timestamps = sorted(T0 + rng.randrange(0, 3000 * 1000) for _ in range(500))
+    for ts in timestamps:
+        history.add(rng.randrange(1, 20), 150.0, -90.0, timestamp_ms=ts)
+    now = timestamps[-1]
+    
+    for window in (1, 59, 60, 61, 600, 1799, 3000):
+        expected = sum(1 for ts in timestamps if ts >= now - window * 1000)
+        assert history.count(window, now_ms=now) == expected
+    assert len(history) == 500
+
+
+def test_retention_evicts_and_spills_old_buckets(tmp_path):
+    history = AlertHistory(bucket_seconds=60, retention_seconds=600, spill_dir=str(tmp_path))
+    for minute in range(30):
+        history.add(minute % 3 + 1, 120.0 + minute, -95.0, timestamp_ms=T0 + minute * 60_000)
+    now = T0 + 29 * 60_000
+    
+    retained = len(history)
+    spilled = read_spilled(str(tmp_path))
+    assert retained == 11
+    assert len(spilled) == 30 - retained
+    assert spilled['timestamp_ms'].tolist() == [T0 + m * 60_000 for m in range(len(spilled))]
+    assert history.count(3600, now_ms=now) == retained
+    
+    events = history.cow_events(1, since_ms=now - 600_000)
+    assert [event['distance'] for event in events] == [120.0 + m for m in range(19, 30) if m % 3 == 0]
+    
+    # A long quiet period empties the ring
+    history.expire(now_ms=now + 24 * 3600 * 1000)
+    assert len(history) == 0
+    assert history.count(3600, now_ms=now + 24 * 3600 * 1000) == 0
+    assert len(read_spilled(str(tmp_path))) == 30
+    assert history.recent() == []
+
+
+def test_cow_events_survive_eviction_of_one_cows_long_history():
+    history = AlertHistory(bucket_seconds=60, retention_seconds=600)
+    for minute in range(100):
+        history.add(7, float(minute), -90.0, timestamp_ms=T0 + minute * 60_000)
+    now = T0 + 99 * 60_000
+    
+    assert [event['distance'] for event in history.cow_events(7)] == [float(m) for m in range(89, 100)]
+    assert [event['distance'] for event in history.cow_events(7, since_ms=now - 120_000)] == [97.0, 98.0, 99.0]
+    assert history.cow_events(8) == []
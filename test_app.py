@@ -0,0 +1,129 @@
+"""
+Tests for the broadcast paths of the Flask/Socket.IO app
+"""
+import json
+import threading
+import time
+
+import app as server
+from clock import Tick
+from ingest import IngestPipeline
+from wire import BINARY_MAGIC
+
+
+def test_update_cycle_encodes_once_and_serves_etags():
+    server.monitoring_system.perform_update_cycle()
+    client = server.app.test_client()
+    # Delta clients do not need the full payload; the first poll encodes it
+    assert server.snapshot_cache.get('current_data') is None
+    
+    response = client.get('/api/current_data')
+    etag = response.headers['ETag']
+    assert response.mimetype == 'application/json'
+    assert json.loads(response.data) == dict(server.current_data, cows=server.current_view.to_dicts())
+    assert server.snapshot_cache.get('current_data') == response.data
+    
+    assert client.get('/api/current_data', headers={'If-None-Match': etag}).status_code == 304
+    assert client.get('/api/current_data?format=binary').data.startswith(BINARY_MAGIC)
+    
+    server.monitoring_system.perform_update_cycle()
+    assert client.get('/api/current_data', headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_socket_clients_receive_cached_bytes():
+    sio = server.socketio.test_client(server.app)
+    sio.get_received()
+    
+    server.monitoring_system.perform_update_cycle()
+    received = {packet['name']: packet['args'][0] for packet in sio.get_received()}
+    stream = received.get('position_delta', received.get('position_keyframe'))
+    
+    assert stream is server.snapshot_cache.get('stream')
+    assert json.loads(stream)['update_count'] == server.current_data['update_count']
+    sio.disconnect()
+
+
+def strict_json(data):
+    """Parse like a browser's JSON.parse, which has no NaN or Infinity"""
+    def reject(token):
+        raise ValueError(f'not JSON: {token}')
+    return json.loads(data, parse_constant=reject)
+
+
+def test_full_payload_waits_for_the_running_cycle(monkeypatch):
+    server.monitoring_system.perform_update_cycle()
+    encoded = []
+    with server.herd_lock:  # As held by a cycle between updating the herd and publishing
+        worker = threading.Thread(target=lambda: encoded.append(server.encode_current_data()))
+        worker.start()
+        worker.join(0.1)
+        assert worker.is_alive()
+    worker.join()
+    assert json.loads(encoded[0])['update_count'] == server.current_data['update_count']
+    
+    # A cycle that fails after moving the herd leaves nothing to encode
+    def fail(herd):
+        raise RuntimeError('evaluation failed')
+    monkeypatch.setattr(server.monitoring_system.alert_engine, 'evaluate', fail)
+    server.monitoring_system.perform_update_cycle()
+    assert server.encode_current_data() is None
+
+
+def test_empty_ingest_herd_encodes_strict_json(monkeypatch):
+    monkeypatch.setattr(server, 'data_source', IngestPipeline(tcp_port=False))
+    count = server.monitoring_system.update_count
+    server.monitoring_system.perform_update_cycle()
+    
+    assert server.monitoring_system.update_count == count + 1
+    payload = strict_json(server.app.test_client().get('/api/current_data').data)
+    assert payload['cows'] == [] and payload['distance_summary'] == {'min_distance': None, 'max_distance': None}
+    strict_json(server.snapshot_cache.get('stream'))
+
+
+def test_cycle_stamps_alert_history_and_track_log_with_its_tick(monkeypatch):
+    tick = Tick(1_700_000_000_000, time.monotonic())
+    recorded = []
+    
+    class Recorder:
+        def add(self, cow_id, distance, rssi, timestamp_ms=None):
+            recorded.append(('alert', timestamp_ms))
+        
+        def append(self, view, timestamp_ms=None):
+            recorded.append(('track', timestamp_ms))
+    
+    engine = server.monitoring_system.alert_engine
+    evaluate = engine.evaluate
+    
+    def evaluate_with_alert(herd):
+        summary = evaluate(herd)
+        summary['transitions'] = [{'cow_id': 1, 'from': 'safe', 'to': 'alert', 'distance': 150.0, 'rssi': -80.0,
+                                   'timestamp_ms': 1_600_000_000_000, 'handler_id': 'human', 'group': 'default'}]
+        return summary
+    
+    monkeypatch.setattr(server, 'Tick', lambda: tick)
+    monkeypatch.setattr(engine, 'evaluate', evaluate_with_alert)
+    monkeypatch.setattr(server.monitoring_system, 'alert_history', Recorder())
+    monkeypatch.setattr(server.monitoring_system, 'track_log', Recorder())
+    server.monitoring_system.perform_update_cycle()
+    
+    assert recorded == [('alert', tick.timestamp_ms), ('track', tick.timestamp_ms)]
+    assert server.current_data['system_time'] == tick.iso
+
+
+def test_monitoring_loop_runs_as_background_task(monkeypatch):
+    monkeypatch.setattr(server.config, 'UPDATE_INTERVAL', 0.01)
+    monkeypatch.setattr(server, 'update_thread', None)
+    start = server.monitoring_system.update_count
+    
+    server.start_monitoring_thread()
+    try:
+        for _ in range(200):
+            if server.monitoring_system.update_count >= start + 2:
+                break
+            server.socketio.sleep(0.01)
+    finally:
+        server.monitoring_system.stop_monitoring()
+        server.update_thread.join()
+    
+    assert server.socketio.async_mode == server.config.ASYNC_MODE
+    assert server.monitoring_system.update_count >= start + 2
@@ -0,0 +1,90 @@
+"""
+Tests for the batch distance engine in distance.py
+"""
+import numpy as np
+import pytest
+from geopy.distance import geodesic
+
+import config
+from distance import (
+    calculate_cow_distances,
+    calculate_distances_batch,
+    evaluate_distances_batch,
+    evaluate_herd,
+    get_distance_status_summary
+)
+
+HUMAN_POS = config.FIXED_HUMAN_COORDS
+
+
+def make_herd(num_cows, max_distance, seed=7):
+    """Place cows at random bearings up to max_distance meters from the human"""
+    rng = np.random.default_rng(seed)
+    distance = rng.uniform(1, max_distance, num_cows)
+    bearing = rng.uniform(0, 2 * np.pi, num_cows)
+    lats = HUMAN_POS[0] + distance * np.cos(bearing) / 111000
+    lons = HUMAN_POS[1] + distance * np.sin(bearing) / (111000 * np.cos(np.radians(HUMAN_POS[0])))
+    return lats, lons
+
+
+@pytest.mark.parametrize('method, max_distance, tolerance', [
+    ('vincenty', 20000, 1e-3),
+    ('equirectangular', 1000, 1e-3),
+    ('haversine', 1000, 0.006 * 1000)
+])
+def test_batch_matches_geodesic(method, max_distance, tolerance):
+    lats, lons = make_herd(200, max_distance)
+    expected = np.array([geodesic(HUMAN_POS, (lat, lon)).meters for lat, lon in zip(lats, lons)])
+    
+    distances = calculate_distances_batch(HUMAN_POS, lats, lons, method)
+    
+    assert np.abs(distances - expected).max() < tolerance
+
+
+def test_vincenty_falls_back_for_antipodal_points():
+    human_pos = (10.0, 20.0)
+    distances = calculate_distances_batch(human_pos, [-10.0], [-160.0])
+    
+    assert distances[0] == pytest.approx(geodesic(human_pos, (-10.0, -160.0)).meters, abs=1e-3)
+
+
+def test_evaluate_batch_statuses_and_extremes():
+    lats, lons = make_herd(500, 300)
+    result = evaluate_distances_batch(HUMAN_POS, lats, lons, threshold=100)
+    
+    assert result['alerts_active'] == int((result['distances'] > 100).sum())
+    assert result['alerts_active'] + result['cows_safe'] == 500
+    assert result['min_distance'] == result['distances'].min()
+    assert result['max_distance'] == result['distances'].max()
+
+
+def test_unknown_method_rejected():
+    with pytest.raises(ValueError):
+        calculate_distances_batch(HUMAN_POS, [0.0], [0.0], method='manhattan')
+
+
+def test_dict_api_uses_batch_engine():
+    lats, lons = make_herd(20, 300)
+    cow_data = [{'lat': lat, 'lon': lon, 'rssi': -80.0} for lat, lon in zip(lats, lons)]
+    
+    distances = calculate_cow_distances(HUMAN_POS, cow_data)
+    summary = get_distance_status_summary(HUMAN_POS, cow_data)
+    
+    assert len(distances) == 20
+    assert summary['total_cows'] == 20
+    assert summary['alerts_active'] == sum(1 for d in distances if d > config.DISTANCE_THRESHOLD)
+    assert [detail['distance'] for detail in summary['cow_details']] == [round(d, 2) for d in distances]
+    assert get_distance_status_summary(HUMAN_POS, [])['total_cows'] == 0
+
+
+def test_evaluate_herd_annotates_cows_in_one_pass():
+    lats, lons = make_herd(50, 300)
+    cow_data = [{'id': i + 1, 'lat': lat, 'lon': lon, 'rssi': -80.0} for i, (lat, lon) in enumerate(zip(lats, lons))]
+    expected = get_distance_status_summary(HUMAN_POS, cow_data)
+    
+    cows, summary = evaluate_herd(HUMAN_POS, cow_data)
+    
+    assert cows is cow_data
+    assert [cow['status'] for cow in cows] == [detail['status'] for detail in expected['cow_details']]
+    for key in ('total_cows', 'alerts_active', 'cows_safe', 'min_distance', 'max_distance'):
+        assert summary[key] == expected[key]
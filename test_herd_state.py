@@ -0,0 +1,60 @@
+"""
+Tests for the columnar herd state store
+"""
+import numpy as np
+import pytest
+
+import config
+from herd_state import HerdState, STATUS_UNKNOWN
+from simulation import PositionSimulator
+
+
+def test_resize_grows_geometrically_and_keeps_rows():
+    herd = HerdState(capacity=2)
+    herd.resize(2)
+    herd.lat[:2] = (1.0, 2.0)
+    
+    herd.resize(3)
+    lat_buffer = herd.lat
+    herd.resize(4)
+    
+    assert herd.capacity == 4
+    assert herd.lat is lat_buffer
+    assert herd.lat[:2].tolist() == [1.0, 2.0]
+    assert herd.ids[:4].tolist() == [1, 2, 3, 4]
+
+
+def test_view_is_read_only_and_materializes_dicts(make_herd):
+    herd = make_herd(north_m=[0, 1000])
+    herd.rssi[:2] = (-60.3, -101.2)
+    view = herd.view()
+    
+    with pytest.raises(ValueError):
+        view.lat[0] = 0.0
+    assert 'status' not in view[0]
+    
+    herd.evaluate(config.FIXED_HUMAN_COORDS)
+    cows = view.to_dicts()
+    
+    assert [cow['status'] for cow in cows] == ['safe', 'alert']
+    assert [cow['signal_quality'] for cow in cows] == ['Excellent', 'Poor']
+    assert cows[0]['rssi'] == -60.3
+    
+    # Indexing and to_dicts agree on accuracies that round to zero
+    herd.accuracy[:2] = (0.04, 2.36)
+    assert [view[i].get('accuracy') for i in range(2)] == [cow.get('accuracy') for cow in view.to_dicts()] == [None, 2.4]
+
+
+def test_simulator_tick_reuses_column_buffers():
+    simulator = PositionSimulator()
+    human_pos = simulator.simulate_navic_position()
+    simulator.update_herd(human_pos, num_cows=100)
+    buffers = [simulator.herd.lat, simulator.herd.rssi, simulator.herd.timestamp_ms]
+    
+    view = simulator.update_herd(human_pos, num_cows=100)
+    
+    assert all(a is b for a, b in zip([simulator.herd.lat, simulator.herd.rssi, simulator.herd.timestamp_ms], buffers))
+    assert len(view) == 100
+    assert np.all(view.status == STATUS_UNKNOWN)
+    assert simulator.herd.nbytes_per_cow() < 64
+
@@ -0,0 +1,137 @@
+"""
+Tests for packet ingestion and the replay gateway
+"""
+import socket
+import time
+
+import numpy as np
+
+import config
+from ingest import (
+    PACKET_DTYPE,
+    IngestPipeline,
+    ReplayGateway,
+    decode_binary,
+    decode_nmea,
+    decode_semtech,
+    encode_binary,
+    encode_nmea_gga,
+    encode_semtech,
+    simulated_source
+)
+
+T0 = 1_700_000_000_000
+
+
+def make_records(ids, lat=12.9183899, lon=77.5917152, rssi=-71.5):
+    records = np.zeros(len(ids), dtype=PACKET_DTYPE)
+    records['cow_id'] = ids
+    records['lat'] = lat + np.arange(len(ids)) * 1e-4
+    records['lon'] = lon
+    records['rssi'] = rssi
+    records['timestamp_ms'] = T0
+    return records
+
+
+def test_formats_round_trip():
+    records = make_records([3, 1, 4000000000])
+    
+    semtech, malformed = decode_semtech(encode_semtech(records, token=7), T0)
+    binary = decode_binary(encode_binary(records, timestamp_ms=T0))
+    for decoded in (semtech, binary):
+        assert decoded['cow_id'].tolist() == [3, 1, 4000000000]
+        assert np.abs(decoded['lat'] - records['lat']).max() < 1e-7
+        assert np.allclose(decoded['rssi'], -71.5)
+        assert decoded['timestamp_ms'].tolist() == [T0] * 3
+    assert malformed == 0
+    
+    lat, lon, system = decode_nmea(encode_nmea_gga(12.9183899, -77.5917152))
+    assert abs(lat - 12.9183899) < 1e-6 and abs(lon + 77.5917152) < 1e-6
+    assert system == 'NavIC'
+    assert decode_nmea('$GPRMC,123519,V,4807.038,N,01131.000,E,,,230394,,*0A') is None
+
+
+def test_drain_applies_newest_report_per_cow(monkeypatch):
+    monkeypatch.setattr(config, 'TRACK_FILTER_ENABLED', False)  # Raw reports; see test_tracking
+    pipeline = IngestPipeline(udp_port=0, tcp_port=False)
+    pipeline.enqueue(make_records([10, 20]))
+    pipeline.enqueue(make_records([20, 30], lat=13.0))
+    assert pipeline.decode(b'not a packet') is None
+    assert pipeline.decode(b'$GIGGA,bad*00') is None
+    pipeline.decode(encode_nmea_gga(12.95, 77.6).encode('ascii'))
+    
+    position_data = pipeline.get_current_herd()
+    view = position_data['cows']
+    assert view.ids.tolist() == [10, 20, 30]
+    assert np.allclose(view.lat, [12.9183899, 13.0, 13.0001])
+    assert abs(position_data['human']['lat'] - 12.95) < 1e-6
+    assert position_data['human']['positioning_system'] == 'NavIC'
+    
+    # Known cows keep their rows
+    pipeline.enqueue(make_records([30], lat=14.0))
+    assert pipeline.drain() == 1
+    assert np.allclose(pipeline.herd.view().lat, [12.9183899, 13.0, 14.0])
+    stats = pipeline.snapshot_stats()
+    assert stats['malformed'] == 2 and stats['applied'] == 5 and stats['queue_depth'] == 0
+    
+    # Collar ids use the full unsigned 32-bit range
+    pipeline.enqueue(make_records([4000000000]))
+    pipeline.drain()
+    view = pipeline.herd.view()
+    assert view.ids.tolist() == [10, 20, 30, 4000000000]
+    assert view.to_dicts()[-1]['id'] == view[3]['id'] == 4000000000
+
+
+def test_full_queue_drops_without_blocking():
+    pipeline = IngestPipeline(udp_port=0, tcp_port=False, queue_size=5)
+    assert pipeline.enqueue(make_records(range(1, 5)), block=False)
+    assert pipeline.enqueue(make_records(range(5, 9)), block=False)
+    assert not pipeline.enqueue(make_records(range(9, 13)), block=False)
+    assert pipeline.snapshot_stats()['dropped'] == 4
+    assert pipeline.drain() == 8
+
+
+def test_malformed_datagrams_do_not_stop_the_udp_listener():
+    pipeline = IngestPipeline(host='127.0.0.1', udp_port=0, tcp_port=False, flush_ms=5)
+    assert pipeline.decode(b'{"rxpk": 5}') is None
+    pipeline.start()
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.sendto(b'{"rxpk": 5}', ('127.0.0.1', pipeline.udp_port))
+            sock.sendto(encode_semtech(make_records([7]))[:12] + b'{"rxpk": {"data": 1}}',
+                        ('127.0.0.1', pipeline.udp_port))
+            sock.sendto(encode_binary(make_records([7, 8]), timestamp_ms=T0), ('127.0.0.1', pipeline.udp_port))
+        
+        deadline = time.time() + 5
+        while pipeline.snapshot_stats()['queued'] < 2 and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        pipeline.stop()
+    
+    stats = pipeline.snapshot_stats()
+    assert stats['malformed'] == 3 and stats['queued'] == 2
+    assert pipeline.drain() == 2
+
+
+def test_replay_gateway_over_udp_and_tcp():
+    pipeline = IngestPipeline(host='127.0.0.1', udp_port=0, tcp_port=0, flush_ms=5)
+    pipeline.start()
+    try:
+        gateway = ReplayGateway('127.0.0.1', pipeline.udp_port, simulated_source(50, seed=1),
+                                rate=20000, per_datagram=10, fix_interval=0)
+        result = gateway.run(max_packets=200)
+        assert result['packets'] == 200 and result['datagrams'] == 20
+        
+        with socket.create_connection(('127.0.0.1', pipeline.tcp_port)) as conn:
+            conn.sendall(b'{"rxpk":[{"rssi":-80,"data":"6AMAAAAAAAAAAAAA"}]}\n')
+        
+        deadline = time.time() + 5
+        while pipeline.snapshot_stats()['queued'] < 201 and time.time() < deadline:
+            time.sleep(0.01)
+        pipeline.drain()
+    finally:
+        pipeline.stop()
+    
+    assert sorted(pipeline.herd.view().ids.tolist()) == list(range(1, 51)) + [1000]
+    assert pipeline.human['positioning_system'] == 'NavIC'
+    assert abs(pipeline.human['lat'] - config.FIXED_HUMAN_COORDS[0]) < 1e-6
@@ -0,0 +1,70 @@
+"""
+Tests for sharing broadcasts between server processes through a message queue
+"""
+import json
+import time
+
+import socketio
+
+from message_queue import ClusterPresence, MessageBroker, QueueManager, RespConnection
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.01)
+
+
+def make_server(url):
+    """Socket.IO server on the queue with one connected client; returns (server, manager, sent packets)"""
+    manager = QueueManager(url, channel='test')
+    server = socketio.Server(async_mode='threading', client_manager=manager)
+    sent = []
+    server._send_eio_packet = lambda eio_sid, packet: sent.append(json.loads(packet.data[1:]))  # Socket.IO EVENT packets
+    server.manager_initialized = True
+    manager.initialize()
+    manager.connect('eio-1', '/')
+    return server, manager, sent
+
+
+def test_emits_reach_clients_of_every_server():
+    broker = MessageBroker(port=0).start()
+    try:
+        connection = RespConnection('127.0.0.1', broker.port)
+        assert connection.command('PING') == 'PONG'
+        assert connection.command('PUBLISH', 'test', b'nobody') == 0
+        connection.close()
+        
+        (server_a, manager_a, sent_a), (server_b, manager_b, sent_b) = make_server(broker.url), make_server(broker.url)
+        ticks = []
+        manager_b.on('tick', ticks.append)
+        wait_for(lambda: len(broker.subscribers.get(b'test', ())) == 2)
+        
+        server_a.emit('position_update', {'update_count': 1})
+        manager_a.publish('tick', version=7)
+        wait_for(lambda: ticks and sent_a and sent_b)
+        assert ticks[0]['version'] == 7 and ticks[0]['host_id'] == manager_a.host_id
+        assert sent_a == sent_b == [['position_update', {'update_count': 1}]]
+        
+        # A reply to a client of this server does not go through the queue
+        published = manager_b.published
+        server_b.emit('pong', 'direct', to=manager_b.sid_from_eio_sid('eio-1', '/'))
+        assert sent_b[-1] == ['pong', 'direct'] and manager_b.published == published
+    finally:
+        broker.stop()
+
+
+def test_presence_sums_live_servers():
+    presence = ClusterPresence('self', ttl=3)
+    presence.update('self', 100, [('a',)], now=0)  # Own reports are superseded by the local count
+    presence.update('worker-1', 40, [('a',), ('b',)], now=0)
+    presence.update('worker-2', 2, [], now=2)
+    
+    assert presence.clients(5, now=2.5) == 47
+    assert presence.viewports({('c',)}, now=2.5) == {('a',), ('b',), ('c',)}
+    assert presence.hosts(now=2.5) == 3
+    
+    # worker-1 stopped reporting
+    assert presence.clients(5, now=4) == 7
+    assert presence.hosts(now=4) == 2
@@ -0,0 +1,42 @@
+"""
+Tests for the metrics registry and the /metrics endpoint
+"""
+import app as server
+from metrics import MetricsRegistry
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry(prefix='test_')
+    histogram = registry.histogram('stage_seconds', 'Stage time', buckets=(0.1, 1.0), label='stage')
+    registry.gauge('queue', 'Queue depth', label='stat', function=lambda: {'max': 3, 'total': 5})
+    for value in (0.05, 0.5, 2.0):
+        histogram.observe(value, 'simulate')
+    
+    lines = registry.render().splitlines()
+    assert '# TYPE test_stage_seconds histogram' in lines
+    assert 'test_stage_seconds_bucket{stage="simulate",le="0.1"} 1' in lines
+    assert 'test_stage_seconds_bucket{stage="simulate",le="1"} 2' in lines
+    assert 'test_stage_seconds_bucket{stage="simulate",le="+Inf"} 3' in lines
+    assert 'test_stage_seconds_sum{stage="simulate"} 2.55' in lines
+    assert 'test_stage_seconds_count{stage="simulate"} 3' in lines
+    assert 'test_queue{stat="max"} 3' in lines
+    assert histogram.count('simulate') == 3
+
+
+def test_update_cycle_and_acks_are_exported():
+    sio = server.socketio.test_client(server.app)
+    server.monitoring_system.perform_update_cycle()
+    sio.emit('frame_ack', {'update_count': server.current_data['update_count']})
+    sio.emit('frame_ack', {'update_count': 'stale'})
+    
+    response = server.app.test_client().get('/metrics')
+    body = response.get_data(as_text=True)
+    assert response.content_type.startswith('text/plain; version=0.0.4')
+    for stage in ('simulate', 'distance', 'alert', 'serialize', 'emit'):
+        assert f'navic_cycle_stage_seconds_count{{stage="{stage}"}}' in body
+    assert 'navic_cycle_allocated_blocks ' in body
+    assert 'navic_gc_collections_total{generation="0"}' in body
+    assert server.emit_latency_seconds.count() >= 1
+    assert server.client_emit_latency
+    sio.disconnect()
+    assert not server.client_emit_latency
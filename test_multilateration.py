@@ -0,0 +1,56 @@
+"""
+Tests for multi-gateway multilateration and its simulator
+"""
+import numpy as np
+
+import config
+from clock import Tick
+from multilateration import LIGHT_M_PER_NS, Multilateration
+from path_loss import active_table
+from simulation import PositionSimulator, ring_gateways
+
+CENTER = config.FIXED_HUMAN_COORDS
+GATEWAYS = ring_gateways(CENTER, 4, 300)
+
+
+def ranges_to(solver, east, north):
+    return np.hypot(east[:, None] - solver.gateway_east, north[:, None] - solver.gateway_north)
+
+
+def test_noise_free_readings_are_located():
+    solver = Multilateration(GATEWAYS)
+    rng = np.random.default_rng(2)
+    east, north = rng.uniform(-250, 250, 500), rng.uniform(-250, 250, 500)
+    distance = ranges_to(solver, east, north)
+    
+    model = active_table().model
+    rssi = np.round(model.rssi0 - 10 * model.n * np.log10(distance), 1)
+    arrival_ns = rng.uniform(0, 1e9, (500, 1)) + distance / LIGHT_M_PER_NS
+    for fix, tolerance in ((solver.locate_rssi(rssi), 5.0), (solver.locate_tdoa(arrival_ns), 0.01)):
+        fix_east, fix_north = solver.to_plane(fix.lat, fix.lon)
+        assert np.hypot(fix_east - east, fix_north - north).max() < tolerance
+        assert fix.valid.all() and (fix.gateways == 4).all() and np.isfinite(fix.accuracy).all()
+    
+    # Two gateways cannot fix a position; no redundancy leaves no residual
+    rssi[:, 2:] = np.nan
+    fix = solver.locate_rssi(rssi)
+    assert not fix.valid.any() and np.isnan(fix.residual).all()
+
+
+def test_simulated_gateways_give_consistent_fixes(monkeypatch):
+    monkeypatch.setattr(config, 'TRACK_FILTER_ENABLED', False)
+    for mode in ('rssi', 'tdoa'):
+        monkeypatch.setattr(config, 'MULTILAT_MODE', mode)
+        simulator = PositionSimulator(batch_mode=True, seed=7, gateways=GATEWAYS)
+        start = simulator.simulation_start_time
+        for step in range(3):
+            view = simulator.update_herd(CENTER, 3000, tick=Tick(1_700_000_000_000 + step * 10_000, start + step * 10))
+        
+        fix = simulator.last_fix
+        true_east, true_north = simulator.multilateration.to_plane(*simulator.truth_positions())
+        fix_east, fix_north = simulator.multilateration.to_plane(view.lat, view.lon)
+        error = np.hypot(fix_east - true_east, fix_north - true_north)[fix.valid]
+        assert fix.valid.mean() > 0.9
+        # Per-axis sigmas: the 2D error has a median of about 1.18 sigma
+        assert 0.8 < np.median(error) / np.median(1.18 * fix.accuracy[fix.valid]) < 1.25
+        assert np.array_equal(view.accuracy, np.where(fix.valid, fix.accuracy, 0).astype(np.float32))
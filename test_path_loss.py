@@ -0,0 +1,60 @@
+"""
+Tests for the calibrated path-loss model and its lookup tables
+"""
+import numpy as np
+
+import config
+import path_loss
+from distance import rssi_to_estimated_distance
+from path_loss import PathLossModel, fit_path_loss
+
+
+def test_table_matches_formula_and_signal_quality_thresholds():
+    table = PathLossModel().compile()
+    rssi = np.round(np.linspace(-120, -30, 901), 1)
+    
+    exact = rssi_to_estimated_distance(rssi)
+    assert np.allclose(table.distance(rssi), exact, rtol=1e-6)
+    assert table.distance(-200.0) == table.distance(config.PATH_LOSS_RSSI_RANGE[0])
+    
+    expected = ['Excellent' if r > -70 else 'Good' if r > -85 else 'Fair' if r > -100 else 'Poor' for r in rssi]
+    assert table.signal_qualities(rssi) == expected
+    assert [table.signal_quality(r) for r in (-70.0, -69.9, -100.0)] == ['Good', 'Excellent', 'Poor']
+
+
+def test_fit_recovers_gateway_and_collar_parameters():
+    rng = np.random.default_rng(4)
+    truth = PathLossModel(-40, 2.7, {'open': (-38, 2.2), 'barn': (-45, 3.4)}, {1: 3.0, 2: -3.0, 3: 0.0})
+    count = 6000
+    gateways = rng.choice(['open', 'barn'], count)
+    collars = rng.choice([1, 2, 3], count)
+    distance = rng.uniform(5, 400, count)
+    rssi = np.array([truth.expected_rssi(d, g, c) for d, g, c in zip(distance, gateways, collars.tolist())])
+    rssi += rng.normal(0, 2, count)
+    
+    model = fit_path_loss(np.round(rssi, 1), distance, gateways, collars)
+    for name, (rssi0, n) in truth.gateways.items():
+        assert abs(model.gateways[name][0] - rssi0) < 0.5 and abs(model.gateways[name][1] - n) < 0.05
+    assert all(abs(model.collars[c] - offset) < 0.2 for c, offset in truth.collars.items())
+    
+    # Per-gateway rows and per-collar column shifts give the calibrated range
+    table = model.compile()
+    estimate = table.distance([-90.0, -90.0, -90.0], gateway=['barn', 'open', 'unknown'], collar=[1, 1, 1])
+    expected = [10 ** ((rssi0 + model.collars[1] + 90) / (10 * n)) for rssi0, n in
+                (model.gateways['barn'], model.gateways['open'], (model.rssi0, model.n))]
+    assert np.allclose(estimate, expected, rtol=0.02)
+
+
+def test_model_file_is_hot_swapped(tmp_path, monkeypatch):
+    monkeypatch.setattr(path_loss, '_active', None)
+    monkeypatch.setattr(path_loss, '_model_mtime', None)
+    path = str(tmp_path / 'model.json')
+    monkeypatch.setattr(config, 'PATH_LOSS_MODEL_FILE', path)
+    
+    assert not path_loss.refresh()  # No model file yet: config defaults
+    before = float(path_loss.active_table().distance(-80.0))
+    
+    PathLossModel(rssi0=-30, n=2.0).save(path)
+    assert path_loss.refresh() and not path_loss.refresh()
+    after = float(path_loss.active_table().distance(-80.0))
+    assert abs(after - 10 ** 2.5) < 0.01 * after and after != before
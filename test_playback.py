@@ -0,0 +1,84 @@
+"""
+Tests for historical playback over the track log
+"""
+import json
+
+import numpy as np
+
+import app as server
+import config
+from playback import decimate, history_frames, snapshot_at, zoom_cell_size
+from track_log import TrackLog, TrackReader
+
+T0 = 1_700_000_000_000
+BASE = config.FIXED_HUMAN_COORDS
+
+
+def write_log(make_herd, directory, num_ticks=30, num_cows=500):
+    rng = np.random.default_rng(2)
+    herd = None
+    log = TrackLog(directory, segment_seconds=10)
+    for tick in range(num_ticks):
+        herd = make_herd(num_cows, spread=0.005, rng=rng, herd=herd)
+        herd.rssi[:num_cows] = -80.0
+        herd.status[:num_cows] = 0
+        log.append(herd.view(), timestamp_ms=T0 + tick * 1000)
+    log.close()
+
+
+def test_frames_are_stepped_clipped_and_decimated(tmp_path, make_herd):
+    write_log(make_herd, str(tmp_path))
+    reader = TrackReader(str(tmp_path))
+    bbox = (BASE[0] - 0.002, BASE[1] - 0.002, BASE[0] + 0.002, BASE[1] + 0.002)
+    
+    frames = list(history_frames(reader, T0, T0 + 30_000, step_ms=5000, bbox=bbox))
+    assert [frame['timestamp_ms'] for frame in frames] == [T0 + s * 1000 for s in range(0, 30, 5)]
+    for frame in frames:
+        assert all(abs(cow[1] - BASE[0]) <= 0.002 and abs(cow[2] - BASE[1]) <= 0.002 for cow in frame['cows'])
+    
+    tick = reader.segments[0].records[:500]
+    coarse, counts = decimate(tick, zoom=10)
+    fine, _ = decimate(tick, zoom=20)
+    assert len(coarse) < 20 < len(fine) and counts.sum() == 500
+    
+    # Web Mercator: longitude cells do not shrink with latitude
+    lat_cell, lon_cell = zoom_cell_size(10, latitude=60)
+    assert abs(lat_cell / lon_cell - 0.5) < 1e-9 and lon_cell == zoom_cell_size(10, latitude=0)[1]
+    
+    assert snapshot_at(reader, T0 + 12_500)['timestamp_ms'] == T0 + 12_000
+    assert snapshot_at(reader, T0 - 1) is None
+
+
+def test_history_endpoints_and_playback(tmp_path, monkeypatch, make_herd):
+    write_log(make_herd, str(tmp_path))
+    monkeypatch.setattr(server.config, 'TRACK_LOG_DIR', str(tmp_path))
+    monkeypatch.setattr(server, 'track_reader', None)
+    client = server.app.test_client()
+    
+    assert client.get('/api/history/range').get_json()['end_ms'] == T0 + 29_000
+    history = client.get(f'/api/history?start={T0}&end={T0 + 10_000}&step=2&zoom=14').get_json()
+    assert len(history['frames']) == 5 and history['fields'][0] == 'id'
+    monkeypatch.setattr(server.config, 'PLAYBACK_MAX_ROWS', 2000)
+    assert client.get(f'/api/history?start={T0}&end={T0 + 10_000}').status_code == 413
+    assert len(client.get(f'/api/history?start={T0}&end={T0 + 10_000}&step=5').get_json()['frames']) == 2
+    track = client.get(f'/api/history/cow/42?start={T0}&end={T0 + 30_000}').get_json()
+    assert len(track['lat']) == 30
+    assert client.get('/api/history/snapshot?at=nonsense').status_code == 400
+    # Zoom levels outside the map's range are clamped
+    assert client.get(f'/api/history?start={T0}&end={T0 + 2000}&zoom=2000').status_code == 200
+    snapshot = client.get(f'/api/history/snapshot?at={T0}&zoom=-2000').get_json()
+    assert len(snapshot['cows']) == 1 and snapshot['cows'][0][5] == 500
+    
+    sio = server.socketio.test_client(server.app)
+    sio.emit('start_playback', {'start': T0, 'end': T0 + 5000, 'speed': 1000})
+    received = []
+    for _ in range(200):
+        received += sio.get_received()
+        if any(packet['name'] == 'playback_end' for packet in received):
+            break
+        server.socketio.sleep(0.01)
+    frames = [packet['args'][0] for packet in received if packet['name'] == 'playback_frame']
+    
+    assert [frame['timestamp_ms'] for frame in frames] == [T0 + s * 1000 for s in range(5)]
+    assert json.loads(json.dumps(frames[0]))['cows'][0][0] == 1
+    sio.disconnect()
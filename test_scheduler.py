@@ -0,0 +1,77 @@
+"""
+Tests for update scheduling and alert latency tracking
+"""
+import threading
+import time
+
+import numpy as np
+
+from ingest import PACKET_DTYPE, IngestPipeline
+from scheduler import LatencyWindow, UpdateScheduler
+
+
+def records(count):
+    batch = np.zeros(count, dtype=PACKET_DTYPE)
+    batch['cow_id'] = np.arange(1, count + 1)
+    return batch
+
+
+def test_interval_mode_and_fallback_for_on_demand_sources():
+    slept = []
+    
+    def sleep(seconds):
+        slept.append(seconds)
+        time.sleep(seconds)
+    
+    scheduler = UpdateScheduler(object(), sleep=sleep, mode='event', interval=0.2)
+    assert scheduler.mode == 'interval'  # No wait_pending(): simulator-like source
+    
+    assert scheduler.wait_for_cycle() and slept == []
+    assert scheduler.wait_for_cycle()
+    assert 0.19 < sum(slept) <= 0.2
+    assert scheduler.stats() == {'mode': 'interval', 'cycles': 2, 'interval': 0.2}
+
+
+def test_event_mode_batches_until_latency_or_size_bound():
+    pipeline = IngestPipeline(udp_port=0, tcp_port=False)
+    scheduler = UpdateScheduler(pipeline, mode='event', max_latency=0.15, max_batch=100, idle_interval=None)
+    assert scheduler.wait_for_cycle()  # Initial state
+    
+    # One update: the cycle waits out max_latency from its arrival
+    threading.Timer(0.05, pipeline.enqueue, (records(5),)).start()
+    start = time.monotonic()
+    assert scheduler.wait_for_cycle()
+    assert 0.17 < time.monotonic() - start < 0.5
+    assert pipeline.drain() == 5
+    
+    # A full batch makes the cycle due at once
+    threading.Timer(0.05, pipeline.enqueue, (records(60),)).start()
+    threading.Timer(0.08, pipeline.enqueue, (records(60),)).start()
+    start = time.monotonic()
+    assert scheduler.wait_for_cycle()
+    assert time.monotonic() - start < 0.15
+    assert pipeline.drain() == 120
+    
+    # Stopping releases a wait without updates
+    threading.Timer(0.05, scheduler.stop).start()
+    assert not scheduler.wait_for_cycle()
+    
+    # A stop before the wait is not lost, even with updates pending; start() re-arms
+    pipeline.enqueue(records(1))
+    assert not scheduler.wait_for_cycle()
+    scheduler.start()
+    assert scheduler.wait_for_cycle()
+
+
+def test_idle_heartbeat_and_latency_percentiles():
+    pipeline = IngestPipeline(udp_port=0, tcp_port=False)
+    scheduler = UpdateScheduler(pipeline, mode='event', idle_interval=0.05)
+    assert scheduler.wait_for_cycle() and scheduler.wait_for_cycle()
+    assert scheduler.stats()['idle_cycles'] == 1
+    
+    window = LatencyWindow(size=100)
+    assert window.percentiles()['p50'] is None
+    window.add(range(200))
+    summary = window.percentiles()
+    assert summary['count'] == 100 and summary['max'] == 199
+    assert summary['p50'] == 149.5 and summary['p99'] == 198.0
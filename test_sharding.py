@@ -0,0 +1,62 @@
+"""
+Tests for sharded evaluation over the shared-memory herd table
+"""
+import numpy as np
+import pytest
+
+import config
+from alert_engine import AlertEngine
+from herd_state import HerdState, SharedHerdState
+from sharding import ShardedAlertEngine
+
+
+def place(herds, size, seed):
+    rng = np.random.default_rng(seed)
+    lat = config.FIXED_HUMAN_COORDS[0] + rng.uniform(-0.002, 0.002, size)
+    lon = config.FIXED_HUMAN_COORDS[1] + rng.uniform(-0.002, 0.002, size)
+    for herd in herds:
+        herd.resize(size)
+        herd.lat[:size] = lat
+        herd.lon[:size] = lon
+        herd.positions_updated()
+
+
+def test_shared_table_survives_growth():
+    herd = SharedHerdState(capacity=4)
+    try:
+        herd.resize(3)
+        herd.lat[:3] = (1.0, 2.0, 3.0)
+        name = herd.table()[0]
+        herd.resize(100)
+        assert herd.table()[0] != name and herd.table()[1:] == (100, 100)
+        assert herd.lat[:3].tolist() == [1.0, 2.0, 3.0]
+        assert herd.ids[99] == 100
+    finally:
+        herd.close()
+
+
+def test_sharded_engine_matches_single_process_engine():
+    shared, plain = SharedHerdState(), HerdState()
+    sharded, single = ShardedAlertEngine(workers=3), AlertEngine()
+    try:
+        with pytest.raises(TypeError):
+            sharded.evaluate(plain)
+        
+        for engine in (sharded, single):
+            engine.set_handler('human', config.FIXED_HUMAN_COORDS)
+            engine.set_group_threshold('calves', 60)
+            engine.set_handler('calf handler', (config.FIXED_HUMAN_COORDS[0] + 0.001, config.FIXED_HUMAN_COORDS[1]), 'calves')
+            engine.assign_group(np.arange(0, 500, 7), 'calves')
+        
+        for tick, size in enumerate((500, 500, 1200)):
+            place((shared, plain), size, seed=tick)
+            result, expected = sharded.evaluate(shared), single.evaluate(plain)
+            
+            assert np.array_equal(shared.status[:size], plain.status[:size])
+            assert np.allclose(shared.distance[:size], plain.distance[:size], equal_nan=True)
+            for key in ('total_cows', 'alerts_active', 'cows_safe', 'min_distance', 'max_distance', 'evaluated'):
+                assert result[key] == expected[key]
+            assert result['transitions'] == sorted(expected['transitions'], key=lambda t: t['cow_id'])
+    finally:
+        sharded.close()
+        shared.close()
@@ -0,0 +1,87 @@
+"""
+Tests for the grid spatial index, checked against brute-force scans
+"""
+import time
+
+import numpy as np
+
+import config
+from distance import calculate_distances_batch
+from spatial_index import GridIndex, determine_alert_statuses, points_in_polygon
+
+ORIGIN = config.FIXED_HUMAN_COORDS
+
+
+def make_positions(num_cows, spread=0.01, seed=1):
+    rng = np.random.default_rng(seed)
+    return (ORIGIN[0] + rng.uniform(-spread, spread, num_cows),
+            ORIGIN[1] + rng.uniform(-spread, spread, num_cows))
+
+
+def test_radius_query_matches_full_scan():
+    lats, lons = make_positions(5000)
+    index = GridIndex(cell_size=50, origin=ORIGIN)
+    index.update(lats, lons)
+    center = (ORIGIN[0] + 0.002, ORIGIN[1] - 0.001)
+    
+    rows = index.query_radius(center, 300)
+    
+    expected = np.flatnonzero(calculate_distances_batch(center, lats, lons) <= 300)
+    assert np.array_equal(np.sort(rows), expected)
+
+
+def test_incremental_moves_keep_queries_exact():
+    lats, lons = make_positions(2000)
+    index = GridIndex(cell_size=50, origin=ORIGIN)
+    index.update(lats, lons)
+    
+    moved = np.arange(0, 2000, 50)
+    lats[moved] += 0.003
+    lons[moved] -= 0.002
+    index.update(lats[moved], lons[moved], moved)
+    
+    rows = index.query_radius(ORIGIN, 500)
+    expected = np.flatnonzero(calculate_distances_batch(ORIGIN, lats, lons) <= 500)
+    assert np.array_equal(np.sort(rows), expected)
+
+
+def test_nearest_query_matches_sorting():
+    lats, lons = make_positions(3000)
+    index = GridIndex(cell_size=50, origin=ORIGIN)
+    index.update(lats, lons)
+    center = (ORIGIN[0] - 0.004, ORIGIN[1] + 0.003)
+    
+    rows, distances = index.query_nearest(center, 25)
+    
+    all_distances = calculate_distances_batch(center, lats, lons)
+    assert np.array_equal(rows, np.argsort(all_distances, kind='stable')[:25])
+    assert np.allclose(distances, np.sort(all_distances)[:25])
+    
+    # A far outlier (a 0,0 "no fix" report) is found without walking every ring
+    index.update(np.array([0.0]), np.array([0.0]), np.array([len(lats)]))
+    start = time.perf_counter()
+    rows, _ = index.query_nearest(center, len(lats) + 1)
+    assert rows[-1] == len(lats) and time.perf_counter() - start < 1.0
+
+
+def test_outside_polygon_matches_point_in_polygon():
+    lats, lons = make_positions(3000)
+    index = GridIndex(cell_size=50, origin=ORIGIN)
+    index.update(lats, lons)
+    polygon = [(ORIGIN[0] - 0.003, ORIGIN[1] - 0.004), (ORIGIN[0] + 0.004, ORIGIN[1] - 0.002),
+               (ORIGIN[0] + 0.002, ORIGIN[1] + 0.005), (ORIGIN[0] - 0.004, ORIGIN[1] + 0.001)]
+    
+    rows = index.query_outside_polygon(polygon)
+    
+    assert np.array_equal(rows, np.flatnonzero(~points_in_polygon(lats, lons, polygon)))
+
+
+def test_index_backed_alert_statuses_match_threshold():
+    lats, lons = make_positions(1000, spread=0.002)
+    index = GridIndex(origin=ORIGIN)
+    index.update(lats, lons)
+    
+    status_codes = determine_alert_statuses(index, ORIGIN, threshold=100)
+    
+    expected = (calculate_distances_batch(ORIGIN, lats, lons) > 100).astype(np.uint8)
+    assert np.array_equal(status_codes, expected)
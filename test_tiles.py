@@ -0,0 +1,59 @@
+"""
+Tests for heatmap tile rendering and caching
+"""
+import zlib
+
+import numpy as np
+
+import app as server
+import config
+from tiles import EMPTY_TILE, HeatmapTiles, encode_png
+from viewport import tile_coords
+
+CENTER = config.FIXED_HUMAN_COORDS
+
+
+def test_png_encoding_round_trips():
+    image = np.random.default_rng(0).integers(0, 256, (4, 3, 4), dtype=np.uint8)
+    png = encode_png(image)
+    
+    assert png[:8] == b'\x89PNG\r\n\x1a\n'
+    idat_length = int.from_bytes(png[33:37], 'big')
+    raw = np.frombuffer(zlib.decompress(png[41:41 + idat_length]), dtype=np.uint8).reshape(4, 13)
+    assert np.array_equal(raw[:, 1:].reshape(4, 3, 4), image)
+
+
+def test_only_dirty_tiles_are_rerendered(make_herd):
+    rng = np.random.default_rng(6)
+    herd = make_herd(20000, rng=rng, normal=True)
+    herd.status[:herd.size] = rng.integers(0, 2, herd.size)
+    tiles = HeatmapTiles()
+    tiles.begin_tick(herd.view())
+    x, y = (int(v) for v in tile_coords(*CENTER, 14))
+    far = (x + 20, y + 20)
+    
+    centre_png, version = tiles.live_tile(14, x, y)
+    far_png, _ = tiles.live_tile(14, *far)
+    assert centre_png != EMPTY_TILE and far_png == EMPTY_TILE
+    assert tiles.live_tile(14, x, y, 'alerts')[0] != centre_png
+    assert tiles.renders == 3
+    
+    # Move one cow near the centre: only the tiles around it are dropped
+    herd.lat[0], herd.lon[0] = CENTER
+    tiles.begin_tick(herd.view())
+    assert tiles.live_tile(14, *far)[0] == far_png
+    assert tiles.renders == 3
+    new_png, new_version = tiles.live_tile(14, x, y)
+    assert tiles.renders == 4 and new_version > version
+
+
+def test_tile_endpoint_serves_png_with_etag():
+    server.monitoring_system.perform_update_cycle()
+    human = server.current_data['human']
+    x, y = (int(v) for v in tile_coords(human['lat'], human['lon'], 16))
+    client = server.app.test_client()
+    
+    response = client.get(f'/tiles/16/{x}/{y}.png')
+    assert response.status_code == 200 and response.mimetype == 'image/png'
+    assert client.get(f'/tiles/16/{x}/{y}.png', headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+    assert client.get(f'/tiles/16/{x}/{y}.png?layer=nope').status_code == 404
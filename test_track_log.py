@@ -0,0 +1,50 @@
+"""
+Tests for the append-only track log
+"""
+import numpy as np
+
+from track_log import TrackLog, TrackReader, decode_records
+
+T0 = 1_700_000_000_000
+
+
+def write_ticks(make_herd, directory, num_ticks=50, num_cows=200, segment_seconds=10):
+    rng = np.random.default_rng(1)
+    herd = None
+    log = TrackLog(directory, segment_seconds=segment_seconds)
+    history = []
+    for tick in range(num_ticks):
+        herd = make_herd(num_cows, rng=rng, rssi=(-120, -30), herd=herd)
+        herd.status[:num_cows] = rng.integers(0, 2, num_cows)
+        log.append(herd.view(), timestamp_ms=T0 + tick * 1000)
+        history.append((herd.lat[:num_cows].copy(), herd.rssi[:num_cows].copy()))
+    log.close()
+    return history
+
+
+def test_time_window_is_a_view_of_the_segment(tmp_path, make_herd):
+    history = write_ticks(make_herd, str(tmp_path))
+    reader = TrackReader(str(tmp_path))
+    
+    assert len(reader.segments) == 5
+    assert reader.time_range() == (T0, T0 + 49 * 1000)
+    
+    timestamps, records = reader.query(T0 + 12_000, T0 + 15_000)
+    assert isinstance(records.base, np.memmap) or isinstance(records, np.memmap)
+    assert np.array_equal(np.unique(timestamps), [T0 + 12_000, T0 + 13_000, T0 + 14_000])
+    decoded = decode_records(records[:200])
+    assert np.abs(decoded['lat'] - history[12][0]).max() < 1e-7
+    assert np.abs(decoded['rssi'] - history[12][1]).max() <= 0.05
+
+
+def test_cow_filter_across_segments(tmp_path, make_herd):
+    history = write_ticks(make_herd, str(tmp_path))
+    reader = TrackReader(str(tmp_path))
+    
+    timestamps, records = reader.query(T0 + 5_000, T0 + 25_000, cow_ids=[7, 150, 999])
+    
+    assert len(records) == 2 * 20
+    assert records['cow_id'].tolist() == [7, 150] * 20
+    assert timestamps.tolist() == [T0 + t * 1000 for t in range(5, 25) for _ in range(2)]
+    lats = decode_records(records)['lat'][0::2]
+    assert np.abs(lats - [history[t][0][6] for t in range(5, 25)]).max() < 1e-7
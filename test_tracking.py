@@ -0,0 +1,72 @@
+"""
+Tests for Kalman track smoothing and confidence-gated alerts
+"""
+import numpy as np
+
+import config
+from alert_engine import AlertEngine
+from herd_state import HerdState
+from ingest import PACKET_DTYPE, IngestPipeline
+from tracking import TrackFilter
+
+ORIGIN = config.FIXED_HUMAN_COORDS
+M_PER_DEG = 110700  # Meters per degree of latitude near ORIGIN
+
+
+def test_filter_smooths_noise_and_learns_velocity():
+    rng = np.random.default_rng(1)
+    tracker = TrackFilter(origin=ORIGIN)
+    # Row 0 stands still, row 1 walks north at 0.5 m/s; fixes every 10 s with 20 m noise
+    errors = []
+    for step in range(60):
+        north = np.array([0.0, 0.5 * 10 * step])
+        observed = north + rng.normal(0, 20, 2)
+        lat, lon, accuracy = tracker.update(ORIGIN[0] + observed / M_PER_DEG, [ORIGIN[1]] * 2,
+                                            1_700_000_000_000 + step * 10_000, 20.0)
+        if step == 0:
+            assert np.allclose(accuracy, 20.0) and np.allclose(lat, ORIGIN[0] + observed / M_PER_DEG)
+        elif step >= 30:
+            errors.append((lat - ORIGIN[0]) * M_PER_DEG - north)
+    
+    assert np.sqrt(np.mean(np.square(errors))) < 12 and accuracy.max() < 12
+    assert abs(tracker.v_north[1] - 0.5) < 0.3 and abs(tracker.v_north[0]) < 0.3
+    
+    # Observations for some rows only leave the others untouched
+    before = tracker.north.copy()
+    tracker.update([ORIGIN[0]], [ORIGIN[1]], 1_700_000_600_000, 20.0, rows=[5])
+    assert np.array_equal(tracker.north[:2], before[:2]) and tracker.time_ms[5] > 0
+
+
+def test_uncertain_cows_keep_their_status_until_confident(make_herd):
+    herd = HerdState()
+    confident, naive = AlertEngine(confidence=0.9), AlertEngine(confidence=0.5)
+    for engine in (confident, naive):
+        engine.set_handler('human', ORIGIN)
+    
+    statuses = []
+    for distance in (110, 95, 105, 70):  # Accuracy 10 m: a 12.8 m margin at 90%
+        make_herd(north_m=[distance], herd=herd).accuracy[:1] = 10.0
+        statuses.append((len(confident.evaluate(herd)['transitions']), confident.status[0], naive.evaluate(herd)['alerts_active']))
+    
+    alert, safe = 1, 0
+    assert [s[1] for s in statuses] == [alert, alert, alert, safe]
+    assert [s[0] for s in statuses] == [1, 0, 0, 1]
+    assert [s[2] for s in statuses] == [1, 0, 1, 0]
+
+
+def test_ingest_fuses_every_report_of_a_batch(monkeypatch):
+    monkeypatch.setattr(config, 'TRACK_FILTER_ENABLED', True)
+    pipeline = IngestPipeline(udp_port=0, tcp_port=False)
+    records = np.zeros(3, dtype=PACKET_DTYPE)
+    records['cow_id'] = [7, 8, 7]
+    records['lat'] = [ORIGIN[0], ORIGIN[0], ORIGIN[0] + 10 / M_PER_DEG]
+    records['lon'] = ORIGIN[1]
+    records['timestamp_ms'] = [1_700_000_000_000, 1_700_000_000_000, 1_700_000_001_000]
+    pipeline.enqueue(records)
+    
+    view = pipeline.get_current_herd()['cows']
+    assert view.ids.tolist() == [7, 8]
+    assert 0 < (view.lat[0] - ORIGIN[0]) * M_PER_DEG < 10
+    assert view.accuracy[0] < config.GNSS_FIX_SIGMA == view.accuracy[1]
+    assert view.timestamp_ms.tolist() == [1_700_000_001_000, 1_700_000_000_000]
+    assert view[0]['accuracy'] == round(float(view.accuracy[0]), 1)
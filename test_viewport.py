@@ -0,0 +1,73 @@
+"""
+Tests for viewport filtering and clustering of broadcasts
+"""
+import json
+
+import numpy as np
+
+import app as server
+import config
+from alert_engine import AlertEngine
+from viewport import ViewportFrames, viewport_key
+
+HUMAN_POS = config.FIXED_HUMAN_COORDS
+
+
+def make_view(make_herd, num_cows=5000):
+    herd = make_herd(num_cows, seed=4)
+    engine = AlertEngine(thresholds={})
+    engine.set_handler('human', HUMAN_POS)
+    summary = engine.evaluate(herd)
+    return herd.view(), {'update_count': 1, 'alerts_active': summary['alerts_active']}
+
+
+def test_zoomed_in_viewport_sends_only_visible_cows(make_herd):
+    view, header = make_view(make_herd)
+    frames = ViewportFrames()
+    frames.begin_tick(view, header)
+    bounds = (HUMAN_POS[0] - 0.001, HUMAN_POS[1] - 0.001, HUMAN_POS[0] + 0.001, HUMAN_POS[1] + 0.001)
+    key = viewport_key(bounds, 18)
+    
+    frame = json.loads(frames.frame(key))
+    cows = [cow for tile in frame['tiles'] for cow in tile['cows']]
+    
+    assert not frame['clustered'] and frame['header']['alerts_active'] == header['alerts_active']
+    assert 0 < len(cows) < len(view) / 10
+    inside = (np.abs(view.lat - HUMAN_POS[0]) < 0.001) & (np.abs(view.lon - HUMAN_POS[1]) < 0.001)
+    assert set(view.ids[inside].tolist()) <= {cow[0] for cow in cows}
+    assert frames.frame(key) is frames.frame(key)
+
+
+def test_zoomed_out_viewport_sends_clusters(make_herd):
+    view, header = make_view(make_herd)
+    frames = ViewportFrames()
+    frames.begin_tick(view, header)
+    bounds = (HUMAN_POS[0] - 0.05, HUMAN_POS[1] - 0.05, HUMAN_POS[0] + 0.05, HUMAN_POS[1] + 0.05)
+    
+    frame = json.loads(frames.frame(viewport_key(bounds, 13)))
+    clusters = [cluster for tile in frame['tiles'] for cluster in tile['clusters']]
+    
+    assert frame['clustered']
+    assert sum(cluster[2] for cluster in clusters) == len(view)
+    assert sum(cluster[3] for cluster in clusters) == header['alerts_active']
+    assert len(clusters) <= 16 * len(frame['tiles'])
+
+
+def test_viewport_clients_share_a_room_and_frame():
+    bounds = [HUMAN_POS[0] - 0.001, HUMAN_POS[1] - 0.001, HUMAN_POS[0] + 0.001, HUMAN_POS[1] + 0.001]
+    clients = [server.socketio.test_client(server.app) for _ in range(2)]
+    for client in clients:
+        client.emit('set_viewport', {'bounds': bounds, 'zoom': 18})
+        client.get_received()
+    
+    server.monitoring_system.perform_update_cycle()
+    received = [client.get_received() for client in clients]
+    
+    for packets in received:
+        names = [packet['name'] for packet in packets]
+        assert 'viewport_update' in names
+        assert not {'position_delta', 'position_keyframe', 'position_update'} & set(names)
+    payloads = [next(p['args'][0] for p in packets if p['name'] == 'viewport_update') for packets in received]
+    assert payloads[0] is payloads[1]
+    for client in clients:
+        client.disconnect()
@@ -0,0 +1,146 @@
+"""
+Tests for the delta-encoded broadcast protocol
+"""
+import json
+
+import numpy as np
+
+import config
+from alert_engine import AlertEngine
+from wire import DeltaEncoder, SnapshotCache, decode_binary_frame, encode_binary_frame, encode_json
+
+HUMAN_POS = config.FIXED_HUMAN_COORDS
+
+
+def payload_for(herd, summary):
+    return {
+        'human': {'lat': HUMAN_POS[0], 'lon': HUMAN_POS[1]},
+        'cows': herd.view().to_dicts(),
+        'system_time': '2024-07-25T10:30:15',
+        'update_count': 1,
+        'alerts_active': summary['alerts_active'],
+        'cows_safe': summary['cows_safe'],
+        'distance_summary': {'min_distance': summary['min_distance'], 'max_distance': summary['max_distance']}
+    }
+
+
+class ClientState:
+    """Python mirror of HerdStreamDecoder in static/js/herd_stream.js"""
+    
+    def __init__(self):
+        self.seq = None
+        self.cows = {}
+    
+    def apply(self, event, frame):
+        if event == 'position_keyframe':
+            self.origin, self.quantum = frame['origin'], frame['coord_quantum']
+            self.cows = {row[0]: row for row in frame['cows']}
+        else:
+            assert frame['base_seq'] == self.seq
+            self.cows.update({row[0]: row for row in frame['cows']})
+            for cow_id in frame['removed']:
+                del self.cows[cow_id]
+        self.seq = frame['seq']
+    
+    def position(self, cow_id):
+        row = self.cows[cow_id]
+        return self.origin[0] + row[1] * self.quantum, self.origin[1] + row[2] * self.quantum
+
+
+def test_diffs_carry_only_changed_cows_and_cut_bytes(make_herd):
+    rng = np.random.default_rng(3)
+    herd = make_herd(2000, spread=0.001, rng=rng, rssi=(-110, -50))
+    engine = AlertEngine(thresholds={})
+    engine.set_handler('human', HUMAN_POS)
+    encoder = DeltaEncoder(keyframe_interval=100)
+    client = ClientState()
+    
+    summary = engine.evaluate(herd)
+    event, frame = encoder.encode(herd.view(), payload_for(herd, summary))
+    client.apply(event, frame)
+    assert event == 'position_keyframe'
+    
+    for _ in range(3):
+        moved = rng.choice(2000, 50, replace=False)
+        herd.lat[moved] += 0.0001
+        summary = engine.evaluate(herd)
+        payload = payload_for(herd, summary)
+        event, frame = encoder.encode(herd.view(), payload)
+        client.apply(event, frame)
+        
+        assert event == 'position_delta'
+        assert set(moved + 1) <= {row[0] for row in frame['cows']}
+        assert len(json.dumps(frame)) * 10 < len(json.dumps(payload))
+    
+    for cow_id in (1, 500, 2000):
+        lat, lon = client.position(cow_id)
+        assert abs(lat - herd.lat[cow_id - 1]) * 111320 <= config.DELTA_MOVE_THRESHOLD
+        assert abs(lon - herd.lon[cow_id - 1]) * 111320 <= config.DELTA_MOVE_THRESHOLD
+
+
+def test_late_joiner_keyframe_matches_stream_state(make_herd):
+    rng = np.random.default_rng(3)
+    herd = make_herd(100, spread=0.001, rng=rng, rssi=(-110, -50))
+    engine = AlertEngine(thresholds={})
+    engine.set_handler('human', HUMAN_POS)
+    encoder = DeltaEncoder(keyframe_interval=3)
+    early = ClientState()
+    
+    events = []
+    for _ in range(5):
+        herd.lat[:100] += rng.uniform(-0.0001, 0.0001, 100)
+        summary = engine.evaluate(herd)
+        event, frame = encoder.encode(herd.view(), payload_for(herd, summary))
+        early.apply(event, frame)
+        events.append(event)
+    
+    late = ClientState()
+    late.apply('position_keyframe', encoder.keyframe())
+    
+    assert events == ['position_keyframe', 'position_delta', 'position_delta', 'position_keyframe', 'position_delta']
+    assert late.seq == early.seq
+    assert late.cows == early.cows
+    
+    herd.resize(90)
+    summary = engine.evaluate(herd)
+    event, frame = encoder.encode(herd.view(), payload_for(herd, summary))
+    assert frame['removed'] == list(range(91, 101))
+
+
+def test_binary_frame_round_trip_is_compact(make_herd):
+    herd = make_herd(1000, spread=0.001, seed=3, rssi=(-110, -50))
+    engine = AlertEngine(thresholds={})
+    engine.set_handler('human', HUMAN_POS)
+    summary = engine.evaluate(herd)
+    payload = payload_for(herd, summary)
+    
+    data = encode_binary_frame(herd.view(), payload, seq=7)
+    header, columns = decode_binary_frame(data)
+    
+    assert header['seq'] == 7 and header['count'] == 1000
+    assert header['alerts_active'] == summary['alerts_active']
+    assert np.array_equal(columns['id'], herd.ids[:1000])
+    assert np.abs(columns['lat'] / header['coord_scale'] - herd.lat[:1000]).max() < 1e-7
+    assert np.array_equal(columns['rssi_x10'], np.rint(herd.rssi[:1000] * 10))
+    assert np.array_equal(columns['status'], herd.status[:1000])
+    assert len(data) < 20 * 1000 + 1024
+    assert len(data) * 10 < len(json.dumps(payload))
+
+
+def test_snapshot_cache_memoizes_per_version():
+    cache = SnapshotCache()
+    calls = []
+    producer = lambda: calls.append(1) or encode_json({'n': len(calls)})
+    
+    cache.publish({'current_data': b'{}'})
+    etag = cache.etag('current_data')
+    first = cache.get('keyframe', producer)
+    
+    assert cache.get('keyframe', producer) is first
+    assert cache.get('current_data') == b'{}'
+    assert len(calls) == 1
+    
+    cache.publish({'current_data': b'[]'})
+    assert cache.etag('current_data') != etag
+    assert cache.get('keyframe') is None
+    assert cache.get('keyframe', producer) == b'{"n":2}'
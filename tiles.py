@@ -0,0 +1,315 @@
+"""
+Heatmap tiles for NavIC + LoRa monitoring system
+Renders herd density and alert heatmaps as 256 px Web Mercator PNG tiles,
+with an LRU cache that drops only the tiles touched by each tick
+"""
+
+import math
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+import numpy as np
+import config
+from alert_engine import STATUS_ALERT
+from track_log import TRACK_COORD_SCALE
+
+
+TILE_SIZE = 256
+TILE_LAYERS = ('density', 'alerts')
+TILE_MIME_TYPE = 'image/png'
+
+# Colour ramps: (position in 0..1, RGBA) control points
+_RAMPS = {
+    'density': [
+        (0.0, (0, 0, 255, 0)),
+        (0.15, (0, 90, 255, 110)),
+        (0.4, (0, 200, 120, 160)),
+        (0.7, (255, 220, 0, 200)),
+        (1.0, (220, 20, 20, 230))
+    ],
+    'alerts': [
+        (0.0, (255, 140, 0, 0)),
+        (0.3, (255, 140, 0, 140)),
+        (1.0, (200, 0, 0, 235))
+    ]
+}
+
+_MAX_LAT = 85.05112878
+
+
+def _color_table(ramp):
+    """256-entry RGBA lookup table interpolated from a colour ramp"""
+    positions = np.linspace(0, 1, 256)
+    stops = [stop for stop, _ in ramp]
+    return np.stack([
+        np.interp(positions, stops, [color[channel] for _, color in ramp])
+        for channel in range(4)
+    ], axis=1).round().astype(np.uint8)
+
+
+_COLOR_TABLES = {layer: _color_table(ramp) for layer, ramp in _RAMPS.items()}
+
+
+def encode_png(rgba):
+    """
+    Encode an RGBA image as PNG
+    
+    Args:
+        rgba: uint8 array of shape (height, width, 4)
+    
+    Returns:
+        PNG bytes
+    """
+    height, width, _ = rgba.shape
+    raw = np.zeros((height, width * 4 + 1), dtype=np.uint8)  # Filter byte 0 per row
+    raw[:, 1:] = rgba.reshape(height, width * 4)
+    
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+    
+    return b''.join([
+        b'\x89PNG\r\n\x1a\n',
+        chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0)),
+        chunk(b'IDAT', zlib.compress(raw.tobytes(), 6)),
+        chunk(b'IEND', b'')
+    ])
+
+
+EMPTY_TILE = encode_png(np.zeros((TILE_SIZE, TILE_SIZE, 4), dtype=np.uint8))
+
+
+def world_pixels(lat, lon, zoom):
+    """
+    Global Web Mercator pixel coordinates at a zoom level
+    
+    Args:
+        lat: Latitude array in degrees
+        lon: Longitude array in degrees
+        zoom: Zoom level
+    
+    Returns:
+        Tuple of (px, py) float arrays
+    """
+    scale = TILE_SIZE * 2 ** zoom
+    lat_rad = np.radians(np.clip(lat, -_MAX_LAT, _MAX_LAT))
+    px = (np.asarray(lon) + 180.0) / 360.0 * scale
+    py = (1.0 - np.arcsinh(np.tan(lat_rad)) / math.pi) / 2.0 * scale
+    return px, py
+
+
+def _box_blur(image, radius):
+    """Box blur along both axes via cumulative sums"""
+    for axis in (0, 1):
+        padded = np.pad(image, [(radius + 1, radius) if a == axis else (0, 0) for a in (0, 1)])
+        cumulative = np.cumsum(padded, axis=axis)
+        size = image.shape[axis]
+        image = (np.take(cumulative, np.arange(2 * radius + 1, 2 * radius + 1 + size), axis=axis)
+                 - np.take(cumulative, np.arange(size), axis=axis)) / (2 * radius + 1)
+    return image
+
+
+def render_tile(px, py, zoom, x, y, layer='density'):
+    """
+    Render one heatmap tile
+    
+    Args:
+        px: Global pixel x of the points to draw (points near the tile suffice)
+        py: Global pixel y of the points to draw
+        zoom: Zoom level
+        x: Tile column
+        y: Tile row
+        layer: One of TILE_LAYERS (selects the colour ramp)
+    
+    Returns:
+        PNG bytes
+    """
+    radius = config.HEATMAP_RADIUS_PX
+    margin = 2 * radius
+    size = TILE_SIZE + 2 * margin
+    col = np.floor(px - x * TILE_SIZE).astype(np.int64) + margin
+    row = np.floor(py - y * TILE_SIZE).astype(np.int64) + margin
+    inside = (col >= 0) & (col < size) & (row >= 0) & (row < size)
+    if not np.any(inside):
+        return EMPTY_TILE
+    
+    counts = np.bincount(row[inside] * size + col[inside], minlength=size * size).reshape(size, size)
+    density = _box_blur(_box_blur(counts.astype(np.float64), radius), radius)[margin:-margin, margin:-margin]
+    
+    # Log scale so single cows stay visible next to dense clusters
+    level = np.log1p(density * (2 * radius + 1) ** 2) / math.log1p(config.HEATMAP_SATURATION)
+    index = np.clip(level * 255, 0, 255).astype(np.uint8)
+    return encode_png(_COLOR_TABLES[layer][index])
+
+
+class HeatmapTiles:
+    """
+    Heatmap tile renderer with an LRU cache
+    
+    Live tiles are rendered from the herd of the latest tick and cached
+    until a tick moves, adds, removes or changes the status of a cow in the
+    tile or close enough to blur into it; begin_tick() evicts just those
+    tiles. History tiles (rendered from a track log tick) never change and
+    are only evicted by the LRU bound.
+    """
+    
+    def __init__(self, max_tiles=None):
+        self.max_tiles = config.TILE_CACHE_SIZE if max_tiles is None else max_tiles
+        self._cache = OrderedDict()  # (source, layer, z, x, y) -> (version, PNG bytes)
+        self._bins = {}  # (source, layer, z) -> points sorted by tile, for the current tick
+        self._lock = threading.Lock()
+        self.version = 0
+        self._lat = self._lon = self._status = None
+        self.renders = 0
+        self.hits = 0
+    
+    def begin_tick(self, view):
+        """
+        Take the herd of a new tick and evict the live tiles it changed
+        
+        Args:
+            view: HerdView with the evaluated herd
+        """
+        lat, lon, status = np.array(view.lat), np.array(view.lon), np.array(view.status)
+        with self._lock:
+            self.version += 1
+            self._bins.clear()
+            previous = (self._lat, self._lon, self._status)
+            self._lat, self._lon, self._status = lat, lon, status
+            if previous[0] is None or len(previous[0]) != len(lat):
+                self._evict_live(None)
+                return
+            
+            changed = (lat != previous[0]) | (lon != previous[1]) | (status != previous[2])
+            if not np.any(changed):
+                return
+            old_lat, old_lon = previous[0][changed], previous[1][changed]
+            zooms = {key[2] for key in self._cache if key[0] == 'live'}
+            dirty = set()
+            for zoom in zooms:
+                for point_lat, point_lon in ((lat[changed], lon[changed]), (old_lat, old_lon)):
+                    dirty.update(self._touched_tiles(point_lat, point_lon, zoom))
+            self._evict_live(dirty)
+    
+    def _touched_tiles(self, lat, lon, zoom):
+        """Tiles whose rendering can include points at the given positions"""
+        px, py = world_pixels(lat, lon, zoom)
+        reach = 2 * config.HEATMAP_RADIUS_PX
+        n = 2 ** zoom
+        tiles = set()
+        for dx in (-reach, 0, reach):
+            for dy in (-reach, 0, reach):
+                tx = np.clip(((px + dx) // TILE_SIZE).astype(np.int64), 0, n - 1)
+                ty = np.clip(((py + dy) // TILE_SIZE).astype(np.int64), 0, n - 1)
+                tiles.update((zoom, key // n, key % n) for key in np.unique(tx * n + ty).tolist())
+        return tiles
+    
+    def _evict_live(self, dirty):
+        """Drop live tiles in the dirty (zoom, x, y) set, or all of them for None"""
+        for key in [key for key in self._cache if key[0] == 'live']:
+            if dirty is None or key[2:] in dirty:
+                del self._cache[key]
+    
+    def _binned(self, source, layer, zoom, lat, lon):
+        """Pixel coordinates of a point set sorted by tile, computed once per source and zoom"""
+        key = (source, layer, zoom)
+        binned = self._bins.get(key)
+        if binned is None:
+            px, py = world_pixels(lat, lon, zoom)
+            n = 2 ** zoom
+            tile_keys = (np.clip(px // TILE_SIZE, 0, n - 1).astype(np.int64) * n
+                         + np.clip(py // TILE_SIZE, 0, n - 1).astype(np.int64))
+            order = np.argsort(tile_keys, kind='stable')
+            binned = self._bins[key] = (tile_keys[order], px[order], py[order])
+        return binned
+    
+    def _points_near(self, binned, zoom, x, y):
+        """Pixel coordinates of the points in a tile and its 8 neighbours"""
+        tile_keys, px, py = binned
+        n = 2 ** zoom
+        parts = []
+        for tx in range(max(0, x - 1), min(n, x + 2)):
+            # Tiles (tx, y-1..y+1) are contiguous in the sort order
+            lo = int(np.searchsorted(tile_keys, tx * n + max(0, y - 1), side='left'))
+            hi = int(np.searchsorted(tile_keys, tx * n + min(n - 1, y + 1), side='right'))
+            parts.append(slice(lo, hi))
+        return np.concatenate([px[part] for part in parts]), np.concatenate([py[part] for part in parts])
+    
+    def live_tile(self, zoom, x, y, layer='density'):
+        """
+        PNG tile of the latest tick
+        
+        Args:
+            zoom: Zoom level
+            x: Tile column
+            y: Tile row
+            layer: 'density' (all cows) or 'alerts' (alerting cows)
+        
+        Returns:
+            Tuple of (PNG bytes, version for ETags)
+        """
+        def points():
+            lat, lon = self._lat, self._lon
+            if lat is None:
+                return np.zeros(0), np.zeros(0)
+            if layer == 'alerts':
+                alerting = self._status == STATUS_ALERT
+                lat, lon = lat[alerting], lon[alerting]
+            return self._points_near(self._binned('live', layer, zoom, lat, lon), zoom, x, y)
+        
+        return self._get(('live', layer, zoom, x, y), points)
+    
+    def history_tile(self, reader, at_ms, zoom, x, y, layer='density'):
+        """
+        PNG tile of the last recorded tick at or before a time
+        
+        Args:
+            reader: TrackReader
+            at_ms: Time in epoch milliseconds
+            zoom: Zoom level
+            x: Tile column
+            y: Tile row
+            layer: 'density' or 'alerts'
+        
+        Returns:
+            Tuple of (PNG bytes, version for ETags), or None if nothing was
+            recorded before at_ms
+        """
+        records = None
+        for segment in reversed(reader.segments):
+            if segment.start_ms <= at_ms:
+                position = int(np.searchsorted(segment.index['timestamp_ms'], at_ms, side='right')) - 1
+                timestamp_ms, first, count = segment.index[position].tolist()
+                records = segment.records[first:first + count]
+                break
+        if records is None:
+            return None
+        source = f'history:{timestamp_ms}'
+        
+        def points():
+            selected = records if layer == 'density' else records[records['status'] == STATUS_ALERT]
+            lat, lon = selected['lat'] / TRACK_COORD_SCALE, selected['lon'] / TRACK_COORD_SCALE
+            return self._points_near(self._binned(source, layer, zoom, lat, lon), zoom, x, y)
+        
+        return self._get((source, layer, zoom, x, y), points)
+    
+    def _get(self, key, points):
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return cached[1], cached[0]
+            version = self.version
+            px, py = points()
+        
+        _, layer, zoom, x, y = key
+        png = render_tile(px, py, zoom, x, y, layer)
+        
+        with self._lock:
+            self.renders += 1
+            if version == self.version or key[0] != 'live':
+                self._cache[key] = (version, png)
+                while len(self._cache) > self.max_tiles:
+                    self._cache.popitem(last=False)
+        return png, version
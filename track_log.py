@@ -0,0 +1,274 @@
+"""
+Track log for NavIC + LoRa monitoring system
+Append-only columnar storage of per-tick herd positions, RSSI and status,
+read back through memory-mapped NumPy views
+"""
+
+import os
+import threading
+import time
+import numpy as np
+import config
+
+
+# Fixed-width record, one per cow per tick; coordinates are int32 fixed-point
+# degrees (TRACK_COORD_SCALE), RSSI in tenths of a dBm
+TRACK_RECORD_DTYPE = np.dtype([
+    ('cow_id', '<u4'),
+    ('lat', '<i4'),
+    ('lon', '<i4'),
+    ('rssi_x10', '<i2'),
+    ('status', 'u1'),
+    ('reserved', 'u1')
+])
+TRACK_COORD_SCALE = 10 ** 7
+
+# Per-segment time index, one entry per tick: the tick's records are
+# records[first:first + count], sorted by cow id
+TRACK_INDEX_DTYPE = np.dtype([
+    ('timestamp_ms', '<i8'),
+    ('first', '<i8'),
+    ('count', '<i8')
+])
+
+RECORD_SUFFIX = '.trk'
+INDEX_SUFFIX = '.idx'
+
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+
+class TrackLog:
+    """
+    Append-only writer of herd ticks
+    
+    The log is a directory of segments, each covering segment_seconds of
+    ticks: a record file of TRACK_RECORD_DTYPE rows and an index file of
+    TRACK_INDEX_DTYPE entries. Records are written before their index entry,
+    so a reader never sees a tick whose records are incomplete.
+    """
+    
+    def __init__(self, directory=None, segment_seconds=None):
+        self.directory = config.TRACK_LOG_DIR if directory is None else directory
+        self.segment_ms = int((config.TRACK_SEGMENT_SECONDS if segment_seconds is None else segment_seconds) * 1000)
+        os.makedirs(self.directory, exist_ok=True)
+        
+        self._segment_start = None
+        self._records_file = None
+        self._index_file = None
+        self._next_record = 0
+        self._last_ms = None
+        self._lock = threading.Lock()
+    
+    def _open_segment(self, timestamp_ms):
+        """Start a new segment named after its first tick"""
+        self.close()
+        base = os.path.join(self.directory, f'segment-{timestamp_ms:015d}')
+        self._records_file = open(base + RECORD_SUFFIX, 'ab')
+        self._index_file = open(base + INDEX_SUFFIX, 'ab')
+        self._next_record = self._records_file.tell() // TRACK_RECORD_DTYPE.itemsize
+        self._segment_start = timestamp_ms
+    
+    def append(self, view, timestamp_ms=None):
+        """
+        Append one tick of the herd
+        
+        Args:
+            view: HerdView with the evaluated herd
+            timestamp_ms: Tick time in epoch milliseconds (default: now)
+        
+        Returns:
+            Number of records written
+        """
+        timestamp_ms = _now_ms() if timestamp_ms is None else int(timestamp_ms)
+        n = len(view)
+        
+        records = np.empty(n, dtype=TRACK_RECORD_DTYPE)
+        records['cow_id'] = view.ids[:n]
+        records['lat'] = np.rint(view.lat[:n] * TRACK_COORD_SCALE)
+        records['lon'] = np.rint(view.lon[:n] * TRACK_COORD_SCALE)
+        records['rssi_x10'] = np.rint(view.rssi[:n].astype(np.float64) * 10)
+        records['status'] = view.status[:n]
+        records['reserved'] = 0
+        if n > 1 and np.any(records['cow_id'][1:] < records['cow_id'][:-1]):
+            records = records[np.argsort(records['cow_id'], kind='stable')]
+        
+        with self._lock:
+            if self._last_ms is not None and timestamp_ms <= self._last_ms:
+                timestamp_ms = self._last_ms + 1  # Keep the time index strictly increasing
+            if self._segment_start is None or timestamp_ms - self._segment_start >= self.segment_ms:
+                self._open_segment(timestamp_ms)
+            
+            self._records_file.write(records.tobytes())
+            self._records_file.flush()
+            entry = np.array([(timestamp_ms, self._next_record, n)], dtype=TRACK_INDEX_DTYPE)
+            self._index_file.write(entry.tobytes())
+            self._index_file.flush()
+            
+            self._next_record += n
+            self._last_ms = timestamp_ms
+        return n
+    
+    def close(self):
+        """Close the current segment's files"""
+        for f in (self._records_file, self._index_file):
+            if f is not None:
+                f.close()
+        self._records_file = self._index_file = None
+        self._segment_start = None
+
+
+class TrackSegment:
+    """Memory-mapped segment of a track log"""
+    
+    def __init__(self, base):
+        self.base = base
+        index_size = os.path.getsize(base + INDEX_SUFFIX) // TRACK_INDEX_DTYPE.itemsize
+        self.index = np.fromfile(base + INDEX_SUFFIX, dtype=TRACK_INDEX_DTYPE, count=index_size)
+        num_records = int(self.index['first'][-1] + self.index['count'][-1]) if len(self.index) else 0
+        self.records = (np.memmap(base + RECORD_SUFFIX, dtype=TRACK_RECORD_DTYPE, mode='r', shape=(num_records,))
+                        if num_records else np.zeros(0, dtype=TRACK_RECORD_DTYPE))
+    
+    @property
+    def start_ms(self):
+        return int(self.index['timestamp_ms'][0])
+    
+    @property
+    def end_ms(self):
+        return int(self.index['timestamp_ms'][-1])
+    
+    def tick_range(self, start_ms, end_ms):
+        """Index positions of the ticks with start_ms <= timestamp < end_ms"""
+        timestamps = self.index['timestamp_ms']
+        return (int(np.searchsorted(timestamps, start_ms, side='left')),
+                int(np.searchsorted(timestamps, end_ms, side='left')))
+
+
+class TrackReader:
+    """
+    Range queries over a track log without loading it
+    
+    Segments are memory-mapped; a time-window query slices the record file
+    between two index entries (a zero-copy view), and a cow filter binary
+    searches each tick's id-sorted records, touching only the pages it needs.
+    """
+    
+    def __init__(self, directory=None):
+        self.directory = config.TRACK_LOG_DIR if directory is None else directory
+        self.segments = []
+        self.refresh()
+    
+    def refresh(self):
+        """
+        Re-scan the directory to pick up ticks appended since opening
+        
+        Only the newest segment can still grow, so older segments already
+        mapped are kept as they are.
+        """
+        names = sorted(name[:-len(INDEX_SUFFIX)] for name in os.listdir(self.directory)
+                       if name.startswith('segment-') and name.endswith(INDEX_SUFFIX))
+        known = {segment.base: segment for segment in self.segments[:-1]}
+        segments = []
+        for name in names:
+            base = os.path.join(self.directory, name)
+            segments.append(known.get(base) or TrackSegment(base))
+        self.segments = [segment for segment in segments if len(segment.index)]
+    
+    def time_range(self):
+        """
+        Time span of the log
+        
+        Returns:
+            Tuple of (first, last) tick timestamps in epoch ms, or None if empty
+        """
+        if not self.segments:
+            return None
+        return self.segments[0].start_ms, self.segments[-1].end_ms
+    
+    def ticks(self, start_ms, end_ms):
+        """
+        Iterate over the ticks in a time window
+        
+        Args:
+            start_ms: Window start in epoch milliseconds (inclusive)
+            end_ms: Window end in epoch milliseconds (exclusive)
+        
+        Yields:
+            Tuples of (timestamp_ms, records) where records is a zero-copy
+            view of the tick's TRACK_RECORD_DTYPE rows
+        """
+        for segment in self._overlapping(start_ms, end_ms):
+            lo, hi = segment.tick_range(start_ms, end_ms)
+            for timestamp, first, count in segment.index[lo:hi].tolist():
+                yield timestamp, segment.records[first:first + count]
+    
+    def query(self, start_ms, end_ms, cow_ids=None):
+        """
+        Records in a time window, optionally for some cows only
+        
+        Args:
+            start_ms: Window start in epoch milliseconds (inclusive)
+            end_ms: Window end in epoch milliseconds (exclusive)
+            cow_ids: Optional iterable of cow ids
+        
+        Returns:
+            Tuple of (timestamps, records): int64 epoch-ms array and
+            TRACK_RECORD_DTYPE array of equal length, in time order. Without
+            cow_ids and within one segment, records is a view of the file.
+        """
+        wanted = None if cow_ids is None else np.unique(np.asarray(list(cow_ids), dtype=np.uint32))
+        timestamp_parts, record_parts = [], []
+        
+        for segment in self._overlapping(start_ms, end_ms):
+            lo, hi = segment.tick_range(start_ms, end_ms)
+            if lo == hi:
+                continue
+            index = segment.index[lo:hi]
+            
+            if wanted is None:
+                first = int(index['first'][0])
+                last = int(index['first'][-1] + index['count'][-1])
+                record_parts.append(segment.records[first:last])
+                timestamp_parts.append(np.repeat(index['timestamp_ms'], index['count']))
+                continue
+            
+            rows, counts = [], []
+            for first, count in zip(index['first'].tolist(), index['count'].tolist()):
+                ids = segment.records['cow_id'][first:first + count]
+                positions = np.searchsorted(ids, wanted)
+                found = positions < count
+                found[found] = ids[positions[found]] == wanted[found]
+                rows.append(first + positions[found])
+                counts.append(int(np.count_nonzero(found)))
+            record_parts.append(segment.records[np.concatenate(rows)])
+            timestamp_parts.append(np.repeat(index['timestamp_ms'], counts))
+        
+        if not record_parts:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=TRACK_RECORD_DTYPE)
+        if len(record_parts) == 1:
+            return timestamp_parts[0], record_parts[0]
+        return np.concatenate(timestamp_parts), np.concatenate(record_parts)
+    
+    def _overlapping(self, start_ms, end_ms):
+        return [segment for segment in self.segments
+                if segment.start_ms < end_ms and segment.end_ms >= start_ms]
+
+
+def decode_records(records):
+    """
+    Convert track records to physical units
+    
+    Args:
+        records: TRACK_RECORD_DTYPE array
+    
+    Returns:
+        Dictionary of cow_id, lat, lon (degrees), rssi (dBm) and status arrays
+    """
+    return {
+        'cow_id': records['cow_id'].astype(np.int64),
+        'lat': records['lat'] / TRACK_COORD_SCALE,
+        'lon': records['lon'] / TRACK_COORD_SCALE,
+        'rssi': records['rssi_x10'] / 10,
+        'status': np.asarray(records['status'])
+    }
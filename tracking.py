@@ -0,0 +1,175 @@
+"""
+Track smoothing for NavIC + LoRa monitoring system
+Vectorized constant-velocity Kalman filter fusing successive position
+observations of every cow into a smoothed position with an uncertainty
+"""
+
+import math
+import numpy as np
+import config
+from distance import EARTH_MEAN_RADIUS, rssi_to_estimated_distance
+from path_loss import active_table
+
+
+# Per-track state, indexed by herd row; 36 bytes per cow in total
+TRACK_COLUMNS = {
+    'east': np.float32,  # Position east of the origin (m)
+    'north': np.float32,  # Position north of the origin (m)
+    'v_east': np.float32,  # Velocity (m/s)
+    'v_north': np.float32,
+    'p_pos': np.float32,  # Per-axis covariance: position variance (m^2),
+    'p_cross': np.float32,  # position/velocity covariance (m^2/s)
+    'p_vel': np.float32,  # and velocity variance (m^2/s^2)
+    'time_ms': np.int64  # Time of the last observation; 0 for no track yet
+}
+
+
+def rssi_position_sigma(rssi, sigma_db=None, n=None):
+    """
+    Position error of a location estimated from an RSSI reading
+    
+    Log-normal shadowing of sigma_db decibels scales the path-loss range
+    estimate d by 10^(sigma_db / (10 n)), i.e. a range error of about
+    d * ln(10) * sigma_db / (10 n).
+    
+    Args:
+        rssi: RSSI value(s) in dBm
+        sigma_db: Shadowing standard deviation in dB (default from config)
+        n: Path-loss exponent (default: the calibrated path-loss model)
+    
+    Returns:
+        1-sigma position error in meters, per axis
+    """
+    if n is None:
+        return active_table().position_sigma(rssi, sigma_db)
+    if sigma_db is None:
+        sigma_db = config.RSSI_SHADOWING_SIGMA
+    return rssi_to_estimated_distance(rssi, n=n) * math.log(10) * sigma_db / (10 * n)
+
+
+class TrackFilter:
+    """
+    Constant-velocity Kalman filter for every cow, in struct-of-arrays form
+    
+    Positions are tracked in meters on a local east/north plane around the
+    origin. Process noise (white acceleration) and observation noise are the
+    same along both axes, so both axes share one 2x2 covariance: three floats
+    per track. Observation noise can differ per observation, e.g. a GNSS fix
+    against an RSSI-derived estimate. A track starts at its first
+    observation with zero velocity.
+    """
+    
+    def __init__(self, origin=None, process_noise=None, initial_speed_sigma=None):
+        self.origin = tuple(config.BASE_COORDS if origin is None else origin)
+        self.process_noise = config.TRACK_PROCESS_NOISE if process_noise is None else process_noise
+        speed_sigma = config.TRACK_INITIAL_SPEED_SIGMA if initial_speed_sigma is None else initial_speed_sigma
+        self.initial_speed_variance = speed_sigma ** 2
+        self._m_per_deg_lat = math.radians(1) * EARTH_MEAN_RADIUS
+        self._m_per_deg_lon = self._m_per_deg_lat * math.cos(math.radians(self.origin[0]))
+        self.capacity = 0
+        self._allocate(0)
+    
+    def _allocate(self, capacity):
+        for name, dtype in TRACK_COLUMNS.items():
+            column = np.zeros(capacity, dtype=dtype)
+            if self.capacity:
+                column[:self.capacity] = getattr(self, name)
+            setattr(self, name, column)
+        self.capacity = capacity
+    
+    def reset(self, rows=None):
+        """Forget the tracks of some rows (default: every row)"""
+        self.time_ms[slice(None) if rows is None else rows] = 0
+    
+    def update(self, lat, lon, timestamp_ms, sigma, rows=None):
+        """
+        Fuse one observation per track
+        
+        Args:
+            lat: Observed latitudes
+            lon: Observed longitudes
+            timestamp_ms: Observation times (epoch ms), scalar or array
+            sigma: 1-sigma observation errors in meters, scalar or array
+            rows: Herd rows of the observations, each at most once (default:
+                  rows 0 .. len(lat) - 1)
+        
+        Returns:
+            Tuple of (lat, lon, accuracy) arrays: smoothed positions and their
+            1-sigma errors in meters, per axis
+        """
+        lat = np.asarray(lat, dtype=np.float64)
+        n = len(lat)
+        if rows is None:
+            needed, rows = n, slice(0, n)  # Views instead of gathers for the full herd
+        else:
+            rows = np.asarray(rows, dtype=np.int64)
+            needed = int(rows.max()) + 1 if n else 0
+        if needed > self.capacity:
+            self._allocate(max(needed, 2 * self.capacity))
+        
+        z_east = (np.asarray(lon, dtype=np.float64) - self.origin[1]) * self._m_per_deg_lon
+        z_north = (lat - self.origin[0]) * self._m_per_deg_lat
+        r = np.broadcast_to(np.square(np.asarray(sigma, dtype=np.float64)), (n,))
+        t = np.broadcast_to(np.asarray(timestamp_ms, dtype=np.int64), (n,))
+        
+        east, north = self.east[rows].astype(np.float64), self.north[rows].astype(np.float64)
+        v_east, v_north = self.v_east[rows].astype(np.float64), self.v_north[rows].astype(np.float64)
+        p_pos, p_cross, p_vel = (self.p_pos[rows].astype(np.float64), self.p_cross[rows].astype(np.float64),
+                                 self.p_vel[rows].astype(np.float64))
+        last = self.time_ms[rows]
+        
+        # Predict: x += v dt; P = F P F' + Q for white acceleration noise
+        new = last == 0
+        dt = np.where(new, 0.0, np.maximum(t - last, 0) / 1000.0)
+        q = self.process_noise
+        east += v_east * dt
+        north += v_north * dt
+        p_pos += dt * (2 * p_cross + dt * p_vel) + q * dt ** 3 / 3
+        p_cross += dt * p_vel + q * dt ** 2 / 2
+        p_vel += q * dt
+        
+        # New tracks start at the observation with zero velocity
+        east[new], north[new] = z_east[new], z_north[new]
+        v_east[new], v_north[new] = 0.0, 0.0
+        p_pos[new], p_cross[new], p_vel[new] = r[new], 0.0, self.initial_speed_variance
+        
+        # Update with the observed position (H = [1 0])
+        gain_pos = p_pos / (p_pos + r)
+        gain_vel = p_cross / (p_pos + r)
+        gain_pos[new], gain_vel[new] = 0.0, 0.0
+        innovation_east, innovation_north = z_east - east, z_north - north
+        east += gain_pos * innovation_east
+        north += gain_pos * innovation_north
+        v_east += gain_vel * innovation_east
+        v_north += gain_vel * innovation_north
+        p_vel -= gain_vel * p_cross
+        p_pos *= 1 - gain_pos
+        p_cross *= 1 - gain_pos
+        
+        self.east[rows], self.north[rows] = east, north
+        self.v_east[rows], self.v_north[rows] = v_east, v_north
+        self.p_pos[rows], self.p_cross[rows], self.p_vel[rows] = p_pos, p_cross, p_vel
+        self.time_ms[rows] = np.maximum(t, last)
+        
+        return (self.origin[0] + north / self._m_per_deg_lat,
+                self.origin[1] + east / self._m_per_deg_lon,
+                np.sqrt(p_pos))
+    
+    def smooth_herd(self, herd, sigma, rows=None):
+        """
+        Replace freshly written herd observations by their smoothed positions
+        
+        Reads lat/lon/timestamp_ms of the rows, fuses them and writes the
+        smoothed lat/lon and the accuracy column back.
+        
+        Args:
+            herd: HerdState with the new observations
+            sigma: 1-sigma observation errors in meters, scalar or per row
+            rows: Rows that received an observation (default: every row)
+        """
+        selected = slice(0, herd.size) if rows is None else rows
+        lat, lon, accuracy = self.update(herd.lat[selected], herd.lon[selected], herd.timestamp_ms[selected],
+                                         sigma, rows)
+        herd.lat[selected] = lat
+        herd.lon[selected] = lon
+        herd.accuracy[selected] = accuracy
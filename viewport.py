@@ -0,0 +1,203 @@
+"""
+Viewport filtering for NavIC + LoRa monitoring system
+Bins the herd into web-map tiles once per tick and builds per-viewport
+frames of individual cows (zoomed in) or grid clusters (zoomed out),
+shared by every client looking at the same tiles
+"""
+
+import math
+import threading
+import numpy as np
+import config
+from alert_engine import STATUS_ALERT
+from wire import HEADER_FIELDS, encode_json
+
+
+# Fields of a cow row in a viewport tile, in order
+VIEWPORT_COW_FIELDS = ('id', 'lat', 'lon', 'rssi', 'distance', 'status')
+
+# Fields of a cluster row: centroid, number of cows and of alerting cows
+VIEWPORT_CLUSTER_FIELDS = ('lat', 'lon', 'count', 'alerts')
+
+_MAX_LAT = 85.05112878
+
+
+def tile_coords(lat, lon, zoom):
+    """
+    Web Mercator tile coordinates
+    
+    Args:
+        lat: Latitude(s) in degrees
+        lon: Longitude(s) in degrees
+        zoom: Zoom level
+    
+    Returns:
+        Tuple of (x, y) integer tile coordinates (arrays for array input)
+    """
+    n = 2 ** zoom
+    lat_rad = np.radians(np.clip(lat, -_MAX_LAT, _MAX_LAT))
+    x = np.floor((np.asarray(lon) + 180.0) / 360.0 * n)
+    y = np.floor((1.0 - np.arcsinh(np.tan(lat_rad)) / math.pi) / 2.0 * n)
+    return np.clip(x, 0, n - 1).astype(np.int64), np.clip(y, 0, n - 1).astype(np.int64)
+
+
+def viewport_key(bounds, zoom):
+    """
+    Canonical key of a viewport: the tile range covering it
+    
+    Clients whose bounds cover the same tiles share a key, and with it the
+    encoded frame. When the viewport spans more than
+    config.VIEWPORT_MAX_TILES tiles, coarser tiles are used.
+    
+    Args:
+        bounds: (south, west, north, east) in degrees
+        zoom: Map zoom level
+    
+    Returns:
+        Tuple of (map zoom, tile zoom, x0, y0, x1, y1)
+    """
+    south, west, north, east = (float(v) for v in bounds)
+    zoom = max(0, min(int(zoom), config.VIEWPORT_MAX_ZOOM))
+    tile_zoom = zoom
+    while True:
+        x0, y0 = (int(v) for v in tile_coords(north, west, tile_zoom))
+        x1, y1 = (int(v) for v in tile_coords(south, east, tile_zoom))
+        if (x1 - x0 + 1) * (y1 - y0 + 1) <= config.VIEWPORT_MAX_TILES or tile_zoom == 0:
+            return zoom, tile_zoom, x0, y0, x1, y1
+        tile_zoom -= 1
+
+
+def room_name(key):
+    """Socket.IO room of the clients sharing a viewport key"""
+    return 'view:' + '/'.join(str(v) for v in key)
+
+
+class ViewportFrames:
+    """
+    Per-tick builder of viewport frames
+    
+    begin_tick() takes the evaluated herd; the herd is then binned into tiles
+    once per tile zoom, every tile is encoded once per (tile, clustering)
+    combination, and every viewport frame once per key, however many
+    clients request it.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset(None, {})
+    
+    def _reset(self, view, header):
+        self.view = view
+        self._header = encode_json({field: header.get(field) for field in HEADER_FIELDS})
+        self._bins = {}  # tile zoom -> {tile key: row indices}
+        self._tiles = {}  # (tile zoom, x, y, clustered) -> encoded tile
+        self._frames = {}  # viewport key -> encoded frame
+    
+    def begin_tick(self, view, header):
+        """
+        Start a new tick
+        
+        Args:
+            view: HerdView with the evaluated herd
+            header: Update payload (e.g. current_data) providing HEADER_FIELDS
+        """
+        with self._lock:
+            self._reset(view, header)
+    
+    def _tile_rows(self, tile_zoom):
+        """Row indices of the cows in each tile at a tile zoom"""
+        bins = self._bins.get(tile_zoom)
+        if bins is None:
+            x, y = tile_coords(self.view.lat, self.view.lon, tile_zoom)
+            keys = x * (2 ** tile_zoom) + y
+            order = np.argsort(keys, kind='stable')
+            unique, starts = np.unique(keys[order], return_index=True)
+            bins = dict(zip(unique.tolist(), np.split(order, starts[1:])))
+            self._bins[tile_zoom] = bins
+        return bins
+    
+    def _tile(self, tile_zoom, x, y, clustered):
+        """Encoded payload of one tile"""
+        cache_key = (tile_zoom, x, y, clustered)
+        encoded = self._tiles.get(cache_key)
+        if encoded is not None:
+            return encoded
+        
+        rows = self._tile_rows(tile_zoom).get(x * (2 ** tile_zoom) + y)
+        if rows is None:
+            encoded = b''
+        else:
+            view = self.view
+            tile = {'z': tile_zoom, 'x': x, 'y': y}
+            if clustered and len(rows) > config.CLUSTER_TILE_LIMIT:
+                tile['clusters'] = self._clusters(rows, tile_zoom, x, y)
+            else:
+                tile['cows'] = list(zip(
+                    view.ids[rows].tolist(),
+                    view.lat[rows].tolist(),
+                    view.lon[rows].tolist(),
+                    np.round(view.rssi[rows].astype(np.float64), 1).tolist(),
+                    np.round(np.nan_to_num(view.distance[rows].astype(np.float64)), 1).tolist(),
+                    view.status[rows].tolist()
+                ))
+            encoded = encode_json(tile)
+        self._tiles[cache_key] = encoded
+        return encoded
+    
+    def _clusters(self, rows, tile_zoom, x, y):
+        """Aggregate a tile's cows on a config.CLUSTER_GRID x CLUSTER_GRID grid"""
+        view = self.view
+        grid = config.CLUSTER_GRID
+        n = 2 ** tile_zoom
+        lat, lon = view.lat[rows], view.lon[rows]
+        
+        # Position within the tile in Mercator units, scaled to grid cells
+        fx = (lon + 180.0) / 360.0 * n - x
+        lat_rad = np.radians(np.clip(lat, -_MAX_LAT, _MAX_LAT))
+        fy = (1.0 - np.arcsinh(np.tan(lat_rad)) / math.pi) / 2.0 * n - y
+        cells = (np.clip((fy * grid).astype(np.int64), 0, grid - 1) * grid
+                 + np.clip((fx * grid).astype(np.int64), 0, grid - 1))
+        
+        counts = np.bincount(cells, minlength=grid * grid)
+        occupied = np.flatnonzero(counts)
+        sum_lat = np.bincount(cells, weights=lat, minlength=grid * grid)
+        sum_lon = np.bincount(cells, weights=lon, minlength=grid * grid)
+        alerts = np.bincount(cells, weights=view.status[rows] == STATUS_ALERT, minlength=grid * grid)
+        
+        return list(zip(
+            np.round(sum_lat[occupied] / counts[occupied], 7).tolist(),
+            np.round(sum_lon[occupied] / counts[occupied], 7).tolist(),
+            counts[occupied].tolist(),
+            alerts[occupied].astype(np.int64).tolist()
+        ))
+    
+    def frame(self, key):
+        """
+        Encoded frame for a viewport key
+        
+        Args:
+            key: Viewport key from viewport_key()
+        
+        Returns:
+            JSON bytes with the update header, zoom, clustered flag and the
+            non-empty tiles of the viewport, or None before the first tick
+        """
+        with self._lock:
+            if self.view is None:
+                return None
+            encoded = self._frames.get(key)
+            if encoded is not None:
+                return encoded
+            
+            zoom, tile_zoom, x0, y0, x1, y1 = key
+            clustered = zoom < config.CLUSTER_MAX_ZOOM
+            tiles = [self._tile(tile_zoom, x, y, clustered)
+                     for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+            encoded = b''.join([
+                b'{"header":', self._header,
+                b',"zoom":', str(zoom).encode(),
+                b',"clustered":', b'true' if clustered else b'false',
+                b',"tiles":[', b','.join(tile for tile in tiles if tile), b']}'
+            ])
+            self._frames[key] = encoded
+            return encoded
@@ -0,0 +1,305 @@
+"""
+Wire formats for position broadcasts in NavIC + LoRa monitoring system
+Delta encoding of herd updates (periodic keyframes plus per-tick diffs) and a
+compact binary frame of packed typed arrays
+"""
+
+import json
+import math
+import struct
+import threading
+import numpy as np
+import config
+
+
+# Wire formats a client can negotiate; JSON is the default
+WIRE_FORMATS = ('json', 'binary')
+
+# Binary frame: magic, uint32 header length, JSON header padded to 4 bytes,
+# then one little-endian column per entry below. Columns are ordered by
+# element size so every column starts 4-byte aligned for typed-array views.
+BINARY_MAGIC = b'HRD1'
+BINARY_MIME_TYPE = 'application/x-herd-frame'
+BINARY_COORD_SCALE = 10 ** 7  # int32 fixed-point degrees
+BINARY_COLUMNS = (
+    ('id', '<u4'),
+    ('lat', '<i4'),
+    ('lon', '<i4'),
+    ('distance_x10', '<u4'),
+    ('rssi_x10', '<i2'),
+    ('status', 'u1')
+)
+
+
+# Fields of a compact cow row, in order
+COW_ROW_FIELDS = ('id', 'lat_q', 'lon_q', 'rssi_x10', 'distance_x10', 'status')
+
+# Summary fields copied from the update payload into every frame
+HEADER_FIELDS = ('human', 'system_time', 'update_count', 'alerts_active', 'cows_safe', 'distance_summary')
+
+
+class DeltaEncoder:
+    """
+    Encodes herd updates as keyframes and diffs
+    
+    Coordinates are sent as integer multiples of coord_quantum degrees
+    relative to a fixed origin, RSSI and distance as integer tenths. A
+    keyframe carries every cow; a diff carries only cows whose position moved
+    more than move_threshold meters, whose status changed, or whose RSSI or
+    distance changed by at least 1 unit since they were last sent. The
+    encoder tracks what clients hold, so keyframe() can bring a client that
+    joins mid-stream up to date for the next diff.
+    """
+    
+    def __init__(self, keyframe_interval=None, coord_quantum=None, move_threshold=None, origin=None):
+        self.keyframe_interval = config.DELTA_KEYFRAME_INTERVAL if keyframe_interval is None else keyframe_interval
+        self.coord_quantum = config.DELTA_COORD_QUANTUM if coord_quantum is None else coord_quantum
+        self.move_threshold = config.DELTA_MOVE_THRESHOLD if move_threshold is None else move_threshold
+        self.origin = config.BASE_COORDS if origin is None else origin
+        
+        # Meters per coordinate quantum, for the movement deadband
+        self._m_per_q_lat = self.coord_quantum * 111320
+        self._m_per_q_lon = self.coord_quantum * 111320 * math.cos(math.radians(self.origin[0]))
+        
+        self.seq = 0
+        self.keyframe_seq = None
+        self._rows = None
+        self._header = None
+        # keyframe() is served from request handlers while encode() runs
+        # in the monitoring loop
+        self._lock = threading.Lock()
+    
+    def _quantize(self, view):
+        """Compact integer rows (see COW_ROW_FIELDS) for every cow in a HerdView"""
+        return np.column_stack([
+            view.ids.astype(np.int64),
+            np.rint((view.lat - self.origin[0]) / self.coord_quantum).astype(np.int64),
+            np.rint((view.lon - self.origin[1]) / self.coord_quantum).astype(np.int64),
+            np.rint(view.rssi.astype(np.float64) * 10).astype(np.int64),
+            np.rint(np.nan_to_num(view.distance.astype(np.float64)) * 10).astype(np.int64),
+            view.status.astype(np.int64)
+        ]).reshape(len(view), len(COW_ROW_FIELDS))
+    
+    def encode(self, view, payload):
+        """
+        Encode one update
+        
+        Args:
+            view: HerdView with the evaluated herd
+            payload: Update payload (e.g. current_data) providing HEADER_FIELDS
+        
+        Returns:
+            Tuple of (event name, frame): ('position_keyframe', keyframe)
+            or ('position_delta', diff)
+        """
+        rows = self._quantize(view)
+        with self._lock:
+            self._header = {field: payload.get(field) for field in HEADER_FIELDS}
+            self.seq += 1
+            
+            if self._rows is None or self.seq - self.keyframe_seq >= self.keyframe_interval:
+                self._rows = rows
+                self.keyframe_seq = self.seq
+                return 'position_keyframe', self._keyframe()
+            
+            return 'position_delta', self._diff(rows)
+    
+    def _diff(self, rows):
+        """Diff against the rows clients hold, updating them to match"""
+        previous = self._rows
+        common = min(len(rows), len(previous))
+        new, old = rows[:common], previous[:common]
+        
+        moved_m = np.hypot((new[:, 1] - old[:, 1]) * self._m_per_q_lat, (new[:, 2] - old[:, 2]) * self._m_per_q_lon)
+        changed = (
+            (moved_m > self.move_threshold)
+            | (new[:, 5] != old[:, 5])
+            | (np.abs(new[:, 3] - old[:, 3]) >= 10)
+            | (np.abs(new[:, 4] - old[:, 4]) >= 10)
+            | (new[:, 0] != old[:, 0])
+        )
+        changed_rows = np.concatenate([np.flatnonzero(changed), np.arange(common, len(rows))])
+        
+        # Clients now hold the sent rows; unchanged rows keep their old values
+        reference = np.empty_like(rows)
+        reference[:common] = old
+        reference[changed_rows] = rows[changed_rows]
+        self._rows = reference
+        
+        frame = {
+            'seq': self.seq,
+            'base_seq': self.seq - 1,
+            'cows': rows[changed_rows].tolist(),
+            'removed': previous[common:, 0].tolist()
+        }
+        frame.update(self._header)
+        return frame
+    
+    def keyframe(self):
+        """
+        Full frame of the state clients currently hold
+        
+        Returns:
+            Keyframe dictionary, or None before the first encode()
+        """
+        with self._lock:
+            return self._keyframe()
+    
+    def _keyframe(self):
+        if self._rows is None:
+            return None
+        
+        frame = {
+            'seq': self.seq,
+            'keyframe': True,
+            'origin': list(self.origin),
+            'coord_quantum': self.coord_quantum,
+            'fields': list(COW_ROW_FIELDS),
+            'cows': self._rows.tolist()
+        }
+        frame.update(self._header)
+        return frame
+
+
+def encode_binary_frame(view, payload, seq=None):
+    """
+    Encode the whole herd as a binary frame of packed typed arrays
+    
+    Layout: BINARY_MAGIC, uint32 header length, JSON header (HEADER_FIELDS
+    plus count, seq and column list) padded to 4 bytes, then BINARY_COLUMNS:
+    int32 fixed-point lat/lon (BINARY_COORD_SCALE), uint32 distance x10,
+    int16 RSSI x10 and uint8 status code.
+    
+    Args:
+        view: HerdView with the evaluated herd
+        payload: Update payload (e.g. current_data) providing HEADER_FIELDS
+        seq: Optional update sequence number
+    
+    Returns:
+        Frame as bytes
+    """
+    count = len(view)
+    header = {field: payload.get(field) for field in HEADER_FIELDS}
+    header.update({
+        'seq': seq,
+        'count': count,
+        'coord_scale': BINARY_COORD_SCALE,
+        'columns': [name for name, _ in BINARY_COLUMNS]
+    })
+    header_bytes = encode_json(header)
+    header_bytes += b' ' * (-len(header_bytes) % 4)
+    
+    distance = np.nan_to_num(view.distance.astype(np.float64)) * 10
+    columns = (
+        view.ids.astype('<u4'),
+        np.rint(view.lat * BINARY_COORD_SCALE).astype('<i4'),
+        np.rint(view.lon * BINARY_COORD_SCALE).astype('<i4'),
+        np.rint(np.clip(distance, 0, 2 ** 32 - 1)).astype('<u4'),
+        np.rint(view.rssi.astype(np.float64) * 10).astype('<i2'),
+        view.status.astype('u1')
+    )
+    
+    return b''.join([BINARY_MAGIC, struct.pack('<I', len(header_bytes)), header_bytes]
+                    + [column.tobytes() for column in columns])
+
+
+def decode_binary_frame(data):
+    """
+    Decode a binary frame into its header and zero-copy column arrays
+    
+    Args:
+        data: Frame bytes from encode_binary_frame
+    
+    Returns:
+        Tuple of (header dict, dict of column name -> NumPy array view)
+    """
+    if data[:4] != BINARY_MAGIC:
+        raise ValueError('Not a herd binary frame')
+    
+    header_length = struct.unpack_from('<I', data, 4)[0]
+    header = json.loads(bytes(data[8:8 + header_length]).decode('utf-8'))
+    
+    count = header['count']
+    offset = 8 + header_length
+    columns = {}
+    for name, dtype in BINARY_COLUMNS:
+        columns[name] = np.frombuffer(data, dtype=dtype, count=count, offset=offset)
+        offset += count * np.dtype(dtype).itemsize
+    
+    return header, columns
+
+
+def encode_json(payload):
+    """
+    Encode a payload as compact UTF-8 JSON bytes
+    
+    NaN and infinity raise ValueError instead of producing tokens that
+    browsers' JSON.parse rejects.
+    
+    Args:
+        payload: JSON-serializable object
+    
+    Returns:
+        Encoded bytes
+    """
+    return json.dumps(payload, separators=(',', ':'), allow_nan=False).encode('utf-8')
+
+
+class SnapshotCache:
+    """
+    Versioned cache of the encoded payloads for the latest update cycle
+    
+    The monitoring loop publishes each cycle's payloads once, already
+    encoded; broadcasts, replays to new clients, manual refreshes and REST
+    polls all reuse the same bytes. Entries can also be produced lazily on
+    first use and are then kept until the next publish. Every entry has an
+    ETag derived from the cache version, for HTTP conditional requests.
+    """
+    
+    def __init__(self):
+        self.version = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+    
+    def publish(self, entries, version=None):
+        """
+        Replace the cache contents with a new cycle's encoded payloads
+        
+        Args:
+            entries: Dictionary of entry name -> encoded bytes
+            version: Version to publish under (default: the next one), so
+                     caches of several server processes agree on ETags
+        
+        Returns:
+            New cache version
+        """
+        with self._lock:
+            self.version = self.version + 1 if version is None else version
+            self._entries = dict(entries)
+            return self.version
+    
+    def get(self, name, producer=None):
+        """
+        Encoded bytes for an entry of the current version
+        
+        Args:
+            name: Entry name
+            producer: Optional callable returning the bytes when the entry has
+                      not been encoded for this version yet
+        
+        Returns:
+            Encoded bytes, or None if unavailable
+        """
+        with self._lock:
+            version, entries = self.version, self._entries
+            data = entries.get(name)
+        if data is None and producer is not None:
+            data = producer()
+            with self._lock:
+                if self.version == version and data is not None:
+                    self._entries.setdefault(name, data)
+        return data
+    
+    def etag(self, name):
+        """ETag for an entry of the current version"""
+        return f'{self.version}-{name}'